@@ -10,6 +10,8 @@ import pyttsx3
 from vosk import Model, KaldiRecognizer
 import json as _json
 
+import metrics
+
 # ────────────────────────────────────────────────────────────
 # директория проекта (чтобы найти модель Vosk)
 # ────────────────────────────────────────────────────────────
@@ -49,14 +51,16 @@ engine.setProperty('rate', 140)  # чуть медленнее среднего
 # ────────────────────────────────────────────────────────────
 def ogg_to_wav(ogg_path: str, wav_path: str):
     """Конвертирует .ogg → .wav (16 kHz, моно)."""
-    audio = AudioSegment.from_file(ogg_path)
-    audio = audio.set_frame_rate(16000).set_channels(1)
-    audio.export(wav_path, format='wav')
+    with metrics.AUDIO_SECONDS.time("ogg_to_wav"):
+        audio = AudioSegment.from_file(ogg_path)
+        audio = audio.set_frame_rate(16000).set_channels(1)
+        audio.export(wav_path, format='wav')
 
 def wav_to_ogg(wav_path: str, ogg_path: str):
     """Конвертирует .wav → .ogg."""
-    audio = AudioSegment.from_file(wav_path)
-    audio.export(ogg_path, format='ogg')
+    with metrics.AUDIO_SECONDS.time("wav_to_ogg"):
+        audio = AudioSegment.from_file(wav_path)
+        audio.export(ogg_path, format='ogg')
 
 def stt_from_wav(wav_path: str) -> str:
     """Распознаёт русскую речь офлайн через Vosk."""
@@ -78,10 +82,12 @@ def tts_to_ogg(text: str, ogg_path: str):
     Синтезирует текст в mp3 через pyttsx3, конвертирует в ogg и сохраняет.
     """
     tmp_mp3 = ogg_path.replace(".ogg", ".mp3")
-    engine.save_to_file(text, tmp_mp3)
-    engine.runAndWait()
+    with metrics.TTS_SECONDS.time():
+        engine.save_to_file(text, tmp_mp3)
+        engine.runAndWait()
     # конвертируем mp3 → ogg
-    audio = AudioSegment.from_file(tmp_mp3)
-    audio = audio.set_frame_rate(16000).set_channels(1)
-    audio.export(ogg_path, format='ogg')
+    with metrics.AUDIO_SECONDS.time("mp3_to_ogg"):
+        audio = AudioSegment.from_file(tmp_mp3)
+        audio = audio.set_frame_rate(16000).set_channels(1)
+        audio.export(ogg_path, format='ogg')
     os.remove(tmp_mp3)
@@ -0,0 +1,129 @@
+"""
+benchmarks/bench_catalog.py
+───────────────────────────
+CatalogIndex на синтетическом каталоге против прежней работы с сырым словарём.
+
+    python benchmarks/bench_catalog.py [--skus 100000] [--queries 2000]
+
+• каталог — категории data/product_catalog.json, товары размножены
+  до --skus со случайными ценами / брендами / размерами
+• «ещё»: [p for p in подкатегория if name not in shown] + random.choice
+  против pick_unshown(); выбор сверяется (тот же random.seed)
+• фильтр «категория до N» по цене: перебор с разбором строки цены
+  против filter(..., limit=3)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from catalog_index import CatalogIndex, parse_price  # noqa: E402
+
+BRANDS = ("Askona", "Hoff", "Ormatek", "Dimax", "Sonberry", "Toris")
+SIZES = ("80x190", "90x200", "140x200", "160x200", "180x200")
+
+
+def synthetic(skus: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    base = json.loads((ROOT / "data" / "product_catalog.json").read_text("utf-8"))
+    subs = [(cat, sub) for cat, ss in base.items() for sub in ss]
+    out: dict = {cat: {sub: [] for sub in ss} for cat, ss in base.items()}
+    for i in range(skus):
+        cat, sub = subs[i % len(subs)]
+        proto = base[cat][sub][i % len(base[cat][sub])]
+        price = rng.randrange(3_000, 150_000)
+        out[cat][sub].append(dict(
+            proto, name=f"{sub} {rng.choice(BRANDS)} #{i}",
+            price=f"{price // 1000} {price % 1000:03d}",
+            link=f"https://example.com/{i}?SELECTED_HASH_SIZE={rng.choice(SIZES)}",
+        ))
+    return out
+
+
+def timed(fn: Callable[[], object], n: int) -> List[float]:
+    out = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+def fmt(times: List[float]) -> str:
+    ms = sorted(t * 1e3 for t in times)
+    return f"mean {statistics.fmean(ms):8.3f} ms, p95 {ms[int(len(ms) * 0.95)]:8.3f} ms"
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--skus", type=int, default=100_000)
+    ap.add_argument("--queries", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=3)
+    args = ap.parse_args()
+
+    catalog = synthetic(args.skus, args.seed)
+    t0 = time.perf_counter()
+    index = CatalogIndex(catalog)
+    print(f"{len(index)} SKU, индекс собран за {time.perf_counter() - t0:.2f} s")
+
+    rng = random.Random(args.seed)
+    subs = [(cat, sub) for cat, ss in catalog.items() for sub in ss]
+
+    # «ещё»: пользователь уже видел несколько товаров подкатегории
+    cases = []
+    for _ in range(args.queries):
+        cat, sub = rng.choice(subs)
+        shown = {p["name"] for p in rng.sample(catalog[cat][sub], rng.randint(1, 8))}
+        cases.append((cat, sub, shown))
+
+    def old_more(case=iter(cases)):
+        cat, sub, shown = next(case)
+        rest = [p for p in catalog[cat][sub] if p["name"] not in shown]
+        return random.choice(rest)["name"]
+
+    def new_more(case=iter(cases)):
+        cat, sub, shown = next(case)
+        return index.pick_unshown(cat, sub, shown).name
+
+    random.seed(1); old_names = [old_more() for _ in range(min(200, len(cases)))]
+    random.seed(1); new_names = [new_more() for _ in range(len(old_names))]
+    print(f"«ещё»: выбор совпал {sum(a == b for a, b in zip(old_names, new_names))}/{len(old_names)}")
+    n = len(cases) - len(old_names)
+    print(f"  сырой список: {fmt(timed(old_more, n))}")
+    print(f"  pick_unshown: {fmt(timed(new_more, n))}")
+
+    # фильтр по цене: три самых дешёвых в категории до hi
+    queries = [(rng.choice(list(catalog)), rng.randrange(5_000, 60_000)) for _ in range(args.queries)]
+
+    def old_filter(q=iter(queries)):
+        cat, hi = next(q)
+        hits = [p for ps in catalog[cat].values() for p in ps if parse_price(p["price"]) <= hi]
+        return sorted(hits, key=lambda p: parse_price(p["price"]))[:3]
+
+    def new_filter(q=iter(queries)):
+        cat, hi = next(q)
+        return index.filter(cat, None, None, hi, limit=3)
+
+    print("фильтр «категория до N», первая страница:")
+    print(f"  перебор:      {fmt(timed(old_filter, min(50, args.queries)))}")
+    print(f"  filter():     {fmt(timed(new_filter, args.queries))}")
+
+    def brand_filter(q=iter(queries)):
+        cat, hi = next(q)
+        return index.filter(cat, None, None, hi, brand="Hoff", limit=3)
+
+    print(f"  + brand=Hoff: {fmt(timed(brand_filter, args.queries))}")
+
+
+if __name__ == "__main__":
+    main()
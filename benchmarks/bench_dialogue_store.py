@@ -0,0 +1,137 @@
+"""
+benchmarks/bench_dialogue_store.py
+──────────────────────────────────
+DialogueRetriever над текстовым корпусом (всё в памяти + NgramIndex)
+против DialogueStore (SQLite + trigram-FTS) на синтетическом корпусе.
+
+    python benchmarks/bench_dialogue_store.py [--pairs 1000000] [--queries 500]
+
+Корпус — вопросы dialogues.txt с 1–4 случайными правками (ORIGINAL_SHARE)
+вперемешку со случайными фразами из слов корпуса; запросы — настоящие
+вопросы с 0–3 правками. Нормализация lower() (лемматизация миллиона
+строк меряла бы Natasha, а не хранилище).
+Каждый backend запускается в отдельном процессе, чтобы пиковый RSS
+(ru_maxrss) не смешивался:
+  • open   – время от конструктора до готовности отвечать
+  • query  – средняя задержка get_answer, мс
+  • RSS    – пик памяти процесса (VmHWM: ru_maxrss переживает fork/exec
+             и показал бы память родителя, собиравшего корпус)
+  • append – добавление одной пары (store: INSERT, memory: NgramIndex.add)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from bench_spell import mutate  # noqa: E402
+
+#: доля вопросов — вариаций настоящих (остальные — случайные фразы из слов корпуса)
+ORIGINAL_SHARE = 0.05
+
+
+def build_corpus(workdir: Path, n: int, seed: int) -> tuple[Path, Path]:
+    from dialogue_store import DialogueStore, read_text_corpus
+
+    rng = random.Random(seed)
+    base = read_text_corpus(ROOT / "data" / "dialogues.txt")
+    vocab = sorted({w for q, a in base for w in re.findall(r"[а-яё]+", f"{q} {a}".lower())})
+    txt, db = workdir / "dialogues.txt", workdir / "dialogues.db"
+    with txt.open("w", encoding="utf-8") as f:
+        for _ in range(n):
+            q, a = rng.choice(base)
+            if rng.random() < ORIGINAL_SHARE:
+                q = mutate(q.lower(), rng, rng.randint(1, 4))
+            else:
+                q = " ".join(rng.choices(vocab, k=rng.randint(2, 8)))
+            f.write(f"{q}\n{a}\n\n")
+    t0 = time.perf_counter()
+    DialogueStore(db, "lower").import_text(txt, lambda qs: [q.lower() for q in qs])
+    print(f"корпус: {n} пар, импорт в SQLite {time.perf_counter() - t0:.1f} s, "
+          f"{db.stat().st_size / 2**20:.0f} MiB на диске")
+    return txt, db
+
+
+def peak_rss_mb() -> float:
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(path: str, queries: list[str]) -> dict:
+    from dialogue_retrieval import DialogueRetriever
+
+    t0 = time.perf_counter()
+    r = DialogueRetriever(path)
+    opened = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    answers = [r.get_answer(q) for q in queries]
+    query_ms = (time.perf_counter() - t0) / len(queries) * 1e3
+
+    t0 = time.perf_counter()
+    r.add("совершенно новый вопрос", "новый ответ")
+    append_ms = (time.perf_counter() - t0) * 1e3
+    return dict(
+        open=opened,
+        query_ms=query_ms,
+        append_ms=append_ms,
+        rss_mb=peak_rss_mb(),
+        hits=sum(a is not None for a in answers),
+    )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pairs", type=int, default=1_000_000)
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--child", nargs=2, metavar=("CORPUS", "QUERIES"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        queries = json.loads(Path(args.child[1]).read_text("utf-8"))
+        print(json.dumps(child(args.child[0], queries)))
+        return
+
+    from dialogue_store import read_text_corpus
+
+    rng = random.Random(args.seed + 1)
+    base = [q.lower() for q, _ in read_text_corpus(ROOT / "data" / "dialogues.txt")]
+    queries = [mutate(rng.choice(base), rng, rng.randint(0, 3)) for _ in range(args.queries)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        txt, db = build_corpus(tmp, args.pairs, args.seed)
+        qfile = tmp / "queries.json"
+        qfile.write_text(json.dumps(queries, ensure_ascii=False), "utf-8")
+        for name, path in (("memory", txt), ("sqlite", db)):
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", str(path), str(qfile)],
+                check=True, capture_output=True, text=True,
+            ).stdout.strip().splitlines()[-1]
+            m = json.loads(out)
+            print(
+                f"{name:>7}: open {m['open'] * 1e3:9.1f} ms | query {m['query_ms']:7.2f} ms | "
+                f"append {m['append_ms']:6.2f} ms | RSS {m['rss_mb']:7.0f} MiB | "
+                f"ответов {m['hits']}/{len(queries)}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+benchmarks/bench_features.py
+────────────────────────────
+Сравнивает два TfidfVectorizer.transform + sparse.hstack с FusedTfidf.
+
+    python benchmarks/bench_features.py [--batches 1,32,256] [--repeat 3]
+
+Тексты — нормализованные примеры датасета и реплики data/dialogues.txt.
+Для каждого размера батча проверяется, что CSR совпадает бит-в-бит
+(indptr, indices, data).
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from scipy import sparse  # noqa: E402
+
+from fused_features import FusedTfidf  # noqa: E402
+from intent_classifier import IntentClassifier  # noqa: E402
+from nlp_utils import clean_text, lemmatize_text  # noqa: E402
+
+
+def timed(fn: Callable, texts: List[str], batch: int, repeat: int) -> float:
+    """Лучшее из repeat время (ms) на весь список, батчами по batch."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for i in range(0, len(texts), batch):
+            fn(texts[i:i + batch])
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e3
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--batches", default="1,32,256")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    clf = IntentClassifier(ROOT / "data")
+    clf.load(compact=False)
+    texts = [ex for exs in clf.norm_examples.values() for ex in exs]
+    dialogues = ROOT / "data" / "dialogues.txt"
+    if dialogues.exists():
+        for line in dialogues.read_text("utf-8").splitlines():
+            line = line.strip("— ").strip()
+            if line:
+                texts.append(lemmatize_text(clean_text(line)))
+
+    fused = FusedTfidf.from_sklearn(clf.v_word, clf.v_char)
+
+    def hstack(batch: List[str]):
+        return sparse.hstack(
+            [clf.v_word.transform(batch), clf.v_char.transform(batch)]
+        ).tocsr()
+
+    for batch in map(int, args.batches.split(",")):
+        same = all(
+            np.array_equal(a.indptr, b.indptr)
+            and np.array_equal(a.indices, b.indices)
+            and np.array_equal(a.data, b.data)
+            for a, b in (
+                (hstack(texts[i:i + batch]), fused.transform(texts[i:i + batch]))
+                for i in range(0, len(texts), batch)
+            )
+        )
+        old = timed(hstack, texts, batch, args.repeat)
+        new = timed(fused.transform, texts, batch, args.repeat)
+        print(
+            f"batch {batch:>4}: {len(texts)} текстов | hstack {old:8.1f} ms | "
+            f"fused {new:8.1f} ms | ×{old / max(new, 1e-9):5.1f} | "
+            f"бит-в-бит: {'да' if same else 'НЕТ'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
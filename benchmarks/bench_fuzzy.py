@@ -0,0 +1,124 @@
+"""
+benchmarks/bench_fuzzy.py
+─────────────────────────
+Сравнивает полный перебор Левенштейна (старый predict_fuzzy) с NgramIndex.
+
+    python benchmarks/bench_fuzzy.py [--synthetic 50000] [--queries 200] [--workers 4]
+
+• «real»      – нормализованные примеры из data/intents_dataset.json
+• «synthetic» – те же примеры + случайные мутации до нужного размера
+Запросы — мутированные примеры (1–3 правки), порог 0.25.
+Для каждого запроса проверяется, что индекс вернул тот же пример.
+--workers N – вдобавок пачка запросов через ShardedNgramIndex (N процессов).
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from nltk.metrics.distance import edit_distance  # noqa: E402
+
+from fuzzy_index import NgramIndex, ShardedNgramIndex  # noqa: E402
+from intent_classifier import IntentClassifier  # noqa: E402
+
+ALPHABET = "абвгдеёжзийклмнопрстуфхцчшщъыьэюя "
+
+
+def mutate(s: str, rng: random.Random, edits: int) -> str:
+    chars = list(s)
+    for _ in range(edits):
+        op = rng.randrange(3)
+        pos = rng.randrange(len(chars) + 1)
+        if op == 0 or not chars:
+            chars.insert(pos, rng.choice(ALPHABET))
+        elif op == 1:
+            del chars[min(pos, len(chars) - 1)]
+        else:
+            chars[min(pos, len(chars) - 1)] = rng.choice(ALPHABET)
+    return "".join(chars)
+
+
+def full_scan(query: str, examples: List[str], threshold: float) -> Optional[int]:
+    """Старый алгоритм predict_fuzzy: nltk edit_distance по всем примерам."""
+    best_i, best_d = None, threshold
+    for i, ex in enumerate(examples):
+        d = edit_distance(query, ex) / max(1, len(ex))
+        if d < best_d:
+            best_i, best_d = i, d
+    return best_i
+
+
+def run(name: str, examples: List[str], queries: List[str],
+        scan_queries: int, threshold: float, workers: int = 1) -> None:
+    t0 = time.perf_counter()
+    index = NgramIndex(examples)
+    build = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    found = [index.nearest(q, threshold)[0] for q in queries]
+    idx_ms = (time.perf_counter() - t0) / len(queries) * 1e3
+
+    sub = queries[:scan_queries]
+    t0 = time.perf_counter()
+    expected = [full_scan(q, examples, threshold) for q in sub]
+    scan_ms = (time.perf_counter() - t0) / len(sub) * 1e3
+
+    same = sum(a == b for a, b in zip(found, expected))
+    print(
+        f"{name:>10}: {len(examples):>6} примеров | build {build * 1e3:8.1f} ms | "
+        f"full scan {scan_ms:9.2f} ms/q | index {idx_ms:7.3f} ms/q | "
+        f"×{scan_ms / max(idx_ms, 1e-9):7.1f} | совпало {same}/{len(sub)}"
+    )
+    if workers < 2:
+        return
+
+    sharded = ShardedNgramIndex(examples, workers)
+    sharded.top_k_many(queries[:1], 1, threshold)            # процессы поднялись
+    t0 = time.perf_counter()
+    hits = sharded.top_k_many(queries, 1, threshold)
+    par_ms = (time.perf_counter() - t0) / len(queries) * 1e3
+    sharded.close()
+    same = sum((h[0][0] if h else None) == f for h, f in zip(hits, found))
+    print(
+        f"{'':>10}  {workers} шардов | index {par_ms:7.3f} ms/q | "
+        f"×{idx_ms / max(par_ms, 1e-9):5.2f} к одному ядру | совпало {same}/{len(queries)}"
+    )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--synthetic", type=int, default=50_000)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--scan-queries", type=int, default=20,
+                    help="сколько запросов прогнать через полный перебор")
+    ap.add_argument("--threshold", type=float, default=0.25)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--workers", type=int, default=1)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    clf = IntentClassifier(ROOT / "data")
+    real = [ex for exs in clf.norm_examples.values() for ex in exs]
+
+    synthetic = list(real)
+    while len(synthetic) < args.synthetic:
+        synthetic.append(mutate(rng.choice(real), rng, rng.randint(1, 6)))
+
+    queries = [mutate(rng.choice(real), rng, rng.randint(1, 3))
+               for _ in range(args.queries)]
+
+    run("real", real, queries, min(args.scan_queries * 10, args.queries),
+        args.threshold)
+    run("synthetic", synthetic, queries, args.scan_queries, args.threshold, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+benchmarks/bench_get_response.py
+────────────────────────────────
+Golden-диалоги для get_response (response_rules.ResponseEngine) + CPU на сообщение
+и доли ответивших стадий (из metrics.RESPONSES).
+
+    python benchmarks/bench_get_response.py             # сверить с golden, время
+    python benchmarks/bench_get_response.py --record    # перезаписать golden (из базовой версии)
+    python benchmarks/bench_get_response.py --lemma-table   # с таблицей лемм (LEMMA_TABLE=1)
+
+• диалоги — SCRIPTS (по сценарию на каждую стадию) + RETIRED_SCRIPTS
+  (интенты из "retired" скрыты от движка, как после удаления из датасета
+  при старой модели: retrieval, fallback → журнал, обучение) + --random
+  случайных из примеров интентов, вопросов dialogues.txt и реплик
+  сценариев; сохраняются вместе с ответами в benchmarks/golden_conversations.json
+• ответы golden пишет не текущий код, а get_response базовой версии
+  (--baseline, по умолчанию BASELINE) через golden_baseline.py: в
+  git worktree, отдельным процессом; намеренные изменения поведения
+  перечислены там же. tests/test_golden.py сверяет с ним текущий движок
+• каждый диалог: свой user_data, random.seed(номер), «часы» стартуют
+  с FIXED_NOW и идут на STEP за сообщение (кулдаун рекламы, сезонные даты)
+• learner не подключается, custom_intents пишется во временный файл:
+  прогон детерминирован и не трогает data/
+Любое расхождение ответа печатается с номером диалога и реплики;
+исключение из get_response записывается как ответ «<Тип: текст>».
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import json
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import metrics  # noqa: E402
+from dialogue_retrieval import DialogueRetriever  # noqa: E402
+from intent_classifier import IntentClassifier  # noqa: E402
+from intent_journal import IntentJournal  # noqa: E402
+from nlp_utils import NormalizedText, build_lemma_table  # noqa: E402
+from response_rules import ResponseEngine  # noqa: E402
+from spell_index import SpellIndex  # noqa: E402
+
+DATA_DIR = ROOT / "data"
+GOLDEN_F = Path(__file__).with_name("golden_conversations.json")
+BASELINE = "c323151"          # исходная версия бота — эталон ответов
+FIXED_NOW = datetime(2025, 5, 20, 12, 0)
+STEP = timedelta(minutes=25)
+
+SCRIPTS: List[List[str]] = [
+    ["привет", "как дела?", "какое у тебя настроение", "пока"],
+    ["хочу фильм", "комедия", "ещё", "ещё раз"],
+    ["посоветуй музыку", "рок", "расскажи анекдот", "ещё", "ещё"],
+    ["я так устал, плохо спал", "да", "кровати", "двуспальные", "ещё", "ещё", "ещё", "ещё"],
+    ["у меня болит спина", "нет", "покажи каталог", "матрасы", "детские", "ещё", "спасибо"],
+    ["что такое квазар", "это далёкая яркая галактика", "что такое квазар"],
+    ["любимое блюдо", "пельмени", "любимое блюдо", "любимый цвет"],
+    ["давай сыграем в крестики", "A1", "B2"],
+    ["привет", "расскажи факт", "ещё", "какие есть товары", "матрасы", "ортопедические"],
+    ["мне грустно и плохо", "у меня всё ужасно", "я счастлив, всё прекрасно"],
+    ["у нас переезд и ремонт квартиры", "кровати", "с подъемным механизмом", "ещё"],
+    ["", "   ", "?!", "ыыыыы", "абракадабра"],
+    ["покажи каталог", "матрасы", "мне 25-30 лет", "спал меньше 5 часов"],   # числа — не цена
+]
+
+# retrieval / fallback: классификатор выдаёт интент, которого у движка нет
+RETIRED_SCRIPTS: List[dict] = [
+    dict(retired=["name", "weather"],
+         messages=["как тебя зовут?", "Какая сегодня погода?", "пока", "нет", "Прогноз погоды",
+                   "смотри в окно", "Прогноз погоды", "Погода на улице", "не знаю", "Как звать тебя?"]),
+    dict(retired=["pets", "travel"],
+         messages=["Где купить щенка?", "Совет по путешествию", "покажи каталог", "нет",
+                   "Уход за животными", "Путешествие по России", "Уход за животными", "Лучшие страны"]),
+]
+
+
+# ───────────── окружение как в bot_logic (без Telegram / TTS) ─────────────
+def build_engine(custom_file: Path, lemma_table: bool = False) -> ResponseEngine:
+    journal = IntentJournal(custom_file)
+    intents = json.loads((DATA_DIR / "intents_dataset.json").read_text("utf-8"))
+    if (DATA_DIR / "custom_intents.json").exists():
+        intents.update(json.loads((DATA_DIR / "custom_intents.json").read_text("utf-8")))
+    catalog = json.loads((DATA_DIR / "product_catalog.json").read_text("utf-8"))
+    dialog_f = DATA_DIR / "dialogues.txt"
+
+    freq = Counter(ex.lower() for d in intents.values() if isinstance(d, dict)
+                   for ex in d.get("examples", []))
+    for ln in dialog_f.read_text("utf-8").splitlines():
+        freq.update(re.findall(r"[а-яёa-z]+", ln.lower()))
+    NormalizedText.speller = SpellIndex(freq)
+    if lemma_table:
+        build_lemma_table([ex for d in intents.values() if isinstance(d, dict)
+                           for ex in d.get("examples", [])]
+                          + dialog_f.read_text("utf-8").splitlines())
+
+    clf = IntentClassifier(DATA_DIR, cascade=True)
+    clf.load()
+    retriever = DialogueRetriever(str(dialog_f), lemmatize=True)
+    return ResponseEngine(intents, catalog, clf, retriever, learner=None, journal=journal)
+
+
+def random_conversations(n: int, seed: int) -> List[List[str]]:
+    rng = random.Random(seed)
+    intents = json.loads((DATA_DIR / "intents_dataset.json").read_text("utf-8"))
+    examples = [ex for d in intents.values() if isinstance(d, dict) for ex in d.get("examples", [])]
+    questions = (DATA_DIR / "dialogues.txt").read_text("utf-8").strip().split("\n\n")
+    questions = [b.splitlines()[0] for b in questions if b.strip()]
+    scripted = [m for s in SCRIPTS for m in s]
+    pools = (examples, questions, scripted)
+    return [[rng.choice(rng.choice(pools)) for _ in range(rng.randint(3, 12))] for _ in range(n)]
+
+
+# ───────────── прогон ─────────────
+def replay(engine: ResponseEngine, conversations: List[dict]):
+    """[[ответы]] и время CPU на каждое сообщение (сек); диалог — {messages, retired?}."""
+    replies, cpu = [], []
+    for i, conv in enumerate(conversations):
+        random.seed(i)
+        hidden = {k: engine.intents.pop(k) for k in conv.get("retired", ()) if k in engine.intents}
+        user_data: dict = {}
+        history: deque = deque(maxlen=50)
+        out = []
+        for j, text in enumerate(conv["messages"]):
+            t0 = time.process_time()
+            try:
+                reply = engine.respond(text, user_data, history, now=FIXED_NOW + STEP * j)
+            except Exception as e:                    # в боте его поймал бы error-handler
+                reply = f"<{type(e).__name__}: {e}>"
+            cpu.append(time.process_time() - t0)
+            history.extend((text, reply))
+            out.append(reply)
+        engine.intents.update(hidden)
+        replies.append(out)
+    return replies, cpu
+
+
+def record_baseline(engine: ResponseEngine, conversations: List[dict], rev: str = BASELINE):
+    """[[ответы]] get_response версии rev (golden_baseline.py) при NLP-входе текущего движка."""
+    nlp = {}
+    for conv in conversations:
+        for text in conv["messages"]:
+            if text not in nlp:
+                msg = NormalizedText(text)
+                pred = engine.clf.classify(msg)
+                nlp[text] = dict(lemma=msg.lemma, intent=str(pred.intent), fuzzy=str(pred.fuzzy_label))
+    request = json.dumps(dict(conversations=conversations, nlp=nlp), ensure_ascii=False)
+    with tempfile.TemporaryDirectory() as tmp:
+        checkout = Path(tmp) / "baseline"
+        subprocess.run(["git", "-C", str(ROOT), "worktree", "add", "--detach", str(checkout), rev],
+                       check=True, capture_output=True)
+        try:
+            done = subprocess.run(
+                [sys.executable, str(Path(__file__).with_name("golden_baseline.py")), str(checkout)],
+                input=request, cwd=checkout, capture_output=True, text=True, check=True,
+            )
+        finally:
+            subprocess.run(["git", "-C", str(ROOT), "worktree", "remove", "--force", str(checkout)],
+                           check=True, capture_output=True)
+    return json.loads(done.stdout)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--record", action="store_true", help="перезаписать golden-файл")
+    ap.add_argument("--random", type=int, default=60, help="сколько случайных диалогов (при --record)")
+    ap.add_argument("--rounds", type=int, default=3, help="сколько раз прогнать для замера")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--baseline", default=BASELINE, help="коммит, чьи ответы пишутся в golden (при --record)")
+    ap.add_argument("--lemma-table", action="store_true", help="таблица токен → лемма, как с LEMMA_TABLE=1")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(Path(tmp) / "custom_intents.json", args.lemma_table)
+        pristine = copy.deepcopy(engine.intents)
+
+        if args.record:
+            conversations = [dict(messages=m) for m in SCRIPTS] + RETIRED_SCRIPTS + [
+                dict(messages=m) for m in random_conversations(args.random, args.seed)]
+            replies = record_baseline(engine, conversations, args.baseline)
+            engine.journal.close()
+            GOLDEN_F.write_text(json.dumps(
+                [dict(conv, replies=r) for conv, r in zip(conversations, replies)],
+                ensure_ascii=False, indent=1), "utf-8")
+            print(f"✓ {len(conversations)} диалогов ({args.baseline}) → {GOLDEN_F}")
+            return
+
+        golden = json.loads(GOLDEN_F.read_text("utf-8"))
+        cpu: List[float] = []
+        for _ in range(args.rounds):
+            # fallback дописывает интенты — каждый раунд с чистого набора
+            engine.intents.clear(); engine.intents.update(copy.deepcopy(pristine))
+            replies, times = replay(engine, golden)
+            cpu.extend(times)
+        engine.journal.close()
+
+    diffs = [
+        (i, j, want, got)
+        for i, (g, r) in enumerate(zip(golden, replies))
+        for j, (want, got) in enumerate(zip(g["replies"], r))
+        if want != got
+    ]
+    for i, j, want, got in diffs[:10]:
+        print(f"✗ диалог {i}, реплика {j} {golden[i]['messages'][j]!r}:\n    ждали {want!r}\n    стало {got!r}")
+    total = sum(len(g["replies"]) for g in golden)
+    cpu_ms = sorted(t * 1e3 for t in cpu)
+    print(
+        f"golden: {total - len(diffs)}/{total} ответов совпало | CPU на сообщение: "
+        f"mean {statistics.fmean(cpu_ms):.3f} ms, p50 {cpu_ms[len(cpu_ms) // 2]:.3f} ms, "
+        f"p95 {cpu_ms[int(len(cpu_ms) * 0.95)]:.3f} ms"
+    )
+    # какая стадия сколько отвечала (bot_responses_total, все раунды)
+    by_stage: Counter = Counter()
+    for (stage, _, _), n in metrics.RESPONSES.samples().items():
+        by_stage[stage] += n
+    print("стадии: " + ", ".join(
+        f"{stage} {n / sum(by_stage.values()):.0%}" for stage, n in by_stage.most_common()))
+    sys.exit(1 if diffs else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+benchmarks/bench_intent_journal.py
+──────────────────────────────────
+Сохранение выученных интентов (fallback get_response): прежний
+read-modify-write custom_intents.json против IntentJournal.
+
+    python benchmarks/bench_intent_journal.py [--messages 3000] [--threads 8] [--repeat 0.3]
+
+• сообщения — незнакомые фразы, доля --repeat повторяет уже встреченные
+• --threads потоков пишут одновременно, как обработчики бота
+• после прогона файл перечитывается: сколько уникальных интентов дошло
+  до диска (у прежнего способа параллельные записи теряют друг друга,
+  а то и оставляют битый JSON — тогда 0)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from intent_journal import IntentJournal  # noqa: E402
+
+WORDS = ("кот собака дом река лес окно чай сон стол гора снег луна мяч "
+         "книга поезд море ветер город хлеб звезда").split()
+
+
+def phrases(n: int, repeat: float, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    out: List[str] = []
+    for _ in range(n):
+        if out and rng.random() < repeat:
+            out.append(rng.choice(out))
+        else:
+            out.append(" ".join(rng.choice(WORDS) for _ in range(4)) + f" {rng.randrange(10**6)}")
+    return out
+
+
+def intent(text: str) -> dict:
+    return {"examples": [text],
+            "responses": ["Я пока не знаю, как на это ответить. Подскажите пример ответа?"]}
+
+
+def cid(text: str) -> str:
+    return "c" + text.replace(" ", "")
+
+
+def old_writer(path: Path) -> Callable[[str], None]:
+    def add(text: str) -> None:                     # как _save_custom_intents до журнала
+        extra = json.loads(path.read_text("utf-8")) if path.exists() else {}
+        extra[cid(text)] = intent(text)
+        path.write_text(json.dumps(extra, ensure_ascii=False, indent=4), "utf-8")
+    return add
+
+
+def run(add: Callable[[str], None], messages: List[str], threads: int) -> List[float]:
+    chunks = [messages[i::threads] for i in range(threads)]
+    lat: List[List[float]] = [[] for _ in chunks]
+
+    def work(i: int) -> None:
+        for text in chunks[i]:
+            t0 = time.perf_counter()
+            try:
+                add(text)
+            except ValueError:                      # прочитали недописанный файл
+                pass
+            lat[i].append(time.perf_counter() - t0)
+
+    ts = [threading.Thread(target=work, args=(i,)) for i in range(threads)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    return [x for part in lat for x in part]
+
+
+def report(name: str, lat: List[float], wall: float, kept: int, want: int) -> None:
+    ms = sorted(x * 1e3 for x in lat)
+    print(f"{name:<8} {wall:6.2f} s | на сообщение mean {statistics.fmean(ms):.3f} ms, "
+          f"p95 {ms[int(len(ms) * 0.95)]:.3f} ms | на диске {kept}/{want} интентов")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--messages", type=int, default=3000)
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--repeat", type=float, default=0.3, help="доля повторов уже встреченных фраз")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    messages = phrases(args.messages, args.repeat, args.seed)
+    want = len(set(messages))
+    print(f"{len(messages)} сообщений, {want} уникальных, {args.threads} потоков")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "old.json"
+        t0 = time.perf_counter()
+        lat = run(old_writer(path), messages, args.threads)
+        wall = time.perf_counter() - t0
+        try:
+            kept = len(json.loads(path.read_text("utf-8")))
+        except ValueError:                          # гонка записи оставила битый JSON
+            kept = 0
+        report("json", lat, wall, kept, want)
+
+        path = Path(tmp) / "custom_intents.json"
+        t0 = time.perf_counter()
+        journal = IntentJournal(path, max_intents=max(want, 1))
+        lat = run(lambda text: journal.add(cid(text), intent(text)), messages, args.threads)
+        journal.close()
+        wall = time.perf_counter() - t0
+        reopened = IntentJournal(path)
+        kept = len(reopened)
+        reopened.close()
+        report("journal", lat, wall, kept, want)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+benchmarks/bench_patterns.py
+────────────────────────────
+Ключевые слова по сообщению: прежние циклы any(k in text for k in ...)
+против одного PatternMatcher (Ахо–Корасик) при росте числа шаблонов.
+
+    python benchmarks/bench_patterns.py [--sizes 40 400 4000] [--messages 3000]
+
+• сообщения — реплики data/dialogues.txt
+• базовые наборы — триггеры рекламы, команды каталога, категории, TOXIC,
+  MALICIOUS (response_rules, content_filter); сверху добавляются синтетические триггеры
+  из слов корпуса (по 5 на правило), чтобы довести число шаблонов до N
+• для режима SUB найденные правила сверяются с циклами (тот же fold())
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from pattern_matcher import SUB, PatternMatcher, fold  # noqa: E402
+from content_filter import MALICIOUS, TOXIC  # noqa: E402
+from response_rules import AD_TRIGGERS, CATALOG_COMMANDS  # noqa: E402
+
+
+def rule_sets(n: int, words: List[str], seed: int) -> Dict[object, Tuple[str, ...]]:
+    rules: Dict[object, Tuple[str, ...]] = {("trigger", k): k for k in AD_TRIGGERS}
+    rules.update(catalog=CATALOG_COMMANDS, toxic=tuple(TOXIC), malicious=tuple(MALICIOUS))
+    rng = random.Random(seed)
+    i = 0
+    while sum(map(len, rules.values())) < n:
+        rules[("extra", i)] = tuple(rng.sample(words, 5))
+        i += 1
+    return rules
+
+
+def loops(rules, text: str) -> set:
+    return {tag for tag, keys in rules.items() if any(k in text for k in keys)}
+
+
+def timed(fn, messages: List[str]) -> List[float]:
+    out = []
+    for m in messages:
+        t0 = time.perf_counter()
+        fn(m)
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+def fmt(times: List[float]) -> str:
+    us = sorted(t * 1e6 for t in times)
+    return f"mean {statistics.fmean(us):7.1f} µs, p95 {us[int(len(us) * 0.95)]:7.1f} µs"
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[40, 400, 4000])
+    ap.add_argument("--messages", type=int, default=3000)
+    ap.add_argument("--seed", type=int, default=5)
+    args = ap.parse_args()
+
+    lines = [ln.strip() for ln in (ROOT / "data" / "dialogues.txt").read_text("utf-8").splitlines() if ln.strip()]
+    rng = random.Random(args.seed)
+    messages = [fold(m) for m in rng.sample(lines, min(args.messages, len(lines)))]
+    words = sorted({w for ln in lines for w in re.findall(r"[а-яё]{5,}", fold(ln))})
+
+    for n in args.sizes:
+        rules = {tag: tuple(fold(k) for k in keys) for tag, keys in rule_sets(n, words, args.seed).items()}
+        t0 = time.perf_counter()
+        matcher = PatternMatcher()
+        for tag, keys in rules.items():
+            matcher.add(tag, keys, mode=SUB)
+        matcher.compile()
+        built = time.perf_counter() - t0
+
+        same = sum(set(matcher.search(m)) == loops(rules, m) for m in messages)
+        print(f"{len(matcher)} шаблонов (автомат за {built * 1e3:.0f} ms), совпало {same}/{len(messages)}")
+        print(f"  any() по наборам: {fmt(timed(lambda m: loops(rules, m), messages))}")
+        print(f"  PatternMatcher:   {fmt(timed(matcher.search, messages))}")
+
+
+if __name__ == "__main__":
+    main()
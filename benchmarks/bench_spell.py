@@ -0,0 +1,113 @@
+"""
+benchmarks/bench_spell.py
+─────────────────────────
+Сравнивает correct_spelling по set (полный перебор) с SpellIndex.
+
+    python benchmarks/bench_spell.py [--synthetic 50000] [--queries 2000]
+
+• «real»      – словарь, как в bot_logic: примеры интентов + слова dialogues.txt
+• «synthetic» – тот же словарь + случайные мутации до нужного размера
+Запросы — слова словаря с 0–3 правками. Для каждого запроса проверяется,
+что индекс нашёл слово на том же расстоянии, что и перебор (сами слова
+при равенстве могут отличаться: перебор берёт первое из set).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from Levenshtein import distance as lev_distance  # noqa: E402
+
+from nlp_utils import correct_spelling  # noqa: E402
+from spell_index import SpellIndex  # noqa: E402
+
+ALPHABET = "абвгдеёжзийклмнопрстуфхцчшщъыьэюя"
+
+
+def mutate(s: str, rng: random.Random, edits: int) -> str:
+    chars = list(s)
+    for _ in range(edits):
+        op = rng.randrange(3)
+        pos = rng.randrange(len(chars) + 1)
+        if op == 0 or not chars:
+            chars.insert(pos, rng.choice(ALPHABET))
+        elif op == 1:
+            del chars[min(pos, len(chars) - 1)]
+        else:
+            chars[min(pos, len(chars) - 1)] = rng.choice(ALPHABET)
+    return "".join(chars)
+
+
+def load_words() -> Counter:
+    """Тот же словарь, что строит bot_logic.py (WORD_FREQ)."""
+    intents = json.loads((ROOT / "data" / "intents_dataset.json").read_text("utf-8"))
+    freq = Counter(ex.lower() for d in intents.values() if isinstance(d, dict)
+                   for ex in d.get("examples", []))
+    for ln in (ROOT / "data" / "dialogues.txt").read_text("utf-8").splitlines():
+        freq.update(re.findall(r"[а-яёa-z]+", ln.lower()))
+    return freq
+
+
+def run(name: str, freq: Counter, queries: List[str], scan_queries: int) -> None:
+    t0 = time.perf_counter()
+    index = SpellIndex(freq)
+    build = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    found = [index.lookup(q) for q in queries]
+    idx_ms = (time.perf_counter() - t0) / len(queries) * 1e3
+
+    words = set(freq)
+    sub = queries[:scan_queries]
+    t0 = time.perf_counter()
+    expected = [correct_spelling(q, words) for q in sub]
+    scan_ms = (time.perf_counter() - t0) / len(sub) * 1e3
+
+    same = sum(
+        lev_distance(q, e) == lev_distance(q, f[0] if f else q)
+        for q, e, f in zip(sub, expected, found)
+    )
+    print(
+        f"{name:>10}: {len(freq):>6} слов | build {build * 1e3:8.1f} ms | "
+        f"full scan {scan_ms:8.3f} ms/w | index {idx_ms:7.4f} ms/w | "
+        f"×{scan_ms / max(idx_ms, 1e-9):7.1f} | совпало {same}/{len(sub)}"
+    )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--synthetic", type=int, default=50_000)
+    ap.add_argument("--queries", type=int, default=2000)
+    ap.add_argument("--scan-queries", type=int, default=200,
+                    help="сколько запросов прогнать через полный перебор")
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    real = load_words()
+    vocab = list(real)
+
+    synthetic = Counter(real)
+    while len(synthetic) < args.synthetic:
+        synthetic[mutate(rng.choice(vocab), rng, rng.randint(1, 4))] += 1
+
+    queries = [mutate(rng.choice(vocab), rng, rng.randint(0, 3))
+               for _ in range(args.queries)]
+
+    run("real", real, queries, min(args.scan_queries * 10, args.queries))
+    run("synthetic", synthetic, queries, args.scan_queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+benchmarks/golden_baseline.py
+─────────────────────────────
+get_response исходной версии бота (монолитный bot_logic.py до rule table)
+для записи golden-ответов: bench_get_response.py --record запускает его
+отдельным процессом в checkout-е базового коммита.
+
+    python benchmarks/golden_baseline.py /tmp/base < request.json > replies.json
+
+• из bot_logic.py базовой версии исполняется только кусок от BASE_DIR
+  до конца get_response — без Telegram, pydub и pyttsx3 (но её модули
+  импортируют nltk и matplotlib — они нужны для --record)
+• условия прогона — как в bench_get_response.replay: random.seed(номер
+  диалога), часы FIXED_NOW + STEP·реплика, custom_intents во временном
+  файле, интенты из "retired" скрыты на время диалога
+• NLP-вход (исправление опечаток + леммы, метки классификатора) берётся
+  из запроса — его считает текущая версия: спеллер, cascade и нормализация
+  менялись намеренно и проверяются своими бенчмарками; golden сверяет
+  логику диалога, которую переписывали в rule table
+• остальные намеренные изменения поведения — FIXES ниже, по одному
+  на запрос бэклога
+• stdin — {"conversations": [{messages, retired?}], "nlp": {текст: {lemma, intent, fuzzy}}},
+  stdout — [[ответы]]
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import sys
+import tempfile
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+
+FIXED_NOW = datetime(2025, 5, 20, 12, 0)
+STEP = timedelta(minutes=25)
+
+
+class _Clock(datetime):
+    """datetime, у которого utcnow() — часы прогона."""
+    now_: datetime = FIXED_NOW
+
+    @classmethod
+    def utcnow(cls):
+        return cls.now_
+
+
+def load_get_response(checkout: Path) -> dict:
+    """Пространство имён исходного bot_logic с get_response (CWD = checkout)."""
+    src = (checkout / "bot_logic.py").read_text("utf-8")
+    body = src[src.index("BASE_DIR = "):src.index("# ────────── helper")]
+    tts_from = body.index("# ────────── TTS")
+    body = body[:tts_from] + body[body.index("# ────────── утилиты"):]
+    header = (
+        "import os, json, random, re\n"
+        "from datetime import datetime\n"
+        "from pathlib import Path\n"
+        "from collections import deque\n"
+        "from modules.tictactoe import TicTacToe\n"
+        "from nlp_utils import clean_text, lemmatize_text, correct_spelling\n"
+        "from intent_classifier import IntentClassifier\n"
+        "from sentiment import get_sentiment\n"
+        "from recommendations import recommend\n"
+        "from dialogue_retrieval import DialogueRetriever\n"
+    )
+    ns = {"__file__": str(checkout / "bot_logic.py"), "__name__": "baseline_bot_logic"}
+    exec(compile(header + body, str(checkout / "bot_logic.py"), "exec"), ns)
+    ns["datetime"] = _Clock
+    for fix in FIXES:
+        fix(ns)
+    return ns
+
+
+def use_nlp(ns: dict, nlp: dict, current: list) -> None:
+    """Леммы и метки классификатора для current[0] — из готовой таблицы nlp."""
+    clf = ns["clf"]
+    ns["correct_spelling"] = lambda word, dictionary: word
+    ns["lemmatize_text"] = lambda text: nlp[current[0]]["lemma"]
+    clf.predict_intent = clf.predict = lambda text: nlp[current[0]]["intent"]
+    clf.predict_fuzzy = lambda text: nlp[current[0]]["fuzzy"]
+
+
+# ───────────── намеренные изменения поведения после базовой версии ─────────────
+# Каждое — отдельная функция над пространством имён исходного bot_logic;
+# всё, что не перечислено здесь, новая версия обязана отвечать как старая.
+# (user-003: стадия 0 звала несуществующий clf.predict_intent и всегда
+# молча пропускалась — закрыто use_nlp, он задаёт predict_intent.)
+def _sentiment_csv(ns: dict) -> None:
+    """user-014: kartaslovsent.csv разделён «;» — исходный csv.reader не находил в нём ни одного слова."""
+    import csv
+    import sentiment
+
+    with open(sentiment.CSV_PATH, encoding="utf-8") as f:
+        for row in csv.DictReader(f, delimiter=";"):
+            try:
+                sentiment.EMO_DICT[row["term"].strip().lower()] = float(row["value"])
+            except (KeyError, TypeError, ValueError):
+                continue
+
+
+class _WholeCategory(dict):
+    """Подкатегория None — все товары категории в порядке каталога."""
+
+    def __getitem__(self, sub):
+        if sub is None:
+            return [p for prods in self.values() for p in prods]
+        return super().__getitem__(sub)
+
+
+def _more_whole_category(ns: dict) -> None:
+    """user-022: «ещё» после триггерного оффера без подкатегории падал с KeyError: None."""
+    catalog = ns["PRODUCT_CATALOG"]
+    for cat, subs in list(catalog.items()):
+        catalog[cat] = _WholeCategory(subs)
+
+
+def _retriever_lemmas(ns: dict) -> None:
+    """user-015: запрос — леммы, а вопросы корпуса хранились как lower() — «как тебя зовут» не находился."""
+    import nlp_utils
+
+    retriever = ns["retriever"]
+    retriever.pairs = [(nlp_utils.lemmatize_text(nlp_utils.clean_text(q)), a)
+                       for q, a in _raw_pairs(ns["DIALOG_F"])]
+
+
+def _raw_pairs(path: Path) -> list:
+    """Пары (вопрос, ответ) dialogues.txt — разбор исходного DialogueRetriever без preprocess."""
+    pairs = []
+    for block in path.read_text("utf-8").strip().split("\n\n"):
+        q, *rest = block.strip().splitlines()
+        if rest:
+            pairs.append((q, rest[0].strip()))
+    return pairs
+
+
+FIXES = [_sentiment_csv, _more_whole_category, _retriever_lemmas]
+
+
+def main() -> None:
+    checkout = Path(sys.argv[1]).resolve()
+    sys.path.insert(0, str(checkout))
+    request = json.load(sys.stdin)
+    ns = load_get_response(checkout)
+    current = [None]
+    use_nlp(ns, request["nlp"], current)
+    intents = ns["INTENTS"]
+
+    out = []
+    with tempfile.TemporaryDirectory() as tmp:
+        ns["CUSTOM_F"] = Path(tmp) / "custom_intents.json"
+        for i, conv in enumerate(request["conversations"]):
+            random.seed(i)
+            hidden = {k: intents.pop(k) for k in conv.get("retired", ()) if k in intents}
+            user_data: dict = {}
+            history: deque = deque(maxlen=50)
+            replies = []
+            for j, text in enumerate(conv["messages"]):
+                _Clock.now_ = FIXED_NOW + STEP * j
+                current[0] = text
+                try:
+                    reply = ns["get_response"](text, user_data, history)
+                except Exception as e:
+                    reply = f"<{type(e).__name__}: {e}>"
+                history.extend((text, reply))
+                replies.append(reply)
+            intents.update(hidden)
+            out.append(replies)
+    json.dump(out, sys.stdout, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+"""
+benchmarks/load_test.py
+───────────────────────
+Нагрузочный прогон ядра диалога без Telegram: N синтетических пользователей
+(или записанные диалоги) → get_response → msgs/sec, p50/p95/p99 по стадиям,
+пик RSS; JSON-baseline для сравнения в CI.
+
+    python benchmarks/load_test.py run --users 200 --messages 20 --concurrency 8
+    python benchmarks/load_test.py run --logs logs.jsonl --save base.json
+    python benchmarks/load_test.py run --compare base.json --tolerance 0.25   # exit 1 при регрессии
+    python benchmarks/load_test.py anonymize user_memory/ logs.jsonl
+
+• сценарии пользователей — из примеров intents_dataset.json, вопросов
+  dialogues.txt, каталога (реклама, выбор категории, «ещё», цена «до N»),
+  крестиков-ноликов и обучения; у каждого свой Random(seed, номер)
+• --concurrency потоков берут пользователей из общей очереди по одному
+  сообщению, поэтому реплики разных пользователей перемежаются;
+  у каждого пользователя — свои user_data и history, как в боте
+• --target engine (по умолчанию) — ResponseEngine как в
+  bench_get_response.build_engine: custom_intents во временный файл,
+  без онлайн-дообучения. --target bot — bot_logic.get_response целиком
+  (нужны telegram и т. п.; выученные интенты пишутся в data/, learner живой)
+• --logs: anonymize-выгрузка (JSONL {"user", "text"}) или сам каталог
+  user_memory/ (history_<id>.json — реплики пользователя по порядку)
+• anonymize: id → псевдоним sha256(соль, id), из текста вырезаются
+  e-mail, ссылки, @ники и длинные номера (телефоны, карты)
+• стадия сообщения — ResponseEngine.last_stage; исключение — стадия
+  «error:<тип>»
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import queue
+import random
+import re
+import resource
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+DATA_DIR = ROOT / "data"
+PERCENTILES = (50, 95, 99)
+#: стадии реже этого не сравниваются с baseline — перцентили по паре сообщений шумят
+MIN_STAGE_COUNT = 50
+#: абсолютный допуск к p95 (ms), чтобы микросекундные стадии не «регрессировали» от шума
+P95_SLACK_MS = 0.5
+
+Script = List[str]
+Respond = Callable[[str, dict, deque], Tuple[str, str]]
+
+
+# ───────────── сценарии ─────────────
+class ScriptFactory:
+    """Реплики синтетических пользователей из данных бота."""
+
+    def __init__(self) -> None:
+        intents = json.loads((DATA_DIR / "intents_dataset.json").read_text("utf-8"))
+        self.examples = [ex for d in intents.values() if isinstance(d, dict)
+                         for ex in d.get("examples", [])]
+        blocks = (DATA_DIR / "dialogues.txt").read_text("utf-8").strip().split("\n\n")
+        self.questions = [b.splitlines()[0] for b in blocks if b.strip()]
+        self.catalog = json.loads((DATA_DIR / "product_catalog.json").read_text("utf-8"))
+
+    def _catalog_flow(self, rng: random.Random) -> Script:
+        cat = rng.choice(list(self.catalog))
+        sub = rng.choice(list(self.catalog[cat]))
+        kind = rng.random()
+        if kind < 0.3:
+            return ["покажи каталог", cat.lower(), sub.lower()] + ["ещё"] * rng.randint(1, 4)
+        if kind < 0.5:
+            return [rng.choice(["я так устал, плохо спал", "болит спина", "у нас ремонт квартиры"]),
+                    rng.choice(["да", cat.lower()]), sub.lower(), "ещё"]
+        if kind < 0.75:
+            return [f"{cat.lower()} до {rng.randrange(8, 60) * 1000}"] + ["ещё"] * rng.randint(0, 2)
+        return [cat.lower(), sub.lower(), "ещё", "ещё"]
+
+    def _game_flow(self, rng: random.Random) -> Script:
+        cells = [f"{c}{r}" for c in "ABC" for r in "123"]
+        rng.shuffle(cells)
+        return ["давай сыграем в крестики"] + cells[:rng.randint(2, 5)]
+
+    def _teach_flow(self, rng: random.Random) -> Script:
+        word = "".join(rng.choice("абвгдежзиклмнопрстуф") for _ in range(rng.randint(5, 9)))
+        return [f"{word}?", rng.choice(self.examples)]
+
+    def script(self, rng: random.Random, length: int) -> Script:
+        out: Script = []
+        flows = (
+            (0.40, lambda: [rng.choice(self.examples) for _ in range(rng.randint(1, 4))]),
+            (0.25, lambda: [rng.choice(self.questions) for _ in range(rng.randint(1, 3))]),
+            (0.20, lambda: self._catalog_flow(rng)),
+            (0.10, lambda: self._game_flow(rng)),
+            (0.05, lambda: self._teach_flow(rng)),
+        )
+        while len(out) < length:
+            x = rng.random()
+            for share, flow in flows:
+                if x < share:
+                    out.extend(flow())
+                    break
+                x -= share
+        return out[:length]
+
+
+def synthetic_users(users: int, messages: int, seed: int) -> Dict[str, Script]:
+    factory = ScriptFactory()
+    return {f"u{i}": factory.script(random.Random(f"{seed}:{i}"), messages) for i in range(users)}
+
+
+# ───────────── записанные диалоги ─────────────
+PII_RE = [
+    (re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+"), "<email>"),
+    (re.compile(r"https?://\S+|www\.\S+"), "<url>"),
+    (re.compile(r"@\w{3,}"), "<nick>"),
+    (re.compile(r"\+?\d[\d\s()\-]{8,}\d"), "<number>"),
+]
+
+
+def scrub(text: str) -> str:
+    for pattern, repl in PII_RE:
+        text = pattern.sub(repl, text)
+    return text
+
+
+def read_history_dir(path: Path) -> Dict[str, Script]:
+    """user_memory/: history_<id>.json → {id: реплики пользователя}."""
+    return {
+        f.stem.removeprefix("history_"): [m for m in json.loads(f.read_text("utf-8")) if isinstance(m, str)]
+        for f in sorted(path.glob("history_*.json"))
+    }
+
+
+def read_logs(path: Path) -> Dict[str, Script]:
+    if path.is_dir():
+        return read_history_dir(path)
+    users: Dict[str, Script] = defaultdict(list)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                rec = json.loads(line)
+                users[str(rec["user"])].append(rec["text"])
+    return dict(users)
+
+
+def anonymize(src: Path, out: Path, salt: str) -> None:
+    users = read_logs(src)
+    with open(out, "w", encoding="utf-8") as f:
+        for uid, texts in users.items():
+            alias = hashlib.sha256(f"{salt}:{uid}".encode()).hexdigest()[:12]
+            for text in texts:
+                f.write(json.dumps({"user": alias, "text": scrub(text)}, ensure_ascii=False) + "\n")
+    print(f"✓ {len(users)} пользователей, {sum(map(len, users.values()))} реплик → {out}")
+
+
+# ───────────── цели ─────────────
+def engine_target(tmp: Path) -> Tuple[Respond, Callable[[], None]]:
+    from bench_get_response import build_engine
+
+    engine = build_engine(tmp / "custom_intents.json")
+
+    def respond(text: str, user_data: dict, history: deque) -> Tuple[str, str]:
+        return engine.respond(text, user_data, history), engine.last_stage
+
+    return respond, engine.journal.close
+
+
+def bot_target(tmp: Path) -> Tuple[Respond, Callable[[], None]]:
+    import bot_logic
+
+    engine = bot_logic.RESOURCES.get("engine")
+
+    def respond(text: str, user_data: dict, history: deque) -> Tuple[str, str]:
+        return bot_logic.get_response(text, user_data, history), engine.last_stage
+
+    return respond, lambda: None
+
+
+# ───────────── прогон ─────────────
+def rss_mb(field: str) -> float:
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(respond: Respond, users: Dict[str, Script], concurrency: int) -> Tuple[Dict[str, List[float]], float]:
+    """{стадия: [задержки, сек]} и время всего прогона."""
+    pending: queue.Queue = queue.Queue()
+    for uid, script in users.items():
+        if script:
+            pending.put((uid, iter(script), {}, deque(maxlen=50)))
+    lat: Dict[str, List[float]] = defaultdict(list)
+    lock = threading.Lock()
+
+    def worker() -> None:
+        local: Dict[str, List[float]] = defaultdict(list)
+        while True:
+            try:
+                uid, script, user_data, history = pending.get_nowait()
+            except queue.Empty:
+                break
+            text = next(script, None)
+            if text is None:
+                continue
+            t0 = time.perf_counter()
+            try:
+                reply, stage = respond(text, user_data, history)
+            except Exception as e:                  # в боте его поймал бы error-handler
+                reply, stage = "", f"error:{type(e).__name__}"
+            local[stage].append(time.perf_counter() - t0)
+            history.append(text)                    # как telegram_bot: только реплики пользователя
+            pending.put((uid, script, user_data, history))
+        with lock:
+            for stage, xs in local.items():
+                lat[stage].extend(xs)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=worker, name=f"user-{i}") for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return dict(lat), time.perf_counter() - t0
+
+
+def percentiles(xs: List[float]) -> Dict[str, float]:
+    xs = sorted(xs)
+    out = {f"p{p}": round(xs[min(len(xs) - 1, int(len(xs) * p / 100))] * 1e3, 4) for p in PERCENTILES}
+    out["count"] = len(xs)
+    return out
+
+
+def summarize(lat: Dict[str, List[float]], wall: float, rss_before: float, meta: dict) -> dict:
+    total = sum(map(len, lat.values()))
+    return {
+        "meta": meta,
+        "messages": total,
+        "seconds": round(wall, 3),
+        "msgs_per_sec": round(total / wall, 1) if wall else 0.0,
+        "latency_ms": {"all": percentiles([x for xs in lat.values() for x in xs]),
+                       **{stage: percentiles(xs) for stage, xs in sorted(lat.items())}},
+        "rss_mb": {"before": round(rss_before, 1), "peak": round(rss_mb("VmHWM"), 1)},
+    }
+
+
+def print_report(res: dict) -> None:
+    print(f"{res['messages']} сообщений за {res['seconds']:.2f} s → {res['msgs_per_sec']:.1f} msgs/sec, "
+          f"RSS {res['rss_mb']['before']:.0f} → пик {res['rss_mb']['peak']:.0f} MiB")
+    print(f"  {'стадия':<18}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    rows = sorted(res["latency_ms"].items(), key=lambda kv: (kv[0] != "all", -kv[1]["count"]))
+    for stage, p in rows:
+        print(f"  {stage:<18}{p['count']:>7}{p['p50']:>10.3f}{p['p95']:>10.3f}{p['p99']:>10.3f}")
+
+
+def compare(res: dict, base: dict, tolerance: float) -> List[str]:
+    """Список регрессий относительно baseline (пустой — всё в пределах допуска)."""
+    problems = []
+    for key in ("source", "users", "messages_per_user", "concurrency", "target"):
+        if res["meta"].get(key) != base["meta"].get(key):
+            print(f"! {key}: {res['meta'].get(key)} против {base['meta'].get(key)} в baseline — "
+                  "нагрузка не та же, сравнение условное")
+    if res["msgs_per_sec"] < base["msgs_per_sec"] * (1 - tolerance):
+        problems.append(f"msgs/sec {res['msgs_per_sec']} < {base['msgs_per_sec']} − {tolerance:.0%}")
+    for stage, b in base["latency_ms"].items():
+        r = res["latency_ms"].get(stage)
+        if r is None or min(r["count"], b["count"]) < MIN_STAGE_COUNT:
+            continue
+        limit = b["p95"] * (1 + tolerance) + P95_SLACK_MS
+        if r["p95"] > limit:
+            problems.append(f"{stage}: p95 {r['p95']:.3f} ms > {limit:.3f} ms (baseline {b['p95']:.3f})")
+    if res["rss_mb"]["peak"] > base["rss_mb"]["peak"] * (1 + tolerance):
+        problems.append(f"пик RSS {res['rss_mb']['peak']} MiB > {base['rss_mb']['peak']} MiB + {tolerance:.0%}")
+    return problems
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    r = sub.add_parser("run", help="нагрузочный прогон")
+    r.add_argument("--users", type=int, default=200)
+    r.add_argument("--messages", type=int, default=20, help="реплик на синтетического пользователя")
+    r.add_argument("--concurrency", type=int, default=8, help="потоков-обработчиков")
+    r.add_argument("--seed", type=int, default=1)
+    r.add_argument("--target", choices=("engine", "bot"), default="engine")
+    r.add_argument("--logs", type=Path, help="JSONL из anonymize или каталог user_memory/")
+    r.add_argument("--save", type=Path, help="записать результат как JSON-baseline")
+    r.add_argument("--compare", type=Path, help="сравнить с baseline, exit 1 при регрессии")
+    r.add_argument("--tolerance", type=float, default=0.25, help="допустимое ухудшение (доля)")
+
+    a = sub.add_parser("anonymize", help="user_memory/ или JSONL → обезличенный JSONL")
+    a.add_argument("src", type=Path)
+    a.add_argument("out", type=Path)
+    a.add_argument("--salt", default=os.getenv("LOAD_TEST_SALT", ""),
+                   help="соль псевдонимов (по умолчанию $LOAD_TEST_SALT)")
+    args = ap.parse_args()
+
+    if args.cmd == "anonymize":
+        anonymize(args.src, args.out, args.salt)
+        return
+
+    users = read_logs(args.logs) if args.logs else synthetic_users(args.users, args.messages, args.seed)
+    random.seed(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        respond, close = (engine_target if args.target == "engine" else bot_target)(Path(tmp))
+        rss_before = rss_mb("VmRSS")
+        lat, wall = run(respond, users, args.concurrency)
+        close()
+
+    meta = dict(
+        source=str(args.logs) if args.logs else "synthetic", users=len(users),
+        messages_per_user=None if args.logs else args.messages, concurrency=args.concurrency,
+        seed=args.seed, target=args.target, python=platform.python_version(),
+        cpus=os.cpu_count(), date=datetime.now().isoformat(timespec="seconds"),
+    )
+    res = summarize(lat, wall, rss_before, meta)
+    print_report(res)
+    if args.save:
+        args.save.write_text(json.dumps(res, ensure_ascii=False, indent=1), "utf-8")
+        print(f"✓ baseline → {args.save}")
+    if args.compare:
+        problems = compare(res, json.loads(args.compare.read_text("utf-8")), args.tolerance)
+        for p in problems:
+            print(f"✗ {p}")
+        print("регрессий нет" if not problems else f"регрессий: {len(problems)}")
+        sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
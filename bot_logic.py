@@ -4,10 +4,10 @@
 #     → конверсия в OGG/Opus  → voice-сообщение в Telegram.
 # ---------------------------------------------------------------------------
 
-import os, json, random, re, pyttsx3
-from datetime import datetime
+import os, json, re, signal, time, functools
 from pathlib   import Path
-from collections import deque
+from collections import Counter, deque
+from types import SimpleNamespace
 
 from dotenv import load_dotenv
 from telegram import Update
@@ -17,13 +17,18 @@ from telegram.ext import (
 from pydub import AudioSegment
 
 # ────────── внутренние модули ──────────────────────────────────────────────
-from modules.tictactoe import TicTacToe
-from nlp_utils          import clean_text, lemmatize_text, correct_spelling
+from nlp_utils          import NormalizedText, normalized, build_lemma_table, warmup
+from spell_index         import SpellIndex
 from intent_classifier   import IntentClassifier
-from sentiment           import get_sentiment
-from recommendations     import recommend
+from online_learner      import OnlineIntentLearner
+from model_registry      import ModelRegistry, ModelReloader
 from dialogue_retrieval  import DialogueRetriever
-from audio_utils         import stt_from_wav                 # офлайн-Vosk
+from response_rules      import ResponseEngine
+from intent_journal      import IntentJournal
+from catalog_index       import CatalogIndex
+from resources           import ResourceManager
+from update_pipeline     import UpdatePipeline
+import metrics
 
 # ────────── окружение / каталоги ───────────────────────────────────────────
 load_dotenv()
@@ -35,304 +40,265 @@ INTENTS_F = DATA_DIR / "intents_dataset.json"
 CUSTOM_F  = DATA_DIR / "custom_intents.json"
 CATALOG_F = DATA_DIR / "product_catalog.json"
 DIALOG_F  = DATA_DIR / "dialogues.txt"
+DIALOG_DB = DATA_DIR / "dialogues.db"       # python dialogue_store.py import … --lemmatize
+
+ADMIN_IDS = {int(x) for x in os.getenv("ADMIN_IDS", "").replace(",", " ").split()}
+
+# ────────── данные и ML-модели: грузятся в фоне (resources.py) ──────────────
+# текст обслуживается, как только готов "engine"; Vosk и TTS — lazy,
+# поднимаются при первом голосовом / первом voice-ответе
+RESOURCES = ResourceManager()
+
+# выученные в fallback интенты: снимок CUSTOM_F + журнал, при открытии сжимается
+# в CUSTOM_F (его же читает точный индекс классификатора)
+@RESOURCES.register("journal")
+def _load_journal():
+    return IntentJournal(CUSTOM_F)
+
+@RESOURCES.register("intents", deps=("journal",))
+def _load_intents(journal):
+    intents = json.loads(INTENTS_F.read_text('utf-8'))
+    intents.update(journal.entries())
+    return intents
+
+@RESOURCES.register("catalog")
+def _load_catalog():
+    # числовые цены, массивы по (под)категориям и атрибутам, готовые карточки
+    return CatalogIndex(json.loads(CATALOG_F.read_text('utf-8')))
+
+@RESOURCES.register("natasha")
+def _load_natasha():
+    warmup()
+
+@RESOURCES.register("classifier", deps=("natasha", "journal"))
+def _load_classifier(*_):
+    registry = ModelRegistry()                 # models/intent/vNNNN + CURRENT
+    clf      = IntentClassifier(DATA_DIR, cascade=True)
+    version  = registry.current()
+    if version is not None:
+        try:
+            registry.verify(version)           # как ModelReloader: битую версию не грузим
+        except ValueError as e:
+            print(f"[registry] {e} — грузим исходную модель")
+            version = None
+    clf.load(model_dir=version and registry.path(version))
+    learner  = OnlineIntentLearner(clf)        # дообучение на новых интентах (фон)
+    reloader = ModelReloader(clf, registry, learner)   # горячая подмена версии
+    return SimpleNamespace(registry=registry, clf=clf, learner=learner, reloader=reloader)
+
+@RESOURCES.register("retriever", deps=("natasha",))
+def _load_retriever(_):
+    # запрос приходит леммами (NormalizedText.lemma) — база должна быть импортирована
+    # с --lemmatize, иначе сравнивали бы леммы с lower()-вопросами
+    if DIALOG_DB.exists():
+        try:
+            return DialogueRetriever(str(DIALOG_DB), lemmatize=True)
+        except ValueError as e:
+            print(f"[retriever] {e} — беру {DIALOG_F.name}; "
+                  f"пересоберите базу: python dialogue_store.py import … --lemmatize")
+    return DialogueRetriever(str(DIALOG_F), lemmatize=True)
+
+@RESOURCES.register("speller", deps=("intents",))
+def _load_speller(intents):
+    # словарь для исправления опечаток: слово → частота (tie-break в SpellIndex)
+    word_freq = Counter(ex.lower() for d in intents.values() if isinstance(d, dict)
+                                   for ex in d.get("examples", []))
+    if DIALOG_F.exists():
+        for ln in DIALOG_F.read_text('utf-8').splitlines():
+            word_freq.update(re.findall(r"[а-яёa-z]+", ln.lower()))
+    speller = SpellIndex(word_freq)
+    NormalizedText.speller = speller        # corrected / lemma — с исправлением опечаток
+    return speller
+
+# токен → лемма для известного словаря: такие фразы лемматизируются без теггера.
+# Только с LEMMA_TABLE=1: на фразах вне корпуса леммы таблицы могут
+# расходиться с теггером (см. build_lemma_table).
+# После классификатора и корпуса диалогов — их примеры лемматизируются
+# теггером, как и раньше, когда таблица строилась после них.
+@RESOURCES.register("lemma_table", deps=("intents", "classifier", "retriever"))
+def _load_lemma_table(intents, *_):
+    if os.getenv("LEMMA_TABLE") != "1":
+        return
+    build_lemma_table([ex for d in intents.values() if isinstance(d, dict)
+                          for ex in d.get("examples", [])]
+                      + (DIALOG_F.read_text('utf-8').splitlines() if DIALOG_F.exists() else []))
+
+@RESOURCES.register("engine", deps=("intents", "catalog", "classifier", "retriever", "journal",
+                                    "speller", "lemma_table"))
+def _load_engine(intents, catalog, models, retriever, journal, *_):
+    # стадии — таблица правил response_rules.ResponseEngine (регэкспы, тексты
+    # по категориям и т. п. собираются один раз здесь, а не на каждое сообщение)
+    engine = ResponseEngine(intents, catalog, models.clf, retriever, models.learner, journal)
+    NormalizedText.matcher = engine.matcher     # общий автомат ключевых слов (и для smalltalk-фильтра)
+    return engine
+
+# ────────── TTS (pyttsx3 → WAV) и STT (Vosk) — по первому требованию ─────────
+@RESOURCES.register("tts", lazy=True)
+def _load_tts():
+    import pyttsx3
+    tts = pyttsx3.init()
+    for v in tts.getProperty("voices"):
+        if "russian" in v.name.lower() and "male" in v.name.lower():
+            tts.setProperty("voice", v.id); break
+    tts.setProperty("rate", 140)
+    return tts
+
+@RESOURCES.register("stt", lazy=True)
+def _load_stt():
+    from audio_utils import stt_from_wav                 # офлайн-Vosk: модель грузится при импорте
+    return stt_from_wav
+
+RESOURCES.start()
+metrics.set_readiness(lambda: (RESOURCES.ready("engine"), RESOURCES.status()))
+
+# ────────── конвейер апдейтов: очередь на чат + пулы io / nlp / stt / tts ─────
+# (update_pipeline.py; размеры — PIPELINE_*_WORKERS, PIPELINE_MAX_PENDING)
+PIPELINE = UpdatePipeline.from_env(
+    on_overflow=lambda update: update.message.reply_text(
+        "Не успеваю за вами 🙂 Дождитесь ответа на предыдущие сообщения."),
+)
 
-# ────────── данные и ML-модели ─────────────────────────────────────────────
-INTENTS = json.loads(INTENTS_F.read_text('utf-8'))
-if CUSTOM_F.exists():
-    INTENTS.update(json.loads(CUSTOM_F.read_text('utf-8')))
-PRODUCT_CATALOG = json.loads(CATALOG_F.read_text('utf-8'))
-
-clf       = IntentClassifier(DATA_DIR);  clf.load()
-retriever = DialogueRetriever(str(DIALOG_F))
-
-DICTIONARY = {ex.lower() for d in INTENTS.values() if isinstance(d, dict)
-                             for ex in d.get("examples", [])}
-if DIALOG_F.exists():
-    for ln in DIALOG_F.read_text('utf-8').splitlines():
-        DICTIONARY.update(re.findall(r"[а-яёa-z]+", ln.lower()))
-
-# ────────── TTS (pyttsx3 → WAV) ────────────────────────────────────────────
-tts = pyttsx3.init()
-for v in tts.getProperty("voices"):
-    if "russian" in v.name.lower() and "male" in v.name.lower():
-        tts.setProperty("voice", v.id); break
-tts.setProperty("rate", 140)
+def report_startup():
+    """Ждёт текстовый контур и печатает, что сколько грузилось (аудио может ещё грузиться)."""
+    ok = RESOURCES.wait("engine")
+    took = time.perf_counter() - RESOURCES.started_at
+    print(f"[startup] {'готов к тексту' if ok else 'текстовый контур не поднялся'} "
+          f"через {took:.2f} s\n{RESOURCES.report()}")
 
 def _tts_to_wav(text: str, path: Path):
-    tts.save_to_file(text, str(path))
-    tts.runAndWait()
-
-# ────────── утилиты ────────────────────────────────────────────────────────
-def _parse_iso(ts):
-    try: return datetime.fromisoformat(ts) if isinstance(ts, str) else ts
-    except: return None
-
-def _save_custom_intents(data: dict):
-    CUSTOM_F.write_text(json.dumps(data, ensure_ascii=False, indent=4), 'utf-8')
-
-# ────────── параметры рекламы ──────────────────────────────────────────────
-AD_COOLDOWN_MSG, AD_COOLDOWN_HOURS = 3, 1
-SEASONAL_EVENTS = {"11-11":"Чёрная пятница","03-08":"8 марта","23-02":"23 февраля"}
-AD_TRIGGERS = {
-    ("сон","устал","спал"): ("Матрасы",None,"Кстати, хороший матрас творит чудеса со сном. Хочешь взглянуть?"),
-    ("спина","болит","поясница"): ("Матрасы",None,"Поможет ортопедический матрас с зональной поддержкой 😉"),
-    ("переезд","ремонт","квартир"): ("Кровати",None,"Новоселье — отличный повод обновить кровать. Подкинуть идеи?"),
-}
+    tts = RESOURCES.get("tts")
+    with metrics.TTS_SECONDS.time():
+        tts.save_to_file(text, str(path))
+        tts.runAndWait()
 
 # ────────── ГЛАВНАЯ логика ответа ──────────────────────────────────────────
-def get_response(text: str, user_data: dict, history: deque) -> str:
-    prefs      = user_data.setdefault("preferences", {})
-    custom_ans = user_data.setdefault("custom_answers", {})
-    last_int   = user_data.get("last_intent")
-    last_bot   = user_data.get("last_bot")
-
-    low        = text.lower().strip()
-    low_clean  = re.sub(r"[^а-яёa-z0-9\s]", "", low)
-
-    # счётчики / типы --------------------------------------------------------
-    user_data["asked_questions"] = set(user_data.get("asked_questions", []))
-    user_data["shown_products"]  = set(user_data.get("shown_products",  []))
-    user_data.setdefault("asked_followup", False)
-    user_data.setdefault("msgs_since_ad",   0)
-    user_data["last_ad_ts"] = _parse_iso(user_data.get("last_ad_ts"))
-
-    user_data["msgs_since_ad"] += 1
-    now = datetime.utcnow()
-    hours_since = ((now - user_data["last_ad_ts"]).total_seconds()/3600) if user_data["last_ad_ts"] else 1e9
-
-    def _can_offer(): return user_data["msgs_since_ad"]>=AD_COOLDOWN_MSG and hours_since>=AD_COOLDOWN_HOURS
-    def _offer(r): user_data.update(last_ad_ts=now.isoformat(), msgs_since_ad=0); return r
-
-    # 0. hello/bye через ML-классификатор
-    try:
-        i0 = clf.predict_intent(text)
-        if i0 in INTENTS and i0 in {"hello","bye"}:
-            r = random.choice(INTENTS[i0]["responses"])
-            user_data.update(last_intent=i0,last_bot=r)
-            return r
-    except: pass
-
-    # 1. small-talk
-    if re.search(r"\bкак\s+(дел[аи]|ты)\b", low_clean):
-        return random.choice(["У меня всё отлично, спасибо! А у тебя?","Всё хорошо, работаю не покладая транзисторов 😄 А ты?"])
-    if "настроени" in low_clean:
-        return random.choice(["Настроение супер! Как твоё?","Бодрое и весёлое. У тебя какое?"])
-
-    # 2. ожидаемый жанр
-    if user_data.get("awaiting_genre"):
-        cat   = user_data.pop("awaiting_genre")
-        reply = recommend(cat, low_clean)
-        prefs[f"{cat}_genre"] = low_clean
-        user_data.update(last_intent=cat,last_bot=reply)
-        return reply
-
-    # 3. сезонные офферы
-    if now.strftime("%m-%d") in SEASONAL_EVENTS and _can_offer():
-        return _offer(f"До {SEASONAL_EVENTS[now.strftime('%m-%d')]} скидка –25 % на матрасы. Показать варианты?")
-
-    # 4. триггерные офферы
-    for keys,(cat,sub,pitch) in AD_TRIGGERS.items():
-        if any(k in low_clean for k in keys) and _can_offer():
-            user_data.update(expect_more=True,last_ad_category=cat,last_ad_subcategory=sub,ad_offer_shown=True)
-            if sub:
-                prod=random.choice(PRODUCT_CATALOG[cat][sub])
-                return _offer(pitch+f"\n\n*{prod['name']}*\n{prod['description']}\nЦена: {prod['price']} ₽\nПодробнее: {prod['link']}")
-            user_data["awaiting_ad_choice"]=True
-            return _offer(pitch)
-
-    # 5. сброс режима «ещё»
-    if user_data.get("expect_more") and low not in {"еще","ещё","еще раз","ещё раз"}:
-        user_data["expect_more"]=False; user_data["shown_products"].clear()
-
-    # 6. прямое упоминание категории
-    for cat in PRODUCT_CATALOG:
-        if re.search(rf"\b{cat.lower()}\b", low_clean):
-            user_data.pop("awaiting_ad_choice",None)
-            user_data.update(shop_cat=cat, ad_offer_shown=True)
-            return f"Отлично! Какие именно {cat.lower()} интересуют: {', '.join(PRODUCT_CATALOG[cat])}?"
-
-    # 7. явная команда каталога
-    def _catalog_offer():
-        user_data["awaiting_ad_choice"]=True
-        return "В каталоге есть отличные **кровати** и **матрасы**. Что интереснее?"
-    if any(cmd in low for cmd in ("/catalog","каталог","товары")) and _can_offer():
-        user_data["ad_offer_shown"]=True
-        return _offer(_catalog_offer())
-
-    # 8. авто-оффер
-    if len(history)>=3 and not user_data.get("ad_offer_shown") and not user_data.get("awaiting_ad_choice") and _can_offer():
-        user_data["ad_offer_shown"]=True
-        return _offer(_catalog_offer())
-
-    # 9. выбор категории
-    if user_data.get("awaiting_ad_choice"):
-        if low_clean in {"нет","не","неа","no"}:
-            user_data.pop("awaiting_ad_choice"); user_data["ad_offer_shown"]=True
-            return "Хорошо! Скажи, когда захочешь посмотреть каталог 🙂"
-        for cat in PRODUCT_CATALOG:
-            if low_clean==cat.lower():
-                user_data.update(shop_cat=cat); user_data.pop("awaiting_ad_choice")
-                return f"Какие именно {cat.lower()} интересуют: {', '.join(PRODUCT_CATALOG[cat])}?"
-        user_data.pop("awaiting_ad_choice")
-
-    # 10. первая рекомендация
-    if "shop_cat" in user_data and "shop_sub" not in user_data:
-        cat=user_data["shop_cat"]
-        for sub in PRODUCT_CATALOG[cat]:
-            if low_clean in {sub.lower(),*sub.lower().split()}:
-                user_data.update(last_ad_category=cat,last_ad_subcategory=sub,expect_more=True)
-                prod=random.choice(PRODUCT_CATALOG[cat][sub])
-                user_data["shown_products"].add(prod["name"])
-                user_data.pop("shop_cat")
-                return f"Рекомендую: *{prod['name']}*\n\n{prod['description']}\n\nЦена: {prod['price']} ₽\nПодробнее: {prod['link']}"
-
-    # 11. «ещё»
-    if user_data.get("expect_more") and low in {"еще","ещё","еще раз","ещё раз"}:
-        cat,sub=user_data["last_ad_category"], user_data["last_ad_subcategory"]
-        rest=[p for p in PRODUCT_CATALOG[cat][sub] if p["name"] not in user_data["shown_products"]]
-        if not rest:
-            user_data["expect_more"]=False; user_data["shown_products"].clear()
-            return "Пожалуй, это все лучшие варианты 😉"
-        prod=random.choice(rest); user_data["shown_products"].add(prod["name"])
-        return f"Ещё вариант: *{prod['name']}*\n\n{prod['description']}\n\nЦена: {prod['price']} ₽\nПодробнее: {prod['link']}"
-
-    # 12. интерактивное обучение
-    if waiting:=user_data.get("awaiting_teach"):
-        custom_ans[waiting]=text; user_data.pop("awaiting_teach")
-        return random.choice(["Спасибо, запомнил!","Отлично, принял к сведению!"])
-    if text in custom_ans:
-        return custom_ans[text]
-
-    # 13. «Любимое X»
-    if "awaiting_pref_topic" in user_data:
-        prefs[user_data.pop("awaiting_pref_topic")]=text
-        return f"Спасибо! Запомнил, что тебе нравится {text}."
-    if (m:=re.search(r"любим(?:ое|ая|ый|ые)\s+([\w\-а-яё]+)", low_clean)):
-        k=f"favorite_{m.group(1)}"
-        if k in prefs: return f"Мне нравится {prefs[k]}."
-        user_data["awaiting_pref_topic"]=k
-        return f"А что тебе больше всего нравится в плане {m.group(1)}?"
-
-    # 14. encore («ещё»)
-    if low in {"еще","ещё","еще раз","ещё раз"}:
-        if last_int in {"joke","anecdote","fun_fact","fact"}:
-            pool=[r for r in INTENTS[last_int]["responses"] if r!=last_bot]
-            return random.choice(pool) if pool else random.choice(INTENTS[last_int]["responses"])
-        if last_int in {"music","movie","game","series"}:
-            return recommend(last_int, prefs.get(f"{last_int}_genre"))
-
-    # 15. крестики-нолики
-    if "крестики" in low:
-        user_data["tic_tac_toe"]=TicTacToe()
-        return "Начинаем «крестики-нолики»!\n"+user_data['tic_tac_toe'].render()+"\nТвой ход (A1..C3):"
-
-    # 16. жанр после follow-up
-    for cat in {"music","movie","game","series"}:
-        if last_int==cat and f"{cat}_genre" not in prefs:
-            rec=recommend(cat, text.strip()); prefs[f"{cat}_genre"]=text.strip()
-            user_data["last_bot"]=rec
-            return rec
-
-    # 17. sentiment + intent-predict
-    lemma = lemmatize_text(
-        " ".join(correct_spelling(w, DICTIONARY) for w in clean_text(text).split())
-    )
-    tone = "Мне жаль, что тебе грустно. " if get_sentiment(lemma)<-0.2 else \
-           "Рад за тебя! "                if get_sentiment(lemma)>0.5  else ""
-
-    intent=None
-    for p in (lambda x: clf.predict(x), lambda x: clf.predict_fuzzy(x)):
-        try:
-            c=p(lemma)
-            if c in INTENTS: intent=c; break
-        except: pass
-
-    if intent in {"music","movie","game","series"}:
-        user_data.update(last_intent=intent, asked_followup=True, awaiting_genre=intent)
-        return INTENTS[intent]["follow_up"][0]
-
-    if intent:
-        opts=INTENTS[intent]["responses"]
-        if last_bot in opts and len(opts)>1: opts=[o for o in opts if o!=last_bot]
-        resp=random.choice(opts)
-        user_data["last_bot"]=resp
-        if not user_data["asked_followup"]:
-            for f in INTENTS[intent].get("follow_up", []):
-                if f not in user_data["asked_questions"]:
-                    resp+=" "+f
-                    user_data["asked_questions"].add(f)
-                    user_data["asked_followup"]=True
-                    break
-        user_data["last_intent"]=intent
-        return tone+resp
-
-    # 18. retrieval-ответ
-    cand=retriever.get_answer(lemma)
-    if cand:
-        user_data.update(last_bot=cand,last_intent=None)
-        return tone+cand
-
-    # 19. fallback → обучение
-    cid=f'c{re.sub(r"[^a-z0-9]","",low_clean) or "intent"}'
-    new_i={"examples":[text],"responses":["Я пока не знаю, как на это ответить. Подскажите пример ответа?"]}
-    extra=json.loads(CUSTOM_F.read_text('utf-8')) if CUSTOM_F.exists() else {}
-    extra[cid]=new_i; _save_custom_intents(extra); INTENTS[cid]=new_i
-    user_data["awaiting_teach"]=text
-    return "Я пока не знаю, как на это отвечать. Подскажите пример ответа?"
+def get_response(text: str | NormalizedText, user_data: dict, history: deque,
+                 modality: str = "text") -> str:
+    return RESOURCES.get("engine").respond(text, user_data, history, modality=modality)
 
 # ────────── helper: отправить voice-сообщение ───────────────────────────────
-def _reply_voice(update: Update, reply_text: str, stub: str):
+def _encode_voice(reply_text: str, stub: str) -> Path:
+    """pyttsx3 → WAV → OGG/Opus (пул tts)."""
     wav = TEMP_DIR / f"{stub}.wav"
     ogg = TEMP_DIR / f"{stub}.ogg"
     _tts_to_wav(reply_text, wav)
-    AudioSegment.from_wav(wav).export(ogg, format="ogg", codec="libopus", bitrate="48k")
+    with metrics.AUDIO_SECONDS.time("wav_to_ogg"):
+        AudioSegment.from_wav(wav).export(ogg, format="ogg", codec="libopus", bitrate="48k")
+    return ogg
+
+def _send_voice(update: Update, ogg: Path, caption: str):
     with open(ogg, "rb") as f:
-        update.message.reply_voice(voice=f, caption=reply_text)
+        update.message.reply_voice(voice=f, caption=caption)
+
+async def _reply_voice(update: Update, reply_text: str, stub: str):
+    if not RESOURCES.ready("tts"):                 # синтезатор ещё грузится — отвечаем текстом
+        RESOURCES.ensure("tts")
+        return await PIPELINE.io(update.message.reply_text, reply_text)
+    ogg = await PIPELINE.tts(_encode_voice, reply_text, stub)
+    await PIPELINE.io(_send_voice, update, ogg, reply_text)
+
+def _decode_voice(src: Path, wav_in: Path) -> str:
+    """ffmpeg → WAV 16 kHz → Vosk (пул stt)."""
+    # корректная конверсия: 48k/opus → 16k 16-bit mono, +6 dB
+    with metrics.AUDIO_SECONDS.time("ogg_to_wav"):
+        audio = AudioSegment.from_file(src)
+        audio = (audio.set_frame_rate(16000)
+                       .set_channels(1)
+                       .set_sample_width(2)   # 16-bit
+                       .apply_gain(+6))       # чуточку громче
+        audio.export(wav_in, format="wav")
+    with metrics.STT_SECONDS.time():
+        return RESOURCES.get("stt")(str(wav_in))
 
 # ────────── Telegram-handlers ───────────────────────────────────────────────
-def handle_voice(update: Update, context: CallbackContext):
+# handle_voice / handle_text — обычные callback-и Dispatcher-а: апдейт уходит
+# в очередь своего чата (update_pipeline.py), поток Dispatcher-а не ждёт
+# ни сети, ни ffmpeg/Vosk/pyttsx3
+@PIPELINE.handler
+async def handle_voice(update: Update, context: CallbackContext):
+    reply = functools.partial(PIPELINE.io, update.message.reply_text)
     au = update.message.voice or update.message.audio or update.message.document
     if not au:
-        return update.message.reply_text("Не смог получить аудио.")
+        return await reply("Не смог получить аудио.")
+    if not RESOURCES.ready("stt"):
+        if RESOURCES.status()["stt"]["state"] == "failed":
+            return await reply("Распознавание речи недоступно — напишите, пожалуйста, текстом.")
+        RESOURCES.ensure("stt")
+        return await reply(
+            "Загружаю модель распознавания речи — пришлите голосовое ещё раз через минуту "
+            "или напишите текстом."
+        )
     fid = getattr(au, "file_unique_id", None) or update.message.message_id
     src = TEMP_DIR / f"{fid}.src"
     wav_in = TEMP_DIR / f"{fid}.in.wav"
-    au.get_file().download(str(src))
-    # корректная конверсия: 48k/opus → 16k 16-bit mono, +6 dB
-    audio = AudioSegment.from_file(src)
-    audio = (audio.set_frame_rate(16000)
-                   .set_channels(1)
-                   .set_sample_width(2)   # 16-bit
-                   .apply_gain(+6))       # чуточку громче
-    audio.export(wav_in, format="wav")
+    await PIPELINE.io(lambda: au.get_file().download(str(src)))
 
     try:
-        user_text = stt_from_wav(str(wav_in))
+        user_text = await PIPELINE.stt(_decode_voice, src, wav_in)
     except Exception as e:
-        return update.message.reply_text(f"Ошибка распознавания: {e}")
+        return await reply(f"Ошибка распознавания: {e}")
 
     # ⬇️ Новая проверка
     if not user_text.strip():
-        return update.message.reply_text(
+        return await reply(
             "Извините, не расслышал – попробуйте ещё раз произнести чуть отчётливее."
         )
 
-    update.message.reply_text(f"🗣 Вы сказали: {user_text}")
+    await reply(f"🗣 Вы сказали: {user_text}")
 
     ud=context.user_data; hist=ud.setdefault("history",deque(maxlen=50))
-    bot_text=get_response(user_text, ud, hist); hist.extend((user_text, bot_text))
-    _reply_voice(update, bot_text, f"{fid}_resp")
+    bot_text=await PIPELINE.nlp(get_response, user_text, ud, hist, modality="voice")
+    hist.extend((user_text, bot_text))
+    await _reply_voice(update, bot_text, f"{fid}_resp")
 
-def handle_text(update: Update, context: CallbackContext):
+@PIPELINE.handler
+async def handle_text(update: Update, context: CallbackContext):
     user_text = update.message.text
-    update.message.reply_text(f"🗣 Вы сказали: {user_text}")
+    await PIPELINE.io(update.message.reply_text, f"🗣 Вы сказали: {user_text}")
     ud=context.user_data; hist=ud.setdefault("history",deque(maxlen=50))
-    bot_text=get_response(user_text, ud, hist); hist.extend((user_text, bot_text))
-    _reply_voice(update, bot_text, f"{update.message.message_id}_resp")
+    bot_text=await PIPELINE.nlp(lambda: get_response(normalized(update), ud, hist))
+    hist.extend((user_text, bot_text))
+    await _reply_voice(update, bot_text, f"{update.message.message_id}_resp")
 
 def start(update: Update,_): update.message.reply_text("Привет! Пришлите текст или голос — отвечу голосом 🙂")
 def help_command(update: Update,_): update.message.reply_text("Я распознаю речь (Vosk) и отвечаю voice-сообщением.")
 
+# ────────── горячая перезагрузка модели ─────────────────────────────────────
+def reload_command(update: Update, context: CallbackContext):
+    """/reload_model [vNNNN|rollback] — только для ADMIN_IDS."""
+    if update.effective_user.id not in ADMIN_IDS:
+        return update.message.reply_text("Команда доступна только администратору.")
+    models = RESOURCES.get("classifier")
+    registry, reloader = models.registry, models.reloader
+    arg = context.args[0] if context.args else None
+    if arg == "rollback":
+        if not reloader.history:
+            return update.message.reply_text("Откатываться некуда.")
+        arg = reloader.history[-1]
+    elif arg is None:
+        arg = registry.latest()
+    if arg is None:
+        return update.message.reply_text("Реестр моделей пуст.")
+    update.message.reply_text(f"Загружаю {arg} в фоне (сейчас активна {reloader.active or 'исходная'})…")
+
+    def _run():
+        rep = reloader.reload(arg, wait=True)
+        update.message.reply_text(
+            f"✓ Активна {rep['version']}, прогрев acc {rep['warmup_acc']:.3f}" if rep["ok"]
+            else f"✗ {rep['version']}: {rep['error']}. Осталась {reloader.active or 'исходная'}."
+        )
+    context.dispatcher.run_async(_run)
+
+def install_reload_signal():
+    """SIGHUP → перезагрузить самую свежую версию из реестра (где сигнал есть)."""
+    def _on_hup(*_):
+        if RESOURCES.ready("classifier"):
+            RESOURCES.get("classifier").reloader.reload()
+        else:
+            print("[reload] классификатор ещё загружается — SIGHUP пропущен")
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, _on_hup)
+
 # ────────── main() ─────────────────────────────────────────────────────────-
 def main():
     token=os.getenv("TELEGRAM_TOKEN")
@@ -342,9 +308,17 @@ def main():
     dp=up.dispatcher
     dp.add_handler(CommandHandler("start", start))
     dp.add_handler(CommandHandler("help",  help_command))
+    dp.add_handler(CommandHandler("reload_model", reload_command))
     dp.add_handler(MessageHandler(Filters.text & ~Filters.command, handle_text))
     dp.add_handler(MessageHandler(Filters.voice | Filters.audio | Filters.document, handle_voice))
-    up.start_polling(); up.idle()
+    install_reload_signal()
+    metrics.configure_from_env()                 # METRICS_PORT / METRICS_FILE
+    PIPELINE.attach(dp)                          # все хэндлеры апдейта — в очереди его чата
+    PIPELINE.start()
+    up.start_polling()                           # апдейты ждут "engine" в get_response
+    report_startup()
+    up.idle()
+    PIPELINE.stop()                              # доотвечаем на то, что уже в очередях
 
 if __name__=="__main__":
     main()
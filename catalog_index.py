@@ -0,0 +1,309 @@
+"""
+catalog_index.py
+────────────────
+Индекс каталога товаров (product_catalog.json), собирается один раз при загрузке.
+
+    index = CatalogIndex(json.load(...))      # {категория: {подкатегория: [товары]}}
+    index.pick("Матрасы", "Детские")          # случайный товар подкатегории
+    index.pick_unshown(cat, sub, shown_names) # «ещё»: случайный из непоказанных
+    total, page = index.filter("Матрасы", hi=20000, limit=3)
+
+• товары лежат в одном списке products (id = позиция), у каждого —
+  числовая цена ("13 674" → 13674) и заранее собранные карточки
+• категория / подкатегория → массив id в порядке каталога, поэтому
+  random.choice по нему тянет те же товары, что и по сырому списку
+• срезы (всё, категория, подкатегория, значение атрибута — во всём
+  каталоге и в категории) отсортированы по цене: фильтр «от / до» —
+  два bisect, страница — срез массива
+• атрибуты (facets): brand и size выводятся из названия и ссылки,
+  остальные строковые поля товара берутся как есть
+• курсор «ещё» — позиции показанных товаров в подкатегории: k-й
+  непоказанный находится за O(число показанных), без пересборки списка
+
+    python catalog_index.py "матрас до 20000 руб"     # разбор запроса + выдача
+"""
+
+from __future__ import annotations
+
+import random
+import re
+import sys
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+#: границы ценовых диапазонов для price_facets(), ₽
+PRICE_BUCKETS = (10_000, 20_000, 30_000, 50_000, 100_000)
+
+BASE_FIELDS = frozenset({"name", "description", "price", "image", "link"})
+BRAND_RE    = re.compile(r"\b([A-Za-z][\w\-]*)")
+SIZE_RE     = re.compile(r"(\d{2,3})\s*[xх×]\s*(\d{3})")
+NUMBER      = r"(\d{1,3}(?:[ \u00a0]\d{3})+|\d+)(?:\s*(тыс\w*|к|k)\b)?"   # «20 000», «15к», «10 тыс»
+PRICE_FROM_RE = re.compile(rf"\b(?:от|не дешевле|(?<!не )дороже|больше)\s*{NUMBER}")
+PRICE_TO_RE   = re.compile(rf"\b(?:до|не дороже|(?<!не )дешевле|меньше)\s*{NUMBER}")
+PRICE_SPAN_RE = re.compile(rf"\b{NUMBER}\s*[-–—]\s*{NUMBER}")
+# без ценового слова или валюты число — не цена: «мне 25-30 лет», «спал меньше 5 часов»
+PRICE_WORD_RE = re.compile(r"цен|стои|бюджет|дешев|дорог|дорож")
+CURRENCY_RE   = re.compile(r"\s*(?:руб|р\b|₽)")
+
+
+def parse_price(value) -> Optional[int]:
+    """"13 674" / "13674 ₽" / 13674 → 13674; нечисловое → None."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    digits = re.sub(r"[^\d]", "", str(value or ""))
+    return int(digits) if digits else None
+
+
+def _number(digits: str, unit: Optional[str]) -> int:
+    n = int(re.sub(r"\s", "", digits))
+    return n * 1000 if unit else n
+
+
+def parse_price_range(text: str) -> Optional[Tuple[Optional[int], Optional[int]]]:
+    """
+    (от, до) из «до 20000 руб», «от 10 тыс», «дешевле 15к», «цена 10000-20000»;
+    None — в тексте нет ценового условия. Число считается ценой, только
+    если в тексте есть ценовое слово (цена, стоит, дешевле…) или у числа
+    валюта / «тыс», «к».
+    """
+    text = text.lower()
+    if m := PRICE_SPAN_RE.search(text):
+        lo, hi = m.group(1, 2), m.group(3, 4)
+        found = [m]
+    else:
+        m_lo, m_hi = PRICE_FROM_RE.search(text), PRICE_TO_RE.search(text)
+        if not m_lo and not m_hi:
+            return None
+        lo = m_lo.group(1, 2) if m_lo else None
+        hi = m_hi.group(1, 2) if m_hi else None
+        found = [m for m in (m_lo, m_hi) if m]
+    if not PRICE_WORD_RE.search(text) and not any(
+        any(m.groups()[1::2]) or CURRENCY_RE.match(text, m.end()) for m in found
+    ):
+        return None
+    if lo and hi and hi[1] and not lo[1]:       # «от 20 до 35 тыс» — единица общая
+        lo = (lo[0], hi[1])
+    return (_number(*lo) if lo else None), (_number(*hi) if hi else None)
+
+
+@dataclass(frozen=True)
+class Product:
+    id: int
+    category: str
+    subcategory: str
+    name: str
+    description: str
+    price: Optional[int]
+    price_text: str
+    link: str
+    image: str
+    attrs: Dict[str, str] = field(default_factory=dict)
+    card: str = ""      # «*имя*\n\nописание\n\nЦена: … ₽\nПодробнее: …» (после префикса)
+    pitch: str = ""     # вставка в рекламную реплику триггера
+    line: str = ""      # строка выдачи фильтра
+
+
+def _attrs(prod: dict) -> Dict[str, str]:
+    attrs = {k: v for k, v in prod.items() if k not in BASE_FIELDS and isinstance(v, str)}
+    if "brand" not in attrs and (m := BRAND_RE.search(prod.get("name", ""))):
+        attrs["brand"] = m.group(1)
+    if "size" not in attrs:
+        m = SIZE_RE.search(prod.get("name", "")) or SIZE_RE.search(prod.get("link", ""))
+        if m:
+            attrs["size"] = f"{m.group(1)}x{m.group(2)}"
+    return attrs
+
+
+def _stem(word: str) -> str:
+    """«матрасы» → «матрас», «ортопедические» → «ортопедическ»."""
+    return word[:max(4, len(word) - 2)] if len(word) > 4 else word
+
+
+class CatalogIndex:
+    """Товары + массивы id по категориям и атрибутам + срезы, отсортированные по цене."""
+
+    def __init__(self, catalog: Dict[str, Dict[str, List[dict]]]) -> None:
+        self.products: List[Product] = []
+        self.categories: Dict[str, List[str]] = {}
+        self._by_sub: Dict[Tuple[str, str], List[int]] = {}
+        self._by_cat: Dict[str, List[int]] = defaultdict(list)
+        self._name_pos: Dict[Tuple[str, str], Dict[str, List[int]]] = {}
+        self.facets: Dict[str, Dict[str, List[int]]] = defaultdict(lambda: defaultdict(list))
+
+        for cat, subs in catalog.items():
+            self.categories[cat] = list(subs)
+            cat_ids = self._by_cat[cat]
+            cat_names = self._name_pos[(cat, None)] = defaultdict(list)
+            for sub, items in subs.items():
+                ids = self._by_sub[(cat, sub)] = []
+                names = self._name_pos[(cat, sub)] = defaultdict(list)
+                for pos, raw in enumerate(items):
+                    prod = self._product(len(self.products), cat, sub, raw)
+                    self.products.append(prod)
+                    ids.append(prod.id)
+                    names[prod.name].append(pos)
+                    cat_names[prod.name].append(len(cat_ids))
+                    cat_ids.append(prod.id)
+                    for key, value in prod.attrs.items():
+                        self.facets[key][value].append(prod.id)
+
+        # срез → (цены по возрастанию, id в том же порядке); товары без цены не входят
+        self._sorted: Dict[tuple, Tuple[List[int], List[int]]] = {
+            (): self._by_price(range(len(self.products))),
+            **{(cat,): self._by_price(ids) for cat, ids in self._by_cat.items()},
+            **{key: self._by_price(ids) for key, ids in self._by_sub.items()},
+            **{("@" + f, v): self._by_price(ids)
+               for f, values in self.facets.items() for v, ids in values.items()},
+        }
+        for f, values in self.facets.items():           # атрибут внутри категории
+            for v, ids in values.items():
+                per_cat = defaultdict(list)
+                for i in ids:
+                    per_cat[self.products[i].category].append(i)
+                for cat, cat_ids in per_cat.items():
+                    self._sorted[("@" + f, v, cat)] = self._by_price(cat_ids)
+
+        # основы слов категорий / подкатегорий для find_category()
+        self._stems: List[Tuple[str, str, Optional[str]]] = []
+        for cat, subs in self.categories.items():
+            self._stems.extend((_stem(w), cat, None) for w in cat.lower().split())
+            for sub in subs:
+                self._stems.extend((_stem(w), cat, sub) for w in sub.lower().split() if len(w) > 3)
+
+    @staticmethod
+    def _product(pid: int, cat: str, sub: str, raw: dict) -> Product:
+        name, desc, link = raw.get("name", ""), raw.get("description", ""), raw.get("link", "")
+        price_text = str(raw.get("price", ""))
+        return Product(
+            id=pid, category=cat, subcategory=sub, name=name, description=desc,
+            price=parse_price(raw.get("price")), price_text=price_text,
+            link=link, image=raw.get("image", ""), attrs=_attrs(raw),
+            card=f"*{name}*\n\n{desc}\n\nЦена: {price_text} ₽\nПодробнее: {link}",
+            pitch=f"\n\n*{name}*\n{desc}\nЦена: {price_text} ₽\nПодробнее: {link}",
+            line=f"*{name}* — {price_text} ₽\n{link}",
+        )
+
+    def _by_price(self, ids: Sequence[int]) -> Tuple[List[int], List[int]]:
+        pairs = sorted((self.products[i].price, i) for i in ids if self.products[i].price is not None)
+        return [p for p, _ in pairs], [i for _, i in pairs]
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    # ───────────── выбор товара ─────────────
+    def ids(self, cat: str, sub: Optional[str] = None) -> List[int]:
+        """id товаров категории / подкатегории в порядке каталога."""
+        return self._by_sub[(cat, sub)] if sub is not None else self._by_cat[cat]
+
+    def pick(self, cat: str, sub: Optional[str] = None) -> Product:
+        return self.products[random.choice(self.ids(cat, sub))]
+
+    def pick_unshown(self, cat: str, sub: Optional[str], shown: Sequence[str]) -> Optional[Product]:
+        """
+        Случайный товар подкатегории (sub=None — всей категории), чьего имени
+        нет в shown; None — все показаны.
+        Тот же выбор, что random.choice([p for p in товары if p.name not in shown]).
+        """
+        ids = self.ids(cat, sub)
+        names = self._name_pos[(cat, sub)]
+        skip = sorted(pos for name in shown for pos in names.get(name, ()))
+        left = len(ids) - len(skip)
+        if left <= 0:
+            return None
+        k = random.randrange(left)              # тот же _randbelow, что в random.choice
+        for pos in skip:                        # k-й непоказанный
+            if pos > k:
+                break
+            k += 1
+        return self.products[ids[k]]
+
+    # ───────────── фильтры ─────────────
+    def _slice(self, cat: Optional[str], sub: Optional[str], attrs: Dict[str, str]):
+        """Самый узкий отсортированный срез + оставшиеся условия (проверяются по товару)."""
+        if sub is not None:
+            return self._sorted.get((cat, sub), ([], [])), attrs
+        if attrs:
+            f, v = next(iter(attrs.items()))
+            rest = {k: x for k, x in attrs.items() if k != f}
+            key = ("@" + f, v) if cat is None else ("@" + f, v, cat)
+            return self._sorted.get(key, ([], [])), rest
+        return self._sorted.get((cat,) if cat is not None else (), ([], [])), {}
+
+    def filter(
+        self,
+        cat: Optional[str] = None,
+        sub: Optional[str] = None,
+        lo: Optional[int] = None,
+        hi: Optional[int] = None,
+        *,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        **attrs: str,
+    ) -> Tuple[int, List[Product]]:
+        """
+        (сколько всего подходит, страница товаров по возрастанию цены).
+        Категория + не больше одного атрибута (или одна подкатегория) —
+        O(log n + limit); остальные условия проверяются по диапазону цены
+        самого узкого среза.
+        """
+        (prices, ids), rest = self._slice(cat, sub, attrs)
+        a = bisect_left(prices, lo) if lo is not None else 0
+        b = bisect_right(prices, hi) if hi is not None else len(prices)
+        if not rest:
+            stop = b if limit is None else min(b, a + offset + limit)
+            return max(0, b - a), [self.products[i] for i in ids[a + offset:stop]]
+        hits = [i for i in ids[a:b] if self._matches(self.products[i], rest)]
+        stop = None if limit is None else offset + limit
+        return len(hits), [self.products[i] for i in hits[offset:stop]]
+
+    @staticmethod
+    def _matches(prod: Product, cond: Dict[str, str]) -> bool:
+        return all(prod.category == v if k == "category" else prod.attrs.get(k) == v
+                   for k, v in cond.items())
+
+    def price_facets(self, cat: Optional[str] = None, sub: Optional[str] = None,
+                     buckets: Sequence[int] = PRICE_BUCKETS) -> List[Tuple[Optional[int], Optional[int], int]]:
+        """[(от, до, сколько товаров)] по ценовым диапазонам среза; пустые не выводятся."""
+        (prices, _), _ = self._slice(cat, sub, {})
+        edges = [None, *buckets, None]
+        out = []
+        for lo, hi in zip(edges, edges[1:]):
+            a = bisect_left(prices, lo) if lo is not None else 0
+            b = bisect_left(prices, hi) if hi is not None else len(prices)
+            if b > a:
+                out.append((lo, hi, b - a))
+        return out
+
+    def facet_values(self, facet: str) -> Dict[str, int]:
+        """Значение атрибута → число товаров."""
+        return {v: len(ids) for v, ids in self.facets.get(facet, {}).items()}
+
+    # ───────────── разбор запроса ─────────────
+    def find_category(self, text: str) -> Tuple[Optional[str], Optional[str]]:
+        """(категория, подкатегория | None) по словам текста; подкатегория важнее."""
+        words = re.findall(r"[а-яёa-z]+", text.lower())
+        best: Tuple[Optional[str], Optional[str]] = (None, None)
+        for stem, cat, sub in self._stems:
+            if any(w.startswith(stem) for w in words):
+                if sub is not None:
+                    return cat, sub
+                best = best if best[0] else (cat, None)
+        return best
+
+
+if __name__ == "__main__":
+    import json
+    from pathlib import Path
+
+    index = CatalogIndex(json.loads(
+        (Path(__file__).parent / "data" / "product_catalog.json").read_text("utf-8")))
+    query = " ".join(sys.argv[1:]) or "матрас до 20000 руб"
+    cat, sub = index.find_category(query)
+    lo, hi = parse_price_range(query) or (None, None)
+    total, page = index.filter(cat, sub, lo, hi, limit=5)
+    print(f"{query!r}: категория={cat} подкатегория={sub} цена={lo}..{hi} → {total}")
+    for p in page:
+        print(f"  {p.price:>7} ₽  {p.name}  {p.attrs}")
+    print("диапазоны:", index.price_facets(cat, sub))
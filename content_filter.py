@@ -0,0 +1,24 @@
+"""
+content_filter.py
+─────────────────
+Оскорбления и запрещённые темы: наборы слов и свой маленький автомат.
+
+    CONTENT_FILTER.search("ты дурааак")   → {"toxic": ["дурак"]}
+
+• модуль лёгкий (только pattern_matcher) — smalltalk-фильтр работает
+  с первого апдейта, даже пока движок ответов грузится или не поднялся
+• те же наборы движок кладёт в общий автомат (response_rules): когда он
+  готов, фильтр и get_response делят один проход по тексту
+"""
+
+from __future__ import annotations
+
+from pattern_matcher import PREFIX, PatternMatcher
+
+TOXIC = {"дурак", "тупой", "убью", "сдохни", "ты дурак", "пошел ты", "ты идиот", "бесишь тварь", "ты долбаный дятел", "мудак", "какой ты дебил", "иди в жопу", "отвали идиот", "долбоеб", "иди на хрен", "ты тупой", "лох", "ублюдок", "выблядок", "придурок", "глупый", "уёбок", "шлюха", "сын шлюхи", "дебил", "дибил"}
+MALICIOUS = {"взрыв", "убить", "бомба", "сделать взрыв", "убийство"}    # запрещённые темы
+
+CONTENT_FILTER = (PatternMatcher()
+                  .add("toxic", TOXIC, mode=PREFIX)
+                  .add("malicious", MALICIOUS, mode=PREFIX)
+                  .compile())
@@ -1,9 +1,11 @@
 # dialogue_retrieval.py
-import random
+import os
 from pathlib import Path
-from typing import List, Tuple, Callable
+from typing import Iterable, List, Optional, Tuple, Callable
 
-from nltk.metrics import edit_distance
+from dialogue_store import DialogueStore, read_text_corpus
+from fuzzy_index import NgramIndex, ShardedNgramIndex
+from nlp_utils import NormalizedText, as_lemma, clean_text, lemmatize_many
 
 
 class DialogueRetriever:
@@ -15,56 +17,182 @@ class DialogueRetriever:
 
     • Метод get_answer(query)          — основной.
     • Метод reply(query)               — 100-%-й алиас для обратной совместимости.
+
+    • Вопросы индексируются q-граммным NgramIndex (fuzzy_index.py): точный
+      Левенштейн считается только для кандидатов, прошедших оценку снизу,
+      ответ тот же, что при полном переборе.
+    • lemmatize=True — вопросы хранятся так же, как бот нормализует запрос
+      (clean_text → леммы), иначе — preprocess (по умолчанию lower()).
+    • *.db — SQLite-корпус (dialogue_store.py): открывается без чтения пар,
+      кандидаты — из trigram-FTS; способ нормализации берётся из базы,
+      явный lemmatize=True/False, не совпавший с ним, — ValueError.
+    • NormalizedText-запрос даёт .lemma только при lemmatize, иначе
+      preprocess(.raw) — сравнивается с вопросами в той же форме.
+    • add(question, answer) — новая пара без перестройки индекса (в обоих режимах).
+
+    • get_top_k(query, k)      — k лучших [(ответ, расстояние)]; по умолчанию без
+      порога (threshold=None), свой порог вызывающий применяет сам. Корпус
+      при этом не сортируется: кандидаты идут лениво по оценке снизу в
+      кучу из k, поиск встаёт, когда оценка хуже k-го найденного.
+    • get_answers(queries, k)  — то же пачкой; корпус от PARALLEL_MIN_PAIRS пар
+      режется на шарды по процессам (ShardedNgramIndex), результаты сливаются.
     """
+    #: расширения файлов, которые открываются как DialogueStore
+    STORE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
     #: при каком нормализованном расстоянии считаем пару релевантной
     DEFAULT_THRESHOLD: float = 0.40
+    #: с какого размера корпуса get_answers раскладывает поиск по процессам
+    PARALLEL_MIN_PAIRS: int = 50_000
 
     def __init__(
         self,
         filepath: str | Path,
         preprocess: Callable[[str], str] | None = None,
+        *,
+        lemmatize: bool | None = None,
     ) -> None:
         self.pairs: List[Tuple[str, str]] = []
-        self.preprocess = preprocess or (lambda s: s.lower())
-
+        self.store: DialogueStore | None = None
+        self._shards: ShardedNgramIndex | None = None
         path = Path(filepath)
         if not path.is_file():
             raise FileNotFoundError(f"Dialogue corpus not found: {path}")
 
-        with path.open(encoding="utf-8") as f:
-            blocks = f.read().strip().split("\n\n")
+        if path.suffix in self.STORE_SUFFIXES:
+            # явный lemmatize сверяется с базой: без --lemmatize там lower()
+            self.store = DialogueStore(
+                path, None if lemmatize is None else ("lemma" if lemmatize else "lower"))
+            lemmatize = self.store.normalizer == "lemma"
+        self.lemmatize = bool(lemmatize)
+        self.preprocess = as_lemma if lemmatize else preprocess or (lambda s: s.lower())
+        if self.store is not None:
+            if not len(self.store):
+                raise ValueError("Dialogue corpus is empty or malformed")
+            return
 
-        for block in blocks:
-            q, *rest = block.strip().splitlines()
-            if rest:                                      # есть ответ
-                self.pairs.append((self.preprocess(q),    # храним уже «очищенный» вопрос
-                                   rest[0].strip()))
+        raw = read_text_corpus(path)
+        if lemmatize:                                     # один прогон Natasha на корпус
+            questions = lemmatize_many([clean_text(q) for q, _ in raw])
+        else:
+            questions = [self.preprocess(q) for q, _ in raw]
+        # храним уже «очищенный» вопрос
+        self.pairs = [(q, a) for q, (_, a) in zip(questions, raw)]
 
         if not self.pairs:
             raise ValueError("Dialogue corpus is empty or malformed")
 
-    # ──────────────────────────────────────────────────────
-    def _norm_dist(self, s1: str, s2: str) -> float:
-        return edit_distance(s1, s2) / max(1, len(s2))
+        self.index = NgramIndex(q for q, _ in self.pairs)
+
+    def __len__(self) -> int:
+        return len(self.store) if self.store is not None else len(self.pairs)
+
+    def add(self, question: str, answer: str) -> None:
+        """Добавляет пару «вопрос/ответ» (вопрос нормализуется как при загрузке)."""
+        q = as_lemma(question) if self.lemmatize else self.preprocess(question)
+        if self.store is not None:
+            self.store.append(q, answer)
+        else:
+            self.pairs.append((q, answer))
+            self.index.add(q)
+            self.close()                              # шарды пересоберутся при следующей пачке
+
+    def close(self) -> None:
+        """Останавливает процессы шардов (если get_answers их запускал)."""
+        if self._shards is not None:
+            self._shards.close()
+            self._shards = None
 
     # ──────────────────────────────────────────────────────
-    def get_answer(self, query: str, threshold: float | None = None) -> str | None:
+    def _prepare(self, query: str | NormalizedText) -> str | None:
+        """Нормализованный запрос или None для пустого."""
+        if isinstance(query, NormalizedText):
+            # леммы — только если так нормализованы вопросы корпуса
+            q_prep = query.lemma if self.lemmatize else self.preprocess(query.raw)
+        elif query.strip():
+            q_prep = self.preprocess(query)
+        else:
+            return None
+        return q_prep if q_prep.strip() else None
+
+    def _prepare_many(self, queries: List[str | NormalizedText]) -> List[str | None]:
+        if not self.lemmatize:
+            return [self._prepare(q) for q in queries]
+        # строки лемматизируются одним прогоном Natasha, NormalizedText — как есть
+        raw = [i for i, q in enumerate(queries) if not isinstance(q, NormalizedText)]
+        lemmas = dict(zip(raw, lemmatize_many([clean_text(queries[i]) for i in raw])))
+        out = []
+        for i, q in enumerate(queries):
+            q_prep = q.lemma if isinstance(q, NormalizedText) else lemmas[i]
+            out.append(q_prep if q_prep.strip() else None)
+        return out
+
+    def _top_k(self, q_prep: str, k: int, thr: float) -> List[Tuple[str, float]]:
+        if self.store is not None:
+            return [(a, d) for _, d, a in self.store.top_k(q_prep, k, thr)]
+        return [(self.pairs[i][1], d) for i, d in self.index.top_k(q_prep, k, thr)]
+
+    def get_answer(self, query: str | NormalizedText, threshold: float | None = None) -> str | None:
         """
         Возвращает наиболее подходящий ответ, если нормализованное
         расстояние Левенштейна < threshold. Иначе — None.
+        query — строка или NormalizedText (сравнивается его .lemma).
         """
-        if not query.strip():
+        q_prep = self._prepare(query)
+        if q_prep is None:
             return None
 
-        q_prep   = self.preprocess(query)
-        thr      = threshold if threshold is not None else self.DEFAULT_THRESHOLD
-        best_q, best_a = min(
-            self.pairs,
-            key=lambda qa: self._norm_dist(q_prep, qa[0])
-        )
-        if self._norm_dist(q_prep, best_q) < thr:
-            return best_a
-        return None
+        thr    = threshold if threshold is not None else self.DEFAULT_THRESHOLD
+        if self.store is not None:
+            return self.store.nearest(q_prep, thr)[2]
+        idx, _ = self.index.nearest(q_prep, thr)
+        return None if idx is None else self.pairs[idx][1]
+
+    def get_top_k(
+        self,
+        query: str | NormalizedText,
+        k: int = 5,
+        threshold: float | None = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        До k пар (ответ, расстояние) по возрастанию расстояния.
+        threshold=None — без отсечения (свой порог вызывающий применяет
+        сам), иначе только d < threshold.
+        """
+        q_prep = self._prepare(query)
+        if q_prep is None:
+            return []
+        thr = threshold if threshold is not None else float("inf")
+        return self._top_k(q_prep, k, thr)
+
+    def get_answers(
+        self,
+        queries: Iterable[str | NormalizedText],
+        k: int = 1,
+        threshold: float | None = None,
+        *,
+        workers: Optional[int] = None,
+    ) -> List[List[Tuple[str, float]]]:
+        """
+        get_top_k для пачки запросов (офлайн-оценка, несколько кандидатов).
+        workers – сколько процессов-шардов (по умолчанию os.cpu_count());
+        шарды поднимаются один раз и живут до add()/close().
+        """
+        queries = list(queries)
+        prepared = self._prepare_many(queries)
+        thr = threshold if threshold is not None else float("inf")
+        workers = workers or os.cpu_count() or 1
+
+        if self.store is None and workers > 1 and len(self.pairs) >= self.PARALLEL_MIN_PAIRS:
+            if self._shards is None:
+                self._shards = ShardedNgramIndex([q for q, _ in self.pairs], workers, self.index.q)
+            todo = [q for q in prepared if q is not None]
+            found = iter(self._shards.top_k_many(todo, k, thr))
+            return [
+                [] if q is None else [(self.pairs[i][1], d) for i, d in next(found)]
+                for q in prepared
+            ]
+        return [[] if q is None else self._top_k(q, k, thr) for q in prepared]
 
     # ──────────────────────────────────────────────────────
     # alias, чтобы старый вызов retriever.reply(...) продолжал работать
@@ -0,0 +1,258 @@
+"""
+dialogue_store.py
+─────────────────
+Корпус диалогов на диске (SQLite) для DialogueRetriever.
+
+    pairs(id, question, answer, qlen) – нормализованный вопрос и ответ
+    pairs_fts                         – FTS5 (trigram) по question: кандидаты
+                                        по общим 3-граммам, обновляется триггером
+    grams(gram, df)                   – в скольких вопросах есть 3-грамма (ведём
+                                        сами: fts5vocab читает весь doclist)
+    meta(key, value)                  – normalizer: lower | lemma
+
+• открытие — только connect(): корпус не читается, время не зависит от размера
+• append() — INSERT в одной транзакции, без перестройки индекса
+• nearest(query, threshold):
+      фильтр по длине (|lq − ls| ≤ lev < threshold·ls)
+    + FTS5 bm25 по самым редким 3-граммам запроса: не больше MAX_GRAMS и
+      пока их суммарный df ≤ DF_BUDGET (bm25 ранжирует все совпадения, а
+      частые граммы вроде «ть » совпадают с половиной корпуса)
+      → шорт-лист ≤ SHORTLIST строк
+    → точный Левенштейн / len(question), при равенстве — меньший id
+• top_k(query, k, threshold) — то же, но k лучших с расстояниями
+  Для запросов короче 3 символов шорт-лист — просто строки подходящей длины.
+• import_text() — разовый импорт формата dialogues.txt
+
+    python dialogue_store.py import data/dialogues.txt data/dialogues.db [--lemmatize]
+"""
+
+from __future__ import annotations
+
+import heapq
+import sqlite3
+import threading
+from pathlib import Path
+from collections import Counter
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from Levenshtein import distance as lev_distance
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta  (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS pairs (
+    id       INTEGER PRIMARY KEY,
+    question TEXT NOT NULL,
+    answer   TEXT NOT NULL,
+    qlen     INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pairs_qlen ON pairs(qlen);
+CREATE VIRTUAL TABLE IF NOT EXISTS pairs_fts USING fts5(
+    question, content='pairs', content_rowid='id', tokenize='trigram'
+);
+CREATE TABLE IF NOT EXISTS grams (gram TEXT PRIMARY KEY, df INTEGER NOT NULL) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS pairs_ai AFTER INSERT ON pairs BEGIN
+    INSERT INTO pairs_fts(rowid, question) VALUES (new.id, new.question);
+END;
+"""
+
+
+def read_text_corpus(path: Path | str) -> List[Tuple[str, str]]:
+    """[(вопрос, ответ)] из файла формата dialogues.txt (блоки через пустую строку)."""
+    pairs = []
+    text = Path(path).read_text(encoding="utf-8").strip()
+    for block in text.split("\n\n"):
+        q, *rest = block.strip().splitlines() or [""]
+        if rest:
+            pairs.append((q, rest[0].strip()))
+    return pairs
+
+
+class DialogueStore:
+    """SQLite-хранилище пар «вопрос/ответ» с trigram-FTS для кандидатов."""
+
+    #: сколько кандидатов из FTS перепроверять точным Левенштейном
+    SHORTLIST: int = 200
+    #: сколько самых редких 3-грамм запроса отдавать в MATCH (минимум/максимум)
+    MIN_GRAMS: int = 3
+    MAX_GRAMS: int = 12
+    #: сверх MIN_GRAMS граммы добавляются, пока сумма их df не превысит бюджет
+    DF_BUDGET: int = 20_000
+
+    def __init__(self, path: Path | str, normalizer: str | None = None) -> None:
+        """
+        normalizer – как нормализованы вопросы ('lower' / 'lemma');
+                     задаётся при создании базы, дальше читается из meta
+        """
+        self.path = Path(path)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+            row = conn.execute("SELECT value FROM meta WHERE key='normalizer'").fetchone()
+            if row is None:
+                conn.execute("INSERT INTO meta VALUES ('normalizer', ?)", (normalizer or "lower",))
+                self.normalizer = normalizer or "lower"
+            else:
+                self.normalizer = row[0]
+        if normalizer is not None and normalizer != self.normalizer:
+            raise ValueError(
+                f"{self.path}: вопросы нормализованы как {self.normalizer!r}, а не {normalizer!r}"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        """Своё соединение на поток (бот отвечает из нескольких потоков)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def __len__(self) -> int:
+        # пары не удаляются ⇒ max(id) = их число, и это O(log n), а не count(*)
+        return self._conn().execute("SELECT coalesce(max(id), 0) FROM pairs").fetchone()[0]
+
+    @staticmethod
+    def _grams(s: str) -> set:
+        return {s[i:i + 3] for i in range(len(s) - 2)}
+
+    # ───────────── запись ─────────────
+    def append(self, question: str, answer: str) -> int:
+        """Добавляет пару (вопрос уже нормализован), возвращает её id."""
+        with self._conn() as conn:
+            cur = conn.execute(
+                "INSERT INTO pairs(question, answer, qlen) VALUES (?, ?, ?)",
+                (question, answer, len(question)),
+            )
+            self._count_grams(conn, Counter(self._grams(question)))
+            return cur.lastrowid
+
+    def extend(self, pairs: Iterable[Tuple[str, str]]) -> None:
+        """Пакетная вставка [(нормализованный вопрос, ответ)] одной транзакцией."""
+        df: Counter = Counter()
+
+        def rows():
+            for q, a in pairs:
+                df.update(self._grams(q))
+                yield q, a, len(q)
+
+        with self._conn() as conn:
+            conn.executemany("INSERT INTO pairs(question, answer, qlen) VALUES (?, ?, ?)", rows())
+            self._count_grams(conn, df)
+
+    @staticmethod
+    def _count_grams(conn: sqlite3.Connection, df: Counter) -> None:
+        conn.executemany(
+            "INSERT INTO grams VALUES (?, ?) ON CONFLICT(gram) DO UPDATE SET df = df + excluded.df",
+            df.items(),
+        )
+
+    def import_text(
+        self,
+        path: Path | str,
+        normalize: Callable[[List[str]], List[str]],
+    ) -> int:
+        """Разовый импорт dialogues.txt; normalize — батчевая нормализация вопросов."""
+        pairs = read_text_corpus(path)
+        questions = normalize([q for q, _ in pairs])
+        self.extend(zip(questions, (a for _, a in pairs)))
+        return len(pairs)
+
+    # ───────────── поиск ─────────────
+    def _shortlist(self, query: str, threshold: float, limit: int) -> List[Tuple[int, str, str]]:
+        lq = len(query)
+        lo = int(lq / (1 + threshold))            # ls > lq / (1 + thr)
+        hi = int(lq / (1 - threshold)) + 1 if threshold < 1 else 1 << 30
+        conn = self._conn()
+        grams = list(self._grams(query))
+        if grams:
+            df = dict(conn.execute(
+                f"SELECT gram, df FROM grams WHERE gram IN ({','.join('?' * len(grams))})",
+                grams,
+            ).fetchall())
+            picked, total = [], 0
+            for g in sorted((g for g in grams if g in df), key=df.get)[: self.MAX_GRAMS]:
+                if len(picked) >= self.MIN_GRAMS and total + df[g] > self.DF_BUDGET:
+                    break
+                picked.append(g)
+                total += df[g]
+            grams = picked
+        if not grams:
+            return conn.execute(
+                "SELECT id, question, answer FROM pairs WHERE qlen BETWEEN ? AND ? "
+                "ORDER BY id LIMIT ?",
+                (lo, hi, limit),
+            ).fetchall()
+        match = " OR ".join('"' + g.replace('"', '""') + '"' for g in grams)
+        return conn.execute(
+            "SELECT p.id, p.question, p.answer FROM pairs_fts f "
+            "JOIN pairs p ON p.id = f.rowid "
+            "WHERE pairs_fts MATCH ? AND p.qlen BETWEEN ? AND ? "
+            "ORDER BY f.rank LIMIT ?",
+            (match, lo, hi, limit),
+        ).fetchall()
+
+    def top_k(
+        self,
+        query: str,
+        k: int,
+        threshold: float,
+        limit: int | None = None,
+    ) -> List[Tuple[int, float, str]]:
+        """
+        До k троек (id, d, ответ) с d < threshold по возрастанию (d, id).
+        Без порога (threshold=inf) шорт-лист всё равно ограничен limit,
+        из него — k лучших через кучу, без сортировки всего списка.
+        """
+        hits = []
+        for pid, q, a in self._shortlist(query, threshold, max(k, limit or self.SHORTLIST)):
+            d = lev_distance(query, q) / max(1, len(q))
+            if d < threshold:
+                hits.append((d, pid, a))
+        return [(pid, d, a) for d, pid, a in heapq.nsmallest(k, hits)]
+
+    def nearest(
+        self,
+        query: str,
+        threshold: float,
+        limit: int | None = None,
+    ) -> Tuple[Optional[int], float, Optional[str]]:
+        """
+        (id, d, ответ) ближайшего вопроса с d < threshold среди шорт-листа;
+        если такого нет — (None, threshold, None).
+        """
+        hits = self.top_k(query, 1, threshold, limit)
+        return hits[0] if hits else (None, threshold, None)
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+# ───────────── CLI ─────────────
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    ap = argparse.ArgumentParser(description="Импорт dialogues.txt в SQLite-хранилище")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_imp = sub.add_parser("import")
+    p_imp.add_argument("src")
+    p_imp.add_argument("db")
+    p_imp.add_argument("--lemmatize", action="store_true",
+                       help="вопросы — леммы (как запрос в bot_logic), иначе lower()")
+    args = ap.parse_args()
+
+    if args.cmd == "import":
+        t0 = time.perf_counter()
+        if args.lemmatize:
+            from nlp_utils import clean_text, lemmatize_many
+
+            store = DialogueStore(args.db, "lemma")
+            n = store.import_text(args.src, lambda qs: lemmatize_many([clean_text(q) for q in qs]))
+        else:
+            store = DialogueStore(args.db, "lower")
+            n = store.import_text(args.src, lambda qs: [q.lower() for q in qs])
+        print(f"✓ {n} пар за {time.perf_counter() - t0:.2f} s → {args.db} (всего {len(store)})")
@@ -2,6 +2,8 @@ import json
 from pathlib import Path
 from collections import deque
 
+from metrics import MEMORY_SECONDS
+
 # где будем хранить файлы
 BASE_DIR = Path(__file__).parent
 MEM_DIR = BASE_DIR / 'user_memory'
@@ -14,7 +16,8 @@ def load_history(user_id: int, maxlen: int = 50) -> deque:
     path = MEM_DIR / f'history_{user_id}.json'
     if not path.exists():
         return deque(maxlen=maxlen)
-    data = json.loads(path.read_text(encoding='utf-8'))
+    with MEMORY_SECONDS.time('load_history'):
+        data = json.loads(path.read_text(encoding='utf-8'))
     return deque(data[-maxlen:], maxlen=maxlen)
 
 def save_history(user_id: int, history: deque) -> None:
@@ -22,10 +25,11 @@ def save_history(user_id: int, history: deque) -> None:
     Сохраняет всю историю (или последние maxlen) пользователя в файл
     """
     path = MEM_DIR / f'history_{user_id}.json'
-    path.write_text(
-        json.dumps(list(history), ensure_ascii=False),
-        encoding='utf-8'
-    )
+    with MEMORY_SECONDS.time('save_history'):
+        path.write_text(
+            json.dumps(list(history), ensure_ascii=False),
+            encoding='utf-8'
+        )
 
 def _serialize(obj):
     """
@@ -62,15 +66,17 @@ def load_user_data(user_id: int) -> dict:
     path = MEM_DIR / f'user_data_{user_id}.json'
     if not path.exists():
         return {}
-    return json.loads(path.read_text(encoding='utf-8'))
+    with MEMORY_SECONDS.time('load_user_data'):
+        return json.loads(path.read_text(encoding='utf-8'))
 
 def save_user_data(user_id: int, user_data: dict) -> None:
     """
     Сохраняет контекст user_data в файл, предварительно сериализовав все структуры.
     """
     path = MEM_DIR / f'user_data_{user_id}.json'
-    clean = _serialize(user_data)
-    path.write_text(
-        json.dumps(clean, ensure_ascii=False, indent=2),
-        encoding='utf-8'
-    )
+    with MEMORY_SECONDS.time('save_user_data'):
+        clean = _serialize(user_data)
+        path.write_text(
+            json.dumps(clean, ensure_ascii=False, indent=2),
+            encoding='utf-8'
+        )
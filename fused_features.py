@@ -0,0 +1,163 @@
+"""
+fused_features.py
+─────────────────
+Единый экстрактор признаков word 1-2-gram + char 3-5-gram.
+
+Вместо двух TfidfVectorizer.transform + sparse.hstack каждый текст один
+раз приводится к нижнему регистру, из него снимаются word- и char-n-граммы,
+счётчики всего батча пишутся в общий буфер индексов/значений, а tf·idf
+и L2-нормировка считаются одним векторным проходом → одна CSR.
+
+Результат бит-в-бит совпадает с
+    sparse.hstack([v_word.transform(X), v_char.transform(X)]).tocsr()
+для TfidfVectorizer(sublinear_tf=True, norm="l2") с уже обученными
+словарями и idf (те же операции в том же порядке, включая
+последовательное суммирование квадратов при L2-нормировке).
+От fit_transform() отличается не больше чем на 1 ulp: там индексы
+внутри строки не отсортированы и квадраты суммируются в другом порядке.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+# то же, что sklearn.feature_extraction.text._white_spaces
+_WHITE_SPACES = re.compile(r"\s\s+")
+
+
+def word_ngrams(text: str, lo: int, hi: int) -> List[str]:
+    """Word n-граммы как у TfidfVectorizer(analyzer="word", tokenizer=str.split)."""
+    tokens = text.lower().split()
+    out: List[str] = []
+    for n in range(lo, min(hi, len(tokens)) + 1):
+        out.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+    return out
+
+
+def char_ngrams(text: str, lo: int, hi: int) -> List[str]:
+    """Char n-граммы как у TfidfVectorizer(analyzer="char")."""
+    text = _WHITE_SPACES.sub(" ", text.lower())
+    out: List[str] = []
+    for n in range(lo, min(hi, len(text)) + 1):
+        out.extend(text[i:i + n] for i in range(len(text) - n + 1))
+    return out
+
+
+class FusedTfidf:
+    """word+char TF-IDF поверх готовых словарей и idf (без sklearn)."""
+
+    def __init__(
+        self,
+        word_vocab: Sequence[str],
+        word_idf: np.ndarray,
+        char_vocab: Sequence[str],
+        char_idf: np.ndarray,
+        word_ngram: Tuple[int, int] = (1, 2),
+        char_ngram: Tuple[int, int] = (3, 5),
+    ) -> None:
+        self.word_index: Dict[str, int] = {str(t): j for j, t in enumerate(word_vocab)}
+        self.char_index: Dict[str, int] = {str(t): j for j, t in enumerate(char_vocab)}
+        self.word_idf = np.asarray(word_idf, dtype=np.float64)
+        self.char_idf = np.asarray(char_idf, dtype=np.float64)
+        self.word_ngram = tuple(int(n) for n in word_ngram)
+        self.char_ngram = tuple(int(n) for n in char_ngram)
+        self.n_word = len(self.word_index)
+        self.n_features = self.n_word + len(self.char_index)
+        self.idf = np.concatenate([self.word_idf, self.char_idf])
+
+    @classmethod
+    def from_sklearn(cls, v_word, v_char) -> "FusedTfidf":
+        """Берёт vocabulary_ / idf_ у обученных TfidfVectorizer."""
+        def vocab(v):
+            terms = [None] * len(v.vocabulary_)
+            for t, j in v.vocabulary_.items():
+                terms[j] = t
+            return terms
+
+        return cls(
+            vocab(v_word), v_word.idf_, vocab(v_char), v_char.idf_,
+            v_word.ngram_range, v_char.ngram_range,
+        )
+
+    # ───────────── извлечение ─────────────
+    def _count(self, text: str, idx: List[int], cnt: List[int]) -> Tuple[int, int]:
+        """
+        Один проход по тексту: счётчики word- и char-n-грамм пишутся подряд
+        в idx/cnt (индексы уже в общем пространстве признаков).
+        Возвращает число ненулевых признаков в word- и char-блоке.
+        """
+        (wlo, whi), (clo, chi) = self.word_ngram, self.char_ngram
+        low = text.lower()
+        tokens = low.split()
+        chars = _WHITE_SPACES.sub(" ", low)
+
+        counts: Dict[int, int] = {}
+        get = self.word_index.get
+        for n in range(wlo, min(whi, len(tokens)) + 1):
+            for i in range(len(tokens) - n + 1):
+                j = get(" ".join(tokens[i:i + n]))
+                if j is not None:
+                    counts[j] = counts.get(j, 0) + 1
+        n_word = len(counts)
+        idx.extend(counts)
+        cnt.extend(counts.values())
+
+        counts = {}
+        get = self.char_index.get
+        for n in range(clo, min(chi, len(chars)) + 1):
+            for i in range(len(chars) - n + 1):
+                j = get(chars[i:i + n])
+                if j is not None:
+                    counts[j] = counts.get(j, 0) + 1
+        idx.extend(j + self.n_word for j in counts)
+        cnt.extend(counts.values())
+        return n_word, len(counts)
+
+    def transform_arrays(
+        self, texts: Iterable[str]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(indptr, indices, data) CSR-матрицы (len(texts), n_features)."""
+        idx_l: List[int] = []
+        cnt_l: List[int] = []
+        seg_len: List[int] = []              # блоки: word₀, char₀, word₁, char₁, …
+        for text in texts:
+            seg_len.extend(self._count(text, idx_l, cnt_l))
+
+        lens = np.array(seg_len, dtype=np.int64)
+        n_rows = len(lens) // 2
+        indptr = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(lens.reshape(n_rows, 2).sum(axis=1), out=indptr[1:])
+        if not idx_l:
+            return indptr, np.empty(0, dtype=np.int32), np.empty(0)
+
+        # — индексы по возрастанию внутри блока (как в CSR sklearn) —
+        seg = np.repeat(np.arange(len(lens)), lens)
+        idx = np.array(idx_l, dtype=np.int64)
+        order = np.lexsort((idx, seg))
+        idx = idx[order]
+        data = np.array(cnt_l, dtype=np.float64)[order]
+
+        # — sublinear tf · idf —
+        np.log(data, data)
+        data += 1.0
+        data *= self.idf[idx]
+
+        # — L2 по блокам: bincount складывает веса по порядку, как
+        #   inplace_csr_row_normalize_l2 (пустой блок → 0); память O(nnz)
+        norm = np.sqrt(np.bincount(seg, weights=data * data, minlength=len(lens)))
+        norm[norm == 0.0] = 1.0
+        data /= norm[seg]
+        return indptr, idx.astype(np.int32), data
+
+    def transform(self, texts: Iterable[str]):
+        """scipy.sparse.csr_matrix — то же, что hstack двух TfidfVectorizer."""
+        from scipy import sparse
+
+        texts = list(texts)
+        indptr, indices, data = self.transform_arrays(texts)
+        return sparse.csr_matrix(
+            (data, indices, indptr), shape=(len(texts), self.n_features)
+        )
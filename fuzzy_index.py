@@ -0,0 +1,211 @@
+"""
+fuzzy_index.py
+──────────────
+Индекс для нечёткого поиска по нормализованному расстоянию Левенштейна
+
+    d(query, s) = lev(query, s) / max(1, len(s))
+
+• строки режутся на q-граммы (с паддингом) → инвертированный индекс
+  грамма ➜ [(id строки, сколько раз встречается)]
+• кандидаты отсекаются по разнице длин и q-граммному фильтру:
+      lev(a, b) ≤ k  ⇒  общих q-грамм ≥ max(|a|, |b|) + q − 1 − k·q
+• точный Левенштейн считается только для тех, кто прошёл оценку снизу;
+  кандидаты идут лениво по возрастанию оценки (корзины длин — по мере надобности),
+  поиск останавливается, когда оценка превысила лучшее / k-е расстояние —
+  и без порога (threshold=inf) весь корпус не сортируется
+
+Результат совпадает с полным перебором, включая выбор первой
+(по порядку добавления) строки среди равных по расстоянию.
+
+ShardedNgramIndex — тот же поиск для больших корпусов на нескольких
+ядрах: корпус режется на шарды, каждый шард живёт в своём процессе
+(однопроцессный ProcessPoolExecutor), пачка запросов уходит во все
+шарды сразу, top-k шардов сливаются по (d, id). Процессы стартуют через
+forkserver (где его нет — spawn), не fork: в боте к этому моменту уже
+живут потоки (resources.py, update_pipeline.py), а fork копирует их
+захваченные локи. Как и для spawn, скрипт-точка входа должен прятать
+запуск под if __name__ == "__main__".
+"""
+
+from __future__ import annotations
+
+import heapq
+import multiprocessing as mp
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from Levenshtein import distance as lev_distance
+
+
+class NgramIndex:
+    """Инвертированный q-граммный индекс + точный rerank по Левенштейну."""
+
+    PAD = "\x00"
+
+    def __init__(self, strings: Iterable[str] = (), q: int = 3) -> None:
+        self.q = q
+        self.strings: List[str] = []
+        self._postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self._by_len: Dict[int, List[int]] = defaultdict(list)
+        for s in strings:
+            self.add(s)
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+    # ───────────── построение ─────────────
+    def _qgrams(self, s: str) -> Counter:
+        pad = self.PAD * (self.q - 1)
+        p = pad + s + pad
+        return Counter(p[i:i + self.q] for i in range(len(p) - self.q + 1))
+
+    def add(self, s: str) -> int:
+        """Добавляет строку, возвращает её id (порядковый номер)."""
+        sid = len(self.strings)
+        self.strings.append(s)
+        for g, c in self._qgrams(s).items():
+            self._postings[g].append((sid, c))
+        self._by_len[len(s)].append(sid)
+        return sid
+
+    # ───────────── поиск ─────────────
+    def _lower_bound(self, lq: int, ls: int, shared: int) -> float:
+        """Оценка снизу для d(query, s) по длинам и числу общих q-грамм."""
+        k_len = abs(lq - ls)
+        k_gram = -(-(max(lq, ls) + self.q - 1 - shared) // self.q)
+        return max(k_len, k_gram) / max(1, ls)
+
+    def _candidates(self, query: str, threshold: float) -> Iterator[Tuple[float, int]]:
+        """
+        (оценка снизу, id) всех строк, которые могут быть < threshold, —
+        лениво, по возрастанию (оценка, id): вызывающий останавливается,
+        как только оценка превысила лучшее найденное, и дальние корзины
+        длин не разбираются.
+        """
+        lq = len(query)
+        shared: Dict[int, int] = defaultdict(int)
+        for g, c in self._qgrams(query).items():
+            for sid, cs in self._postings.get(g, ()):
+                shared[sid] += min(c, cs)
+
+        near = []
+        for sid, n in shared.items():
+            lb = self._lower_bound(lq, len(self.strings[sid]), n)
+            if lb < threshold:
+                near.append((lb, sid))
+        near.sort()
+
+        # строки без единой общей q-граммы: у корзины длины одна оценка —
+        # корзины с равной оценкой разбираются вместе, когда до неё дошли
+        levels: Dict[float, List[List[int]]] = defaultdict(list)
+        for ls, ids in self._by_len.items():
+            lb = self._lower_bound(lq, ls, 0)
+            if lb < threshold:
+                levels[lb].append(ids)
+
+        i = 0
+        for lb in sorted(levels):
+            while i < len(near) and near[i][0] < lb:
+                yield near[i]
+                i += 1
+            level = [sid for ids in levels[lb] for sid in ids if sid not in shared]
+            while i < len(near) and near[i][0] == lb:
+                level.append(near[i][1])
+                i += 1
+            level.sort()                          # отсортированные куски — timsort их сливает
+            for sid in level:
+                yield lb, sid
+        yield from near[i:]
+
+    def nearest(self, query: str, threshold: float) -> Tuple[Optional[int], float]:
+        """
+        (id, d) ближайшей строки с d < threshold; при равенстве — меньший id.
+        Если такой нет — (None, threshold).
+        """
+        best_id: Optional[int] = None
+        best_d = threshold
+        for lb, sid in self._candidates(query, threshold):
+            if lb > best_d or (lb == best_d and best_id is not None and sid > best_id):
+                break
+            s = self.strings[sid]
+            d = lev_distance(query, s) / max(1, len(s))
+            if d < best_d or (d == best_d and best_id is not None and sid < best_id):
+                best_id, best_d = sid, d
+        return best_id, best_d
+
+    def top_k(self, query: str, k: int, threshold: float) -> List[Tuple[int, float]]:
+        """
+        До k пар (id, d) с d < threshold по возрастанию (d, id);
+        первая из них — то же, что nearest().
+        """
+        heap: List[Tuple[float, int]] = []           # (−d, −id): в вершине худший
+        for lb, sid in self._candidates(query, threshold):
+            if len(heap) == k:
+                worst_d, worst_id = -heap[0][0], -heap[0][1]
+                if lb > worst_d or (lb == worst_d and sid > worst_id):
+                    break
+            s = self.strings[sid]
+            d = lev_distance(query, s) / max(1, len(s))
+            if d >= threshold:
+                continue
+            if len(heap) < k:
+                heapq.heappush(heap, (-d, -sid))
+            elif (-d, -sid) > heap[0]:
+                heapq.heapreplace(heap, (-d, -sid))
+        return [(-nsid, -nd) for nd, nsid in sorted(heap, reverse=True)]
+
+
+# ───────────── шарды по процессам ─────────────
+_shard: Optional[NgramIndex] = None
+_shard_offset = 0
+
+
+def _init_shard(strings: Sequence[str], offset: int, q: int) -> None:
+    global _shard, _shard_offset
+    _shard, _shard_offset = NgramIndex(strings, q), offset
+
+
+def _shard_top_k(queries: Sequence[str], k: int, threshold: float) -> List[List[Tuple[int, float]]]:
+    return [
+        [(_shard_offset + sid, d) for sid, d in _shard.top_k(q, k, threshold)]
+        for q in queries
+    ]
+
+
+class ShardedNgramIndex:
+    """NgramIndex, разрезанный на workers шардов в отдельных процессах."""
+
+    def __init__(self, strings: Sequence[str], workers: int, q: int = 3) -> None:
+        strings = list(strings)
+        size = -(-len(strings) // max(1, workers))
+        methods = mp.get_all_start_methods()
+        ctx = mp.get_context("forkserver" if "forkserver" in methods else "spawn")
+        self._pools = [
+            ProcessPoolExecutor(
+                1, mp_context=ctx, initializer=_init_shard,
+                initargs=(strings[lo:lo + size], lo, q),
+            )
+            for lo in range(0, len(strings), size)
+        ]
+        self._size = len(strings)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def top_k_many(
+        self, queries: Sequence[str], k: int, threshold: float
+    ) -> List[List[Tuple[int, float]]]:
+        """top_k() для каждого запроса: шарды считают параллельно, потом слияние."""
+        futures = [p.submit(_shard_top_k, list(queries), k, threshold) for p in self._pools]
+        per_shard = [f.result() for f in futures]
+        return [
+            heapq.nsmallest(k, (hit for shard in per_shard for hit in shard[i]),
+                            key=lambda h: (h[1], h[0]))
+            for i in range(len(queries))
+        ]
+
+    def close(self) -> None:
+        for p in self._pools:
+            p.shutdown(cancel_futures=True)
+        self._pools = []
@@ -5,46 +5,52 @@ intent_classifier.py
 
 • Признаки = TF-IDF( word 1-2-gram  ∪  char 3-5-gram, min_df=3 для char )
 • Модель   = SGDClassifier(log_loss, early_stopping) с class_weight
-• Во время обучения рисует:
+• Во время обучения рисует (стадии идут параллельно в пуле процессов):
     – history (loss / acc)
     – learning curve
     – confusion-matrix (батчи ≤15 классов)
-    – elbow-plot для K-Means
-Сохраняет:
+    – elbow-plot для MiniBatchKMeans на SVD-проекции
+• TF-IDF-матрица кэшируется в .train_cache/ по хэшу датасета
+• python intent_classifier.py --fast – без графиков
+Сохраняет (рядом с модулем):
     intent_clf.pkl        – классификатор
     intent_v_word.pkl     – word-TF-IDF
     intent_v_char.pkl     – char-TF-IDF
+    intent_model.npz      – компактный артефакт для инференса без sklearn
+                            (см. intent_runtime.py)
+--publish кладёт их новой версией в реестр models/intent/ (model_registry.py).
+
+sklearn и matplotlib нужны только для обучения и импортируются лениво:
+load() + predict*() работают на одном numpy, если есть intent_model.npz.
 """
 
 from __future__ import annotations
 
+import hashlib
 import json
 import pickle
+import threading
+from collections import Counter
+from functools import cached_property
 from pathlib import Path
-from typing import List, Tuple
+from typing import Callable, Dict, List, Tuple
 
-import matplotlib.pyplot as plt
 import numpy as np
-from nltk.metrics.distance import edit_distance
-from scipy import sparse
-from sklearn.base import clone
-from sklearn.cluster import KMeans
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics import (
-    accuracy_score,
-    confusion_matrix,
-    f1_score,
-    log_loss,
-)
-from sklearn.model_selection import (
-    StratifiedKFold,
-    learning_curve,
-    train_test_split,
-)
-from sklearn.linear_model import SGDClassifier
-from sklearn.utils.class_weight import compute_class_weight
-
-from nlp_utils import clean_text, lemmatize_text
+from Levenshtein import distance as lev_distance
+from scipy.special import expit
+
+from fused_features import FusedTfidf
+from fuzzy_index import NgramIndex
+from intent_runtime import CompactIntentModel
+from nlp_utils import NormalizedText, as_lemma, clean_text, lemmatize_many, lemmatize_text
+
+BASE_DIR = Path(__file__).parent
+CLF_F    = BASE_DIR / "intent_clf.pkl"
+WORD_F   = BASE_DIR / "intent_v_word.pkl"
+CHAR_F   = BASE_DIR / "intent_v_char.pkl"
+MODEL_F  = BASE_DIR / "intent_model.npz"
+HOLDOUT_F = BASE_DIR / "intent_holdout.json"   # отложенные train() примеры (для online_learner)
+CACHE_DIR = BASE_DIR / ".train_cache"
 
 
 # ──────────────────────────────  CLASS  ──────────────────────────────
@@ -53,8 +59,17 @@ class IntentClassifier:
     Word 1-2-gram + Char 3-5-gram  ➜  SGD(log_loss, early_stopping).
     """
 
+    #: на сколько top-1 вероятность должна обгонять top-2 в режиме cascade
+    CASCADE_MARGIN: float = 0.10
+
     # ───────────── init ─────────────
-    def __init__(self, data_dir: Path | str):
+    def __init__(
+        self,
+        data_dir: Path | str,
+        *,
+        cascade: bool = False,
+        cascade_margin: float | None = None,
+    ):
         self.data_dir = Path(data_dir)
 
         # — raw intents —
@@ -68,25 +83,37 @@ class IntentClassifier:
         }
 
         # — нормализованные примеры —
+        # (один прогон Natasha на весь датасет, см. nlp_utils.lemmatize_many)
+        flat = iter(lemmatize_many(
+            [clean_text(ex) for obj in self.intents.values() for ex in obj["examples"]]
+        ))
         self.norm_examples = {
-            intent: [lemmatize_text(clean_text(ex)) for ex in obj["examples"]]
+            intent: [next(flat) for _ in obj["examples"]]
             for intent, obj in self.intents.items()
         }
 
-        # — TF-IDF векторайзеры —
-        self.v_word = TfidfVectorizer(
-            analyzer="word",
-            ngram_range=(1, 2),
-            min_df=2,
-            sublinear_tf=True,
-            tokenizer=str.split,
+        # — q-граммный индекс примеров для predict_fuzzy —
+        self._example_intents = [
+            intent for intent, exs in self.norm_examples.items() for _ in exs
+        ]
+        self.fuzzy_index = NgramIndex(
+            ex for exs in self.norm_examples.values() for ex in exs
         )
-        self.v_char = TfidfVectorizer(
-            analyzer="char",
-            ngram_range=(3, 5),
-            min_df=3,           # шумовые 3-граммы отсекаем
-            sublinear_tf=True,
+
+        # — cascade: точное совпадение → линейная модель → fuzzy —
+        self.cascade = cascade
+        self.cascade_margin = (
+            self.CASCADE_MARGIN if cascade_margin is None else cascade_margin
         )
+        self.exact_index = self._build_exact_index()
+        self.tier_hits: Counter = Counter()
+        self._tier_lock = threading.Lock()     # classify() зовут потоки пула nlp
+
+        # — модель: sklearn-объекты (обучение) или компактный runtime —
+        self.v_word = self.v_char = None
+        self._fused: FusedTfidf | None = None     # word+char за один проход
+        self.runtime: CompactIntentModel | None = None
+        self.model_dir: Path = BASE_DIR            # откуда загружены артефакты
 
         # — базовые гиперпараметры SGD —
         self._base_params = dict(
@@ -99,10 +126,32 @@ class IntentClassifier:
             random_state=42,
             early_stopping=False,
         )
-        self.clf = self._new_clf()
+        self.clf = None
+
+    @staticmethod
+    def _new_vectorizers():
+        """Свежие (необученные) word- и char-TF-IDF."""
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        v_word = TfidfVectorizer(
+            analyzer="word",
+            ngram_range=(1, 2),
+            min_df=2,
+            sublinear_tf=True,
+            tokenizer=str.split,
+        )
+        v_char = TfidfVectorizer(
+            analyzer="char",
+            ngram_range=(3, 5),
+            min_df=3,           # шумовые 3-граммы отсекаем
+            sublinear_tf=True,
+        )
+        return v_word, v_char
 
-    def _new_clf(self, **extra) -> SGDClassifier:
+    def _new_clf(self, **extra):
         """Cоздаёт новый SGDClassifier с нужными hyper-params."""
+        from sklearn.linear_model import SGDClassifier
+
         params = self._base_params.copy()
         params.update(extra)
         return SGDClassifier(**params)
@@ -118,100 +167,301 @@ class IntentClassifier:
         random_state: int = 42,
         elbow_max_k: int = 15,
         cm_block: int = 15,
+        jobs: int | None = None,
+        cache: bool = True,
+        holdout_every: int = 5,
     ) -> None:
         """
-        epochs   – сколько раз вызвать partial_fit (и для history, и для финала)
-        cm_block – сколько классов помещать на один confusion-PNG
+        epochs        – сколько раз вызвать partial_fit (и для history, и для финала)
+        cm_block      – сколько классов помещать на один confusion-PNG
+        jobs          – процессов для независимых стадий (фолды CV, графики);
+                        None = по числу ядер
+        cache         – брать TF-IDF-матрицу из .train_cache/, если датасет не менялся
+        holdout_every – каждый N-й пример интента не идёт в финальную модель и
+                        сохраняется в intent_holdout.json (0 — без held-out)
         """
+        from concurrent.futures import ProcessPoolExecutor
+
+        from sklearn.base import clone
+        from sklearn.model_selection import StratifiedKFold
+        from sklearn.utils.class_weight import compute_class_weight
+
         # — подготовка датасета —
         X_raw, y = self._prepare_dataset()
         y = np.array(y, dtype=str)
-        Xw = self.v_word.fit_transform(X_raw)
-        Xc = self.v_char.fit_transform(X_raw)
-        X_vec = sparse.hstack([Xw, Xc]).tocsr()
+        X_vec = self._vectorize(X_raw, cache=cache)
 
         # — балансировка классов —
         classes_ = np.unique(y)
         weights = compute_class_weight("balanced", classes=classes_, y=y)
         cw = {c: w for c, w in zip(classes_, weights)}
-
-        # — k-fold F1-оценка —
-        skf = StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=42)
-        f1s = []
-        for tr, vl in skf.split(X_vec, y):
-            c = self._new_clf(class_weight=cw)
-            c.fit(X_vec[tr], y[tr])
-            f1s.append(
-                f1_score(y[vl], c.predict(X_vec[vl]), average="macro", zero_division=0)
-            )
-        print(f"CV F1-macro: {np.mean(f1s):.3f} ± {np.std(f1s):.3f}")
-
-        # — графики —
-        if plot:
-            self._plot_training_history(
-                clone(self._new_clf(class_weight=cw)),
-                X_vec, y, epochs, test_size, random_state
-            )
-            self._plot_learning_curve(
-                clone(self._new_clf(class_weight=cw)),
-                X_vec, y, cv_folds
-            )
-            self._plot_confusion(
-                clone(self._new_clf(class_weight=cw)),
-                X_vec, y, test_size, random_state, block=cm_block
-            )
-            self._plot_elbow(X_vec, elbow_max_k)
-
-        # — финальное обучение (partial_fit) —
-        self.clf = self._new_clf(class_weight=cw)
-        for _ in range(epochs):
-            self.clf.partial_fit(X_vec, y, classes=classes_)
+        proto = self._new_clf(class_weight=cw)
+
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            # — k-fold F1-оценка (фолд = задача) —
+            skf = StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=42)
+            folds = [
+                pool.submit(self._fold_f1, clone(proto), X_vec, y, tr, vl)
+                for tr, vl in skf.split(X_vec, y)
+            ]
+
+            # — графики —
+            plots = []
+            if plot:
+                plots = [
+                    pool.submit(
+                        self._plot_training_history,
+                        clone(proto), X_vec, y, epochs, test_size, random_state,
+                    ),
+                    pool.submit(
+                        self._plot_learning_curve,
+                        clone(proto), X_vec, y, cv_folds, n_jobs=1,
+                    ),
+                    pool.submit(
+                        self._plot_confusion,
+                        clone(proto), X_vec, y, test_size, random_state,
+                        block=cm_block,
+                    ),
+                    pool.submit(self._plot_elbow, X_vec, elbow_max_k),
+                ]
+
+            # — финальное обучение (partial_fit) без held-out — здесь же, пока пул занят —
+            held = self._holdout_mask(holdout_every)
+            self.clf = clone(proto)
+            for _ in range(epochs):
+                self.clf.partial_fit(X_vec[~held], y[~held], classes=classes_)
+
+            f1s = [f.result() for f in folds]
+            print(f"CV F1-macro: {np.mean(f1s):.3f} ± {np.std(f1s):.3f}")
+            for f in plots:
+                f.result()
 
         # — сохраняем —
-        pickle.dump(self.v_word, open("intent_v_word.pkl", "wb"))
-        pickle.dump(self.v_char, open("intent_v_char.pkl", "wb"))
-        pickle.dump(self.clf,    open("intent_clf.pkl",    "wb"))
-
-    def load(self) -> None:
-        """Загружает *.pkl, сохранённые train()."""
-        self.v_word = pickle.load(open("intent_v_word.pkl", "rb"))
-        self.v_char = pickle.load(open("intent_v_char.pkl", "rb"))
-        self.clf    = pickle.load(open("intent_clf.pkl",    "rb"))
+        pickle.dump(self.v_word, open(WORD_F, "wb"))
+        pickle.dump(self.v_char, open(CHAR_F, "wb"))
+        pickle.dump(self.clf,    open(CLF_F,  "wb"))
+        HOLDOUT_F.write_text(json.dumps(
+            [[intent, text] for intent, text, h in zip(y, X_raw, held) if h],
+            ensure_ascii=False), "utf-8")
+        self.export_compact()
+
+    def _holdout_mask(self, every: int) -> np.ndarray:
+        """Каждый every-й пример каждого интента (в порядке _prepare_dataset)."""
+        return np.array([
+            every > 0 and k % every == every - 1
+            for exs in self.norm_examples.values() for k in range(len(exs))
+        ], dtype=bool)
+
+    def _vectorize(self, X_raw: List[str], *, cache: bool = True):
+        """
+        Обучает word/char TF-IDF и возвращает CSR-матрицу признаков.
+        Результат кэшируется на диске по хэшу датасета и параметров.
+        """
+        import sklearn
+
+        v_word, v_char = self._new_vectorizers()
+        key = hashlib.sha256(
+            json.dumps(
+                [X_raw, repr(sorted(v_word.get_params().items())),
+                 repr(sorted(v_char.get_params().items())), sklearn.__version__],
+                ensure_ascii=False,
+            ).encode("utf-8")
+        ).hexdigest()[:16]
+        path = CACHE_DIR / f"tfidf_{key}.pkl"
+
+        if cache and path.exists():
+            with open(path, "rb") as f:
+                self.v_word, self.v_char, X_vec = pickle.load(f)
+            self._fused = FusedTfidf.from_sklearn(self.v_word, self.v_char)
+            print(f"TF-IDF: из кэша {path.name}")
+            return X_vec
+
+        self.v_word, self.v_char = v_word.fit(X_raw), v_char.fit(X_raw)
+        self._fused = FusedTfidf.from_sklearn(self.v_word, self.v_char)
+        X_vec = self._fused.transform(X_raw)
+        if cache:
+            CACHE_DIR.mkdir(exist_ok=True)
+            with open(path, "wb") as f:
+                pickle.dump((self.v_word, self.v_char, X_vec), f)
+        return X_vec
+
+    @staticmethod
+    def _fold_f1(clf, X_vec, y, tr, vl) -> float:
+        from sklearn.metrics import f1_score
+
+        clf.fit(X_vec[tr], y[tr])
+        return f1_score(y[vl], clf.predict(X_vec[vl]), average="macro", zero_division=0)
+
+    def export_compact(self, path: Path | str = MODEL_F) -> None:
+        """Пишет компактный артефакт (словари, idf, float64-веса) в .npz."""
+        CompactIntentModel.from_sklearn(self.v_word, self.v_char, self.clf).save(path)
+
+    def load(
+        self,
+        compact: bool | None = None,
+        model_dir: Path | str | None = None,
+    ) -> None:
+        """
+        Загружает модель, сохранённую train().
+        compact=None  – intent_model.npz, если он есть, иначе *.pkl
+        compact=True  – только intent_model.npz (без sklearn)
+        compact=False – только *.pkl (нужно для дообучения / экспорта)
+        model_dir     – каталог с артефактами (версия из model_registry);
+                        по умолчанию — рядом с модулем
+        """
+        self.model_dir = Path(model_dir) if model_dir is not None else BASE_DIR
+        model_f = self.model_dir / MODEL_F.name
+        if compact is None:
+            compact = model_f.exists()
+        if compact:
+            self.runtime = CompactIntentModel.load(model_f)
+            return
+        self.v_word = pickle.load(open(self.model_dir / WORD_F.name, "rb"))
+        self.v_char = pickle.load(open(self.model_dir / CHAR_F.name, "rb"))
+        self.clf    = pickle.load(open(self.model_dir / CLF_F.name,  "rb"))
+        self._fused = FusedTfidf.from_sklearn(self.v_word, self.v_char)
+        self.runtime = None
 
     # ───────────── инференс ─────────────
-    def _vec(self, txt: str):
-        Xw = self.v_word.transform([txt])
-        Xc = self.v_char.transform([txt])
-        return sparse.hstack([Xw, Xc])
-
-    def predict(self, text: str) -> str:
-        norm = lemmatize_text(clean_text(text))
-        return self.clf.predict(self._vec(norm))[0]
+    @property
+    def classes_(self) -> np.ndarray:
+        return self.runtime.classes if self.runtime is not None else self.clf.classes_
+
+    def predict(self, text: str | NormalizedText) -> str:
+        return self.classify(text).label
+
+    # ───────────── батч-инференс ─────────────
+    @staticmethod
+    def _norms(texts: List[str | NormalizedText]) -> List[str]:
+        """Леммы батча: у NormalizedText — готовые, строки — одним lemmatize_many."""
+        raw = [clean_text(t) for t in texts if not isinstance(t, NormalizedText)]
+        it = iter(lemmatize_many(raw))
+        return [t.lemma if isinstance(t, NormalizedText) else next(it) for t in texts]
+
+    def _vec_many(self, texts: List[str]):
+        """CSR word+char TF-IDF за один проход (= hstack двух transform)."""
+        return self._fused.transform(texts)
+
+    def _decision(
+        self,
+        norms: List[str],
+        runtime: CompactIntentModel | None = None,
+    ) -> np.ndarray:
+        """
+        decision_function для уже нормализованных текстов:
+        компактный runtime или одно матричное произведение по sklearn-CSR.
+        runtime – снимок модели (чтобы горячая подмена не разъехалась с classes_).
+        """
+        runtime = runtime or self.runtime
+        if runtime is not None:
+            return runtime.decision_function(norms)
+        X = self._vec_many(norms)
+        return np.asarray(X @ self.clf.coef_.T) + self.clf.intercept_
+
+    @staticmethod
+    def _proba(scores: np.ndarray) -> np.ndarray:
+        """OvR-нормировка, как SGDClassifier.predict_proba."""
+        proba = expit(scores)
+        proba /= proba.sum(axis=1, keepdims=True)
+        return proba
+
+    def predict_many(self, texts: List[str | NormalizedText]) -> List[str]:
+        """
+        То же, что predict() для каждого текста, но одной CSR-матрицей
+        и одним матричным произведением на весь батч (sklearn-путь).
+        """
+        if not texts:
+            return []
+        norms = self._norms(texts)
+        scores = self._decision(norms)
+        return list(self.classes_[scores.argmax(axis=1)])
 
-    def predict_fuzzy(self, text: str, threshold: float = 0.25) -> str:
+    def predict_proba_many(
+        self,
+        texts: List[str | NormalizedText],
+        top_k: int = 3,
+    ) -> Tuple[List[str], List[List[Tuple[str, float]]], np.ndarray]:
+        """
+        Возвращает (метки, top-k [(интент, p), …], матрица вероятностей).
+        """
+        classes = self.classes_
+        if not texts:
+            return [], [], np.empty((0, len(classes)))
+        norms = self._norms(texts)
+        scores = self._decision(norms)
+        labels = list(classes[scores.argmax(axis=1)])
+
+        proba = self._proba(scores)
+
+        order = np.argsort(-proba, axis=1, kind="stable")[:, :top_k]
+        tops = [
+            [(classes[j], float(row[j])) for j in idx]
+            for row, idx in zip(proba, order)
+        ]
+        return labels, tops, proba
+
+    def predict_fuzzy(self, text: str | NormalizedText, threshold: float = 0.25) -> str:
         """
         Если ближайший пример интента по Левенштейну далеко,
-        ищет ближе среди всех интентов.
+        ищет ближе среди всех интентов (через fuzzy_index, без полного перебора).
         """
-        norm = lemmatize_text(clean_text(text))
-        intent = self.predict(text)
+        pred = self.classify(text)
+        return self._fuzzy(pred.norm, pred.label, threshold)[0]
 
+    def _fuzzy(self, norm: str, intent: str, threshold: float) -> Tuple[str, float]:
+        """(интент, нормализованное расстояние) для уже нормализованного текста."""
         best = min(
-            edit_distance(norm, ex) / max(1, len(ex))
+            lev_distance(norm, ex) / max(1, len(ex))
             for ex in self.norm_examples[intent]
         )
         if best < threshold:
-            return intent
+            return intent, best
 
-        best_intent, best_d = None, threshold
-        for cand, exs in self.norm_examples.items():
-            for ex in exs:
-                d = edit_distance(norm, ex) / max(1, len(ex))
-                if d < best_d:
-                    best_intent, best_d = cand, d
-        return best_intent or intent
+        idx, d = self.fuzzy_index.nearest(norm, threshold)
+        if idx is None:
+            return intent, best
+        return self._example_intents[idx], d
+
+    def classify(
+        self,
+        text: str | NormalizedText,
+        normalize: Callable[[str], str] | None = None,
+    ) -> "IntentPrediction":
+        """
+        Ленивый результат классификации одного сообщения.
+        normalize – своя нормализация (по умолчанию NormalizedText.lemma
+                    или lemmatize(clean_text) для строки).
+        """
+        return IntentPrediction(self, text, normalize)
+
+    def predict_cascade(self, text: str | NormalizedText) -> str:
+        """
+        Трёхступенчатая классификация:
+          exact – нормализованный текст совпал с примером (хэш-таблица)
+          model – SGD, если top-1 обгоняет top-2 на ≥ cascade_margin
+          fuzzy – predict_fuzzy только для неуверенных ответов модели
+        Счётчики попаданий по ступеням — в self.tier_hits.
+        """
+        return self.classify(text).cascade_label
 
     # ───────────── helpers ─────────────
+    def _build_exact_index(self) -> Dict[str, str]:
+        """Нормализованный пример → интент (датасет важнее custom_intents)."""
+        index = {
+            ex: intent
+            for intent, exs in reversed(self.norm_examples.items())
+            for ex in reversed(exs)
+        }
+        custom_f = self.data_dir / "custom_intents.json"
+        if custom_f.exists():
+            custom = json.loads(custom_f.read_text("utf-8"))
+            for intent, obj in custom.items():
+                if not isinstance(obj, dict):
+                    continue
+                for ex in obj.get("examples", []):
+                    index.setdefault(lemmatize_text(clean_text(ex)), intent)
+        return index
+
     def _prepare_dataset(self) -> Tuple[List[str], List[str]]:
         X_raw, y = [], []
         for intent, exs in self.norm_examples.items():
@@ -220,15 +470,19 @@ class IntentClassifier:
         return X_raw, y
 
     # ─── 1. history (loss / acc) ───
+    @staticmethod
     def _plot_training_history(
-        self,
-        clf: SGDClassifier,
+        clf,
         X_vec,
         y,
         epochs: int,
         test_size: float,
         random_state: int,
     ):
+        import matplotlib.pyplot as plt
+        from sklearn.metrics import accuracy_score, log_loss
+        from sklearn.model_selection import train_test_split
+
         X_tr, X_val, y_tr, y_val = train_test_split(
             X_vec, y,
             test_size=test_size,
@@ -261,10 +515,14 @@ class IntentClassifier:
         plt.tight_layout(); plt.savefig("training_history.png", dpi=300); plt.close()
 
     # ─── 2. learning curve ───
-    def _plot_learning_curve(self, clf, X_vec, y, cv_folds: int):
+    @staticmethod
+    def _plot_learning_curve(clf, X_vec, y, cv_folds: int, n_jobs: int = -1):
+        import matplotlib.pyplot as plt
+        from sklearn.model_selection import StratifiedKFold, learning_curve
+
         cv = StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=42)
         tr_sizes, tr_scores, val_scores = learning_curve(
-            clf, X_vec, y, cv=cv, n_jobs=-1
+            clf, X_vec, y, cv=cv, n_jobs=n_jobs
         )
 
         plt.figure(figsize=(8, 5))
@@ -276,8 +534,8 @@ class IntentClassifier:
         plt.tight_layout(); plt.savefig("learning_curve.png", dpi=300); plt.close()
 
     # ─── 3. confusion matrix ───
+    @staticmethod
     def _plot_confusion(
-        self,
         clf,
         X_vec,
         y,
@@ -287,6 +545,10 @@ class IntentClassifier:
         block: int = 15,
         show_thr: float = 0.01,
     ):
+        import matplotlib.pyplot as plt
+        from sklearn.metrics import confusion_matrix
+        from sklearn.model_selection import train_test_split
+
         X_tr, X_te, y_tr, y_te = train_test_split(
             X_vec, y,
             test_size=test_size,
@@ -341,29 +603,163 @@ class IntentClassifier:
             plt.close(fig)
 
     # ─── 4. elbow plot ───
-    def _plot_elbow(self, X_vec, max_k: int = 15):
+    @staticmethod
+    def _plot_elbow(X_vec, max_k: int = 15, n_components: int = 100):
+        """
+        Elbow-plot: MiniBatchKMeans на SVD-проекции (≤ n_components измерений)
+        вместо полного KMeans по разреженной матрице.
+        """
+        import matplotlib.pyplot as plt
+        from sklearn.cluster import MiniBatchKMeans
+        from sklearn.decomposition import TruncatedSVD
+
+        n_comp = max(1, min(n_components, X_vec.shape[1] - 1))
+        X_red = TruncatedSVD(n_components=n_comp, random_state=42).fit_transform(X_vec)
+
         inertias = []
         for k in range(1, max_k + 1):
-            km = KMeans(n_clusters=k, random_state=42, n_init="auto")
-            km.fit(X_vec)
+            km = MiniBatchKMeans(n_clusters=k, random_state=42, n_init="auto")
+            km.fit(X_red)
             inertias.append(km.inertia_)
 
         plt.figure(figsize=(6, 4))
         plt.plot(range(1, max_k + 1), inertias, marker="o")
         plt.xlabel("K"); plt.ylabel("Inertia (SSE)")
-        plt.title("Elbow plot for K-Means")
+        plt.title(f"Elbow plot for K-Means (SVD-{n_comp})")
         plt.grid(alpha=0.5, linestyle="--")
         plt.tight_layout(); plt.savefig("elbow_curve.png", dpi=300); plt.close()
 
 
+# ─────────────────────────  RESULT OBJECT  ──────────────────────────
+class IntentPrediction:
+    """
+    Результат классификации одного сообщения.
+
+    Всё считается лениво и не более одного раза: нормализация,
+    вектор и вероятности (label / proba / top_k), fuzzy-проверка
+    (fuzzy_label / fuzzy_distance). Стадии get_response читают
+    отсюда, а не зовут классификатор заново.
+    """
+
+    TOP_K = 3
+    FUZZY_THRESHOLD = 0.25
+
+    def __init__(
+        self,
+        clf: IntentClassifier,
+        text: str | NormalizedText,
+        normalize: Callable[[str], str] | None = None,
+    ) -> None:
+        self.clf = clf
+        self.text = text
+        self._normalize = normalize
+        # снимок модели: online-learner / model_registry могут подменить clf.runtime
+        self._runtime = clf.runtime
+
+    @cached_property
+    def norm(self) -> str:
+        if self._normalize is None:
+            return as_lemma(self.text)
+        return self._normalize(str(self.text))
+
+    @cached_property
+    def classes(self) -> np.ndarray:
+        return self._runtime.classes if self._runtime is not None else self.clf.classes_
+
+    @cached_property
+    def scores(self) -> np.ndarray:
+        return self.clf._decision([self.norm], self._runtime)
+
+    @cached_property
+    def proba(self) -> np.ndarray:
+        return self.clf._proba(self.scores)[0]
+
+    @cached_property
+    def label(self) -> str:
+        return self.classes[self.scores[0].argmax()]
+
+    @cached_property
+    def top_k(self) -> List[Tuple[str, float]]:
+        order = np.argsort(-self.proba, kind="stable")[:self.TOP_K]
+        return [(self.classes[j], float(self.proba[j])) for j in order]
+
+    @cached_property
+    def _fuzzy(self) -> Tuple[str, float]:
+        return self.clf._fuzzy(self.norm, self.label, self.FUZZY_THRESHOLD)
+
+    @property
+    def fuzzy_label(self) -> str:
+        return self._fuzzy[0]
+
+    @property
+    def fuzzy_distance(self) -> float:
+        return self._fuzzy[1]
+
+    @cached_property
+    def _cascade(self) -> Tuple[str, str]:
+        clf = self.clf
+        exact = clf.exact_index.get(self.norm)
+        if exact is not None:
+            res = exact, "exact"
+        else:
+            top = self.top_k
+            margin = top[0][1] - (top[1][1] if len(top) > 1 else 0.0)
+            if margin >= clf.cascade_margin:
+                res = self.label, "model"
+            else:
+                res = self.fuzzy_label, "fuzzy"
+        with clf._tier_lock:                  # += у Counter не атомарен
+            clf.tier_hits[res[1]] += 1
+        return res
+
+    @property
+    def cascade_label(self) -> str:
+        return self._cascade[0]
+
+    @property
+    def tier(self) -> str:
+        """Какая ступень cascade дала ответ: exact / model / fuzzy."""
+        return self._cascade[1]
+
+    @property
+    def intent(self) -> str:
+        """Итоговый интент: cascade_label в режиме cascade, иначе label."""
+        return self.cascade_label if self.clf.cascade else self.label
+
+
 # ───────────── CLI ─────────────
 if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Обучение классификатора интентов")
+    ap.add_argument("--fast", action="store_true",
+                    help="без графиков: только CV и финальная модель")
+    ap.add_argument("--no-cache", action="store_true",
+                    help="не брать TF-IDF из .train_cache/")
+    ap.add_argument("--jobs", type=int, default=None,
+                    help="процессов для стадий (по умолчанию — число ядер)")
+    ap.add_argument("--epochs", type=int, default=10)
+    ap.add_argument("--publish", action="store_true",
+                    help="сохранить результат как новую версию в models/intent/")
+    args = ap.parse_args()
+
     DATA_DIR = Path(__file__).parent / "data"
     clf = IntentClassifier(DATA_DIR)
-    clf.train(plot=True, epochs=10, elbow_max_k=15)
+    clf.train(
+        plot=not args.fast, epochs=args.epochs, elbow_max_k=15,
+        jobs=args.jobs, cache=not args.no_cache,
+    )
     print(
         "✓ Модель обучена и сохранена:\n"
-        "   intent_clf.pkl / intent_v_word.pkl / intent_v_char.pkl\n"
-        "✓ Графики: training_history.png, learning_curve.png, "
-        "confusion_matrix_*.png, elbow_curve.png"
+        "   intent_clf.pkl / intent_v_word.pkl / intent_v_char.pkl / intent_model.npz"
+        " / intent_holdout.json"
     )
+    if not args.fast:
+        print(
+            "✓ Графики: training_history.png, learning_curve.png, "
+            "confusion_matrix_*.png, elbow_curve.png"
+        )
+    if args.publish:
+        from model_registry import ModelRegistry
+
+        print(f"✓ В реестре: {ModelRegistry().publish(note='intent_classifier.py')}")
@@ -0,0 +1,200 @@
+"""
+intent_journal.py
+─────────────────
+Интенты, выученные во время работы бота (fallback get_response), без
+перезаписи custom_intents.json на каждое незнакомое сообщение.
+
+Раскладка (рядом со снимком):
+    custom_intents.json            – снимок {id: интент}, формат прежний
+    custom_intents.json.journal    – журнал: по JSON-строке на изменение
+        {"op": "put", "id": "c…", "intent": {...}}
+        {"op": "del", "id": "c…"}
+
+• add(id, intent) – под локом: повтор того же id только поднимает его
+  в LRU (на диск ничего не пишется), новый — строка в журнал; при
+  переполнении max_intents вытесняются давно не встречавшиеся
+• fsync пачками: фоновый поток сбрасывает журнал раз в sync_every
+  секунд или сразу после sync_batch новых строк (group commit)
+• компакция: после compact_every строк журнал ротируется в .old,
+  снимок пишется через tmp + os.replace, затем .old удаляется;
+  при открытии — снимок + .old + журнал (битая последняя строка
+  после падения пропускается), после чего сразу компакция
+• порядок LRU восстанавливается только по журналу: «поднятия» при
+  повторах живут в памяти до ближайшей компакции
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+class IntentJournal:
+    """Append-only журнал + периодически сжимаемый JSON-снимок выученных интентов."""
+
+    def __init__(
+        self,
+        snapshot: Path | str,
+        *,
+        max_intents: int = 5000,
+        sync_every: float = 1.0,
+        sync_batch: int = 64,
+        compact_every: int = 1000,
+    ) -> None:
+        """
+        max_intents   – сколько интентов хранить; лишние вытесняются (LRU)
+        sync_every    – не реже чем раз в столько секунд fsync журнала
+        sync_batch    – столько несброшенных строк → fsync сразу
+        compact_every – столько строк в журнале → переписать снимок
+        """
+        self.snapshot = Path(snapshot)
+        self.journal = self.snapshot.with_name(self.snapshot.name + ".journal")
+        self._old = self.journal.with_name(self.journal.name + ".old")
+        self.max_intents = max_intents
+        self.sync_every = sync_every
+        self.sync_batch = sync_batch
+        self.compact_every = compact_every
+
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._unsynced = 0                  # строк записано, но не fsync-нуто
+        self._records = 0                   # строк в текущем журнале
+
+        self._replay()
+        self._fh = open(self.journal, "a", encoding="utf-8")
+        self.compact()
+        self._thread = threading.Thread(target=self._sync_loop, name="intent-journal", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, intent_id: str) -> bool:
+        return intent_id in self._entries
+
+    def entries(self) -> Dict[str, dict]:
+        """Копия {id: интент} в порядке LRU (старые первыми)."""
+        with self._lock:
+            return dict(self._entries)
+
+    # ───────────── загрузка ─────────────
+    def _replay(self) -> None:
+        if self.snapshot.exists():
+            data = json.loads(self.snapshot.read_text("utf-8") or "{}")
+            self._entries.update((k, v) for k, v in data.items() if isinstance(v, dict))
+        for path in (self._old, self.journal):
+            if not path.exists():
+                continue
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:              # недописанная строка после падения
+                        continue
+                    if rec.get("op") == "put":
+                        self._entries.pop(rec["id"], None)
+                        self._entries[rec["id"]] = rec["intent"]
+                    elif rec.get("op") == "del":
+                        self._entries.pop(rec["id"], None)
+        self._evict()
+
+    # ───────────── запись ─────────────
+    def add(self, intent_id: str, intent: dict) -> Optional[List[str]]:
+        """
+        Записывает интент. None — такой id уже есть (только поднят в LRU);
+        иначе — список вытесненных id (обычно пустой).
+        """
+        with self._lock:
+            if intent_id in self._entries:
+                self._entries.move_to_end(intent_id)
+                return None
+            self._entries[intent_id] = intent
+            self._append({"op": "put", "id": intent_id, "intent": intent})
+            evicted = self._evict()
+            for eid in evicted:
+                self._append({"op": "del", "id": eid})
+        if self._unsynced >= self.sync_batch or self._records >= self.compact_every:
+            self._wake.set()
+        return evicted
+
+    def _append(self, rec: dict) -> None:
+        self._fh.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        self._unsynced += 1
+        self._records += 1
+
+    def _evict(self) -> List[str]:
+        evicted = []
+        while len(self._entries) > self.max_intents:
+            evicted.append(self._entries.popitem(last=False)[0])
+        return evicted
+
+    def sync(self) -> None:
+        """flush + fsync всего, что записано в журнал."""
+        with self._lock:
+            if not self._unsynced or self._fh.closed:
+                return
+            self._fh.flush()
+            self._unsynced = 0
+            fd = os.dup(self._fh.fileno())          # fsync без лока: add() не ждёт диск
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def compact(self) -> None:
+        """Переписывает снимок текущим состоянием и начинает журнал с нуля."""
+        with self._compact_lock:
+            with self._lock:
+                if self._fh.closed:
+                    return
+                self._fh.flush()
+                os.fsync(self._fh.fileno())
+                self._fh.close()
+                if self._old.exists():              # прошлая компакция не дописала снимок
+                    with open(self._old, "a", encoding="utf-8") as old:
+                        old.write(self.journal.read_text("utf-8"))
+                    self.journal.unlink()
+                else:
+                    os.replace(self.journal, self._old)
+                self._fh = open(self.journal, "a", encoding="utf-8")
+                self._unsynced = self._records = 0
+                data = dict(self._entries)
+            tmp = self.snapshot.with_name(self.snapshot.name + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(json.dumps(data, ensure_ascii=False, indent=4))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.snapshot)
+            self._old.unlink()
+
+    def _sync_loop(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.sync_every)
+            self._wake.clear()
+            try:
+                if self._records >= self.compact_every:
+                    self.compact()
+                else:
+                    self.sync()
+            except OSError as e:
+                print(f"[intent-journal] {e!r}")
+
+    def close(self) -> None:
+        """Последняя компакция и закрытие журнала (зовётся и из atexit)."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self.compact()
+        with self._lock:
+            self._fh.close()
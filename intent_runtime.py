@@ -0,0 +1,120 @@
+"""
+intent_runtime.py
+─────────────────
+Компактный инференс классификатора интентов — только numpy, без sklearn.
+
+Артефакт intent_model.npz пишет IntentClassifier.train() / export_compact():
+    word_vocab, char_vocab – отсортированные массивы n-грамм
+                             (позиция в массиве = номер признака)
+    word_idf,   char_idf   – idf-веса
+    coef_t                 – веса SGD, float64, (n_features, n_classes)
+    intercept              – свободные члены, float64
+    classes                – метки интентов
+    word_ngram, char_ngram – диапазоны n-грамм
+
+Признаки считает FusedTfidf (fused_features.py) — за один проход по тексту,
+бит-в-бит как TfidfVectorizer(sublinear_tf=True, norm="l2"); оценка — прямое
+скалярное произведение по ненулевым признакам, без валидации sklearn.
+Веса хранятся в float64, как у SGDClassifier: с float32 вероятности
+расходились с sklearn до ~5e-8 (артефакты с float32 при загрузке
+приводятся к float64).
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+
+from fused_features import FusedTfidf
+
+
+class CompactIntentModel:
+    """Загруженный intent_model.npz: word+char TF-IDF ➜ линейная модель."""
+
+    def __init__(
+        self,
+        word_vocab: np.ndarray,
+        word_idf: np.ndarray,
+        char_vocab: np.ndarray,
+        char_idf: np.ndarray,
+        coef_t: np.ndarray,
+        intercept: np.ndarray,
+        classes: np.ndarray,
+        word_ngram: Tuple[int, int] = (1, 2),
+        char_ngram: Tuple[int, int] = (3, 5),
+    ) -> None:
+        self.word_vocab = word_vocab
+        self.word_idf = word_idf
+        self.char_vocab = char_vocab
+        self.char_idf = char_idf
+        self.coef_t = np.array(coef_t, dtype=np.float64, order="C")      # копия, не вид на SGD
+        self.intercept = np.array(intercept, dtype=np.float64)
+        self.classes = classes
+        self.word_ngram = tuple(int(n) for n in word_ngram)
+        self.char_ngram = tuple(int(n) for n in char_ngram)
+        self.n_word = len(word_vocab)
+        self.fused = FusedTfidf(
+            word_vocab, word_idf, char_vocab, char_idf, self.word_ngram, self.char_ngram
+        )
+
+    # ───────────── экспорт / загрузка ─────────────
+    @classmethod
+    def from_sklearn(cls, v_word, v_char, clf) -> "CompactIntentModel":
+        """Собирает модель из обученных TfidfVectorizer×2 и SGDClassifier."""
+        def vocab(v) -> np.ndarray:
+            terms = np.array([str(t) for t in v.get_feature_names_out()])
+            if len(terms) > 1 and not np.all(terms[:-1] < terms[1:]):
+                raise ValueError("vocabulary_ не отсортирован по n-граммам")
+            return terms
+
+        for v, analyzer in ((v_word, "word"), (v_char, "char")):
+            if (v.analyzer != analyzer or not v.lowercase or not v.sublinear_tf
+                    or v.norm != "l2" or not v.use_idf or v.stop_words
+                    or (analyzer == "word" and v.tokenizer is not str.split)):
+                raise ValueError(f"неподдерживаемая конфигурация {analyzer}-векторайзера")
+
+        return cls(
+            word_vocab=vocab(v_word),
+            word_idf=np.asarray(v_word.idf_, dtype=np.float64),
+            char_vocab=vocab(v_char),
+            char_idf=np.asarray(v_char.idf_, dtype=np.float64),
+            coef_t=clf.coef_.T,
+            intercept=clf.intercept_,
+            classes=np.array([str(c) for c in clf.classes_]),
+            word_ngram=v_word.ngram_range,
+            char_ngram=v_char.ngram_range,
+        )
+
+    def save(self, path: Path | str) -> None:
+        np.savez(
+            path,
+            word_vocab=self.word_vocab, word_idf=self.word_idf,
+            char_vocab=self.char_vocab, char_idf=self.char_idf,
+            coef_t=self.coef_t, intercept=self.intercept, classes=self.classes,
+            word_ngram=np.array(self.word_ngram), char_ngram=np.array(self.char_ngram),
+        )
+
+    @classmethod
+    def load(cls, path: Path | str) -> "CompactIntentModel":
+        with np.load(path, allow_pickle=False) as z:
+            return cls(**{k: z[k] for k in z.files})
+
+    # ───────────── инференс ─────────────
+    def features(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Ненулевые признаки строки: (индексы в общем пространстве, значения)."""
+        _, indices, data = self.fused.transform_arrays([text])
+        return indices, data
+
+    def decision_function(self, texts: List[str]) -> np.ndarray:
+        """(n_texts, n_classes) — то же, что SGDClassifier.decision_function."""
+        indptr, indices, data = self.fused.transform_arrays(texts)
+        out = np.empty((len(indptr) - 1, len(self.classes)))
+        for row in range(len(out)):
+            a, b = indptr[row], indptr[row + 1]
+            out[row] = data[a:b] @ self.coef_t[indices[a:b]] + self.intercept
+        return out
+
+    def predict(self, texts: List[str]) -> np.ndarray:
+        return self.classes[self.decision_function(texts).argmax(axis=1)]
@@ -0,0 +1,256 @@
+"""
+metrics.py
+──────────
+Счётчики, gauge и гистограммы задержек в формате Prometheus, без внешних зависимостей.
+
+    RESPONSES.inc(stage, intent, modality)
+    with STT_SECONDS.time():
+        ...
+
+• значения меток передаются позиционно (в порядке labelnames) — на
+  горячем пути только perf_counter, bisect и словарь под локом
+• у каждой метрики не больше MAX_SERIES наборов меток, остальное
+  складывается в серию со значениями "other" (интенты из custom_intents
+  не раздувают вывод)
+• render() — текстовый формат Prometheus; serve(port) — GET /metrics
+  на 127.0.0.1 в фоновом потоке; dump(path) — атомарная запись в файл
+• GET /ready — 200/503 по set_readiness() (бот: готов ли текстовый контур)
+
+Из окружения (configure_from_env, зовётся из main() ботов):
+    METRICS_PORT=9108            – поднять HTTP-эндпоинт (METRICS_HOST, по умолчанию 127.0.0.1)
+    METRICS_FILE=metrics.prom    – писать снимок каждые
+    METRICS_DUMP_INTERVAL=60       METRICS_DUMP_INTERVAL секунд и при выходе
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence, Tuple
+
+#: границы корзин по умолчанию, секунды (от 0.5 мс до 30 с: от правил до STT)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REGISTRY: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Metric:
+    kind = ""
+    MAX_SERIES = 500
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        self._other = ("other",) * len(self.labelnames)
+        REGISTRY.append(self)
+
+    def _key(self, labels: Tuple[str, ...]) -> Tuple[str, ...]:
+        if labels in self._series or len(self._series) < self.MAX_SERIES:
+            return labels
+        return self._other
+
+    def _labels(self, key: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> Dict[Tuple[str, ...], object]:
+        """Снимок {значения меток: значение} (для отчётов и бенчмарков)."""
+        with self._lock:
+            return dict(self._series)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._series.items())
+        for key, value in items:
+            lines.extend(self._render_series(key, value))
+        return lines
+
+    def _render_series(self, key, value) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, value: float = 1) -> None:
+        with self._lock:
+            key = self._key(labels)
+            self._series[key] = self._series.get(key, 0) + value
+
+    def value(self, *labels: str) -> float:
+        return self._series.get(labels, 0)
+
+    def _render_series(self, key, value) -> List[str]:
+        return [f"{self.name}{self._labels(key)} {value:g}"]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._series[self._key(labels)] = value
+
+    def _render_series(self, key, value) -> List[str]:
+        return [f"{self.name}{self._labels(key)} {value:g}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, seconds: float, *labels: str) -> None:
+        i = bisect_left(self.buckets, seconds)
+        with self._lock:
+            key = self._key(labels)
+            s = self._series.get(key)
+            if s is None:
+                # [счётчики корзин (последняя — +Inf), сумма, количество]
+                s = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            s[0][i] += 1
+            s[1] += seconds
+            s[2] += 1
+
+    @contextmanager
+    def time(self, *labels: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, *labels)
+
+    def count(self, *labels: str) -> int:
+        s = self._series.get(labels)
+        return s[2] if s else 0
+
+    def _render_series(self, key, value) -> List[str]:
+        counts, total, n = value
+        lines, acc = [], 0
+        for le, c in zip((*self.buckets, "+Inf"), counts):
+            acc += c
+            le_label = 'le="%s"' % le
+            lines.append(f"{self.name}_bucket{self._labels(key, le_label)} {acc}")
+        lines.append(f"{self.name}_sum{self._labels(key)} {total:.6g}")
+        lines.append(f"{self.name}_count{self._labels(key)} {n}")
+        return lines
+
+
+# ───────────── метрики бота ─────────────
+RESPONSES = Counter(
+    "bot_responses_total", "Ответы get_response по стадии, интенту и модальности",
+    ("stage", "intent", "modality"),
+)
+RESPONSE_ERRORS = Counter(
+    "bot_response_errors_total", "Исключения внутри get_response по стадии", ("stage",),
+)
+RESPONSE_SECONDS = Histogram(
+    "bot_response_seconds", "Время get_response по ответившей стадии", ("stage", "modality"),
+)
+STT_SECONDS = Histogram("bot_stt_seconds", "Распознавание речи (stt_from_wav)")
+TTS_SECONDS = Histogram("bot_tts_seconds", "Синтез речи в WAV (pyttsx3)")
+AUDIO_SECONDS = Histogram(
+    "bot_audio_convert_seconds", "Конвертации pydub/ffmpeg", ("op",),
+)
+MEMORY_SECONDS = Histogram(
+    "bot_memory_io_seconds", "Чтение/запись file_memory", ("op",),
+)
+PIPELINE_WAIT_SECONDS = Histogram(
+    "bot_pipeline_wait_seconds", "Ожидание в update_pipeline: очередь чата / свободный поток пула", ("pool",),
+)
+PIPELINE_CHATS = Gauge("bot_pipeline_chats", "Чатов с необработанными апдейтами (update_pipeline)")
+STARTUP_SECONDS = Gauge(
+    "bot_startup_seconds", "Время загрузки компонента при старте (resources.py)", ("component",),
+)
+
+
+# ───────────── вывод ─────────────
+def render() -> str:
+    return "\n".join(line for m in REGISTRY for line in m.render()) + "\n"
+
+
+def dump(path: Path | str) -> None:
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(render(), "utf-8")
+    os.replace(tmp, path)
+
+
+_readiness: Callable[[], Tuple[bool, dict]] = lambda: (True, {})
+
+
+def set_readiness(check: Callable[[], Tuple[bool, dict]]) -> None:
+    """check() → (готов, подробности) для GET /ready (200 или 503 + JSON)."""
+    global _readiness
+    _readiness = check
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        path = self.path.split("?")[0]
+        if path == "/ready":
+            ok, detail = _readiness()
+            self._send(200 if ok else 503, json.dumps(detail, ensure_ascii=False),
+                       "application/json; charset=utf-8")
+        elif path in ("/metrics", "/"):
+            self._send(200, render(), "text/plain; version=0.0.4; charset=utf-8")
+        else:
+            self.send_error(404)
+
+    def _send(self, code: int, text: str, content_type: str) -> None:
+        body = text.encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:           # не засоряем stdout бота
+        pass
+
+
+def serve(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Поднимает /metrics в фоновом потоке; возвращает сервер (shutdown() — остановить)."""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def configure_from_env() -> None:
+    """METRICS_PORT / METRICS_FILE / METRICS_DUMP_INTERVAL — см. docstring модуля."""
+    if port := os.getenv("METRICS_PORT"):
+        host = os.getenv("METRICS_HOST", "127.0.0.1")
+        serve(int(port), host)
+        print(f"[metrics] http://{host}:{port}/metrics")
+    if path := os.getenv("METRICS_FILE"):
+        interval = float(os.getenv("METRICS_DUMP_INTERVAL", "60"))
+        atexit.register(dump, path)
+
+        def _loop() -> None:
+            while True:
+                time.sleep(interval)
+                dump(path)
+
+        threading.Thread(target=_loop, name="metrics-dump", daemon=True).start()
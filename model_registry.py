@@ -0,0 +1,311 @@
+"""
+model_registry.py
+─────────────────
+Версионированный реестр моделей интентов + горячая перезагрузка без рестарта.
+
+Раскладка (models/intent/):
+    v0001/                  – бандл: intent_model.npz (+ intent_*.pkl и held-out для
+        manifest.json         дообучения) и манифест с sha256 каждого файла
+    v0002/
+    CURRENT                 – активная версия (пишется через os.replace)
+
+• ModelRegistry.publish()  – копирует артефакты train() в новую версию
+  (сначала во временный каталог, потом атомарный rename)
+• ModelReloader.reload()   – в фоне: проверка checksum → загрузка
+  CompactIntentModel → прогрев на примерах датасета → подмена clf.runtime
+  одним присваиванием → CURRENT. Любая ошибка — старая модель остаётся.
+• ModelReloader.rollback() – назад к предыдущей активной версии
+
+    python model_registry.py publish [--note "..."]
+    python model_registry.py list
+    python model_registry.py activate v0002
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from intent_runtime import CompactIntentModel
+
+BASE_DIR     = Path(__file__).parent
+REGISTRY_DIR = BASE_DIR / "models" / "intent"
+
+MODEL_NAME = "intent_model.npz"
+OPTIONAL   = ("intent_clf.pkl", "intent_v_word.pkl", "intent_v_char.pkl", "intent_holdout.json")
+MANIFEST   = "manifest.json"
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, "utf-8")
+    os.replace(tmp, path)
+
+
+# ──────────────────────────────  РЕЕСТР  ──────────────────────────────
+class ModelRegistry:
+    """Каталог версий vNNNN/ с манифестами и указателем CURRENT."""
+
+    def __init__(self, root: Path | str = REGISTRY_DIR) -> None:
+        self.root = Path(root)
+
+    # ───────────── версии ─────────────
+    def versions(self) -> List[str]:
+        if not self.root.is_dir():
+            return []
+        return sorted(
+            p.name for p in self.root.iterdir()
+            if p.is_dir() and p.name.startswith("v") and (p / MANIFEST).exists()
+        )
+
+    def latest(self) -> Optional[str]:
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    def current(self) -> Optional[str]:
+        ptr = self.root / "CURRENT"
+        if not ptr.exists():
+            return None
+        version = ptr.read_text("utf-8").strip()
+        return version if version in self.versions() else None
+
+    def path(self, version: str) -> Path:
+        return self.root / version
+
+    def manifest(self, version: str) -> dict:
+        return json.loads((self.path(version) / MANIFEST).read_text("utf-8"))
+
+    def activate(self, version: str) -> None:
+        """Переключает CURRENT (сам процесс бота это не перезагружает)."""
+        if version not in self.versions():
+            raise KeyError(f"нет такой версии: {version}")
+        _write_atomic(self.root / "CURRENT", version + "\n")
+
+    # ───────────── публикация ─────────────
+    def publish(self, src_dir: Path | str = BASE_DIR, note: str = "") -> str:
+        """
+        Копирует intent_model.npz (+ *.pkl, если есть) из src_dir
+        в новую версию и возвращает её имя. CURRENT не трогает.
+        """
+        src_dir = Path(src_dir)
+        if not (src_dir / MODEL_NAME).exists():
+            raise FileNotFoundError(f"нет {MODEL_NAME} в {src_dir}")
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        latest = self.latest()
+        version = f"v{int(latest[1:]) + 1 if latest else 1:04d}"
+        tmp = self.root / f".{version}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir()
+
+        files: Dict[str, dict] = {}
+        for name in (MODEL_NAME, *OPTIONAL):
+            src = src_dir / name
+            if not src.exists():
+                continue
+            shutil.copy2(src, tmp / name)
+            files[name] = dict(sha256=_sha256(tmp / name), bytes=(tmp / name).stat().st_size)
+
+        model = CompactIntentModel.load(tmp / MODEL_NAME)
+        manifest = dict(
+            version=version,
+            created=datetime.utcnow().isoformat(timespec="seconds"),
+            parent=self.current(),
+            note=note,
+            classes=len(model.classes),
+            features=len(model.word_vocab) + len(model.char_vocab),
+            files=files,
+        )
+        (tmp / MANIFEST).write_text(
+            json.dumps(manifest, ensure_ascii=False, indent=2), "utf-8"
+        )
+        os.rename(tmp, self.path(version))
+        return version
+
+    # ───────────── проверка / загрузка ─────────────
+    def verify(self, version: str) -> dict:
+        """Сверяет размеры и sha256 файлов с манифестом; ValueError при расхождении."""
+        manifest = self.manifest(version)
+        if MODEL_NAME not in manifest["files"]:
+            raise ValueError(f"{version}: в манифесте нет {MODEL_NAME}")
+        for name, meta in manifest["files"].items():
+            path = self.path(version) / name
+            if not path.exists():
+                raise ValueError(f"{version}: отсутствует {name}")
+            if path.stat().st_size != meta["bytes"] or _sha256(path) != meta["sha256"]:
+                raise ValueError(f"{version}: checksum {name} не совпадает")
+        return manifest
+
+    def load(self, version: str) -> CompactIntentModel:
+        self.verify(version)
+        return CompactIntentModel.load(self.path(version) / MODEL_NAME)
+
+
+# ─────────────────────────  ГОРЯЧАЯ ПЕРЕЗАГРУЗКА  ──────────────────────────
+class ModelReloader:
+    """
+    Фоновая загрузка версии из реестра и атомарная подмена модели в
+    IntentClassifier. Запросы во время загрузки обслуживает старая модель.
+    """
+
+    #: минимальная accuracy на прогревочных примерах, иначе — откат
+    MIN_ACCURACY: float = 0.80
+    #: сколько примеров каждого интента брать для прогрева
+    WARMUP_PER_INTENT: int = 2
+
+    def __init__(
+        self,
+        clf,
+        registry: ModelRegistry | None = None,
+        learner=None,
+        *,
+        min_accuracy: float | None = None,
+    ) -> None:
+        """learner – OnlineIntentLearner: после подмены он перестраивается на новую версию."""
+        self.clf = clf
+        self.registry = registry or ModelRegistry()
+        self.learner = learner
+        self.min_accuracy = self.MIN_ACCURACY if min_accuracy is None else min_accuracy
+        self.active: Optional[str] = self.registry.current()
+        self.history: List[str] = []          # ранее активные версии (для rollback)
+        self.reports: List[dict] = []
+        self._lock = threading.Lock()
+
+    def reload(self, version: str | None = None, *, wait: bool = False):
+        """
+        Загружает version (по умолчанию — самую свежую) в фоновом потоке.
+        wait=True – синхронно, возвращает отчёт; иначе возвращает поток.
+        """
+        if wait:
+            return self._reload(version)
+        t = threading.Thread(
+            target=self._reload, args=(version,), name="model-reload", daemon=True
+        )
+        t.start()
+        return t
+
+    def rollback(self, *, wait: bool = False):
+        """Возвращает предыдущую активную версию."""
+        if not self.history:
+            raise RuntimeError("откатываться некуда: история версий пуста")
+        return self.reload(self.history[-1], wait=wait)
+
+    def _reload(self, version: str | None) -> dict:
+        with self._lock:
+            t0 = time.perf_counter()
+            version = version or self.registry.latest()
+            report = dict(version=version, previous=self.active, ok=False)
+            try:
+                if version is None:
+                    raise RuntimeError(f"реестр {self.registry.root} пуст")
+                model = self.registry.load(version)
+                report["warmup_acc"] = self._warmup(model)
+                if report["warmup_acc"] < self.min_accuracy:
+                    raise ValueError(
+                        f"accuracy прогрева {report['warmup_acc']:.3f} "
+                        f"< {self.min_accuracy:.2f}"
+                    )
+                self._swap(model, self.registry.path(version))
+                self.registry.activate(version)
+            except Exception as e:
+                report["error"] = str(e)
+                print(f"[reload] {version}: {e} — остаётся {self.active or 'исходная модель'}")
+            else:
+                report["ok"] = True
+                if self.active and self.active != version:
+                    if self.history and self.history[-1] == version:
+                        self.history.pop()             # это был rollback
+                    else:
+                        self.history.append(self.active)
+                self.active = version
+                print(
+                    f"[reload] активна {version} (было {report['previous']}), "
+                    f"прогрев acc {report['warmup_acc']:.3f}"
+                )
+            report["seconds"] = time.perf_counter() - t0
+            self.reports.append(report)
+            return report
+
+    def _warmup(self, model: CompactIntentModel) -> float:
+        """Гоняет примеры датасета через модель: прогрев + проверка качества."""
+        pairs = [
+            (intent, ex)
+            for intent, exs in self.clf.norm_examples.items()
+            for ex in exs[: self.WARMUP_PER_INTENT]
+        ]
+        if not pairs:
+            return 1.0
+        scores = model.decision_function([ex for _, ex in pairs])
+        if not np.all(np.isfinite(scores)):
+            raise ValueError("модель выдаёт nan/inf")
+        pred = model.classes[scores.argmax(axis=1)]
+        known = set(map(str, model.classes))
+        hits = [p == i for p, (i, _) in zip(pred, pairs) if i in known]
+        return float(np.mean(hits)) if hits else 0.0
+
+    def _swap(self, model: CompactIntentModel, model_dir: Path) -> None:
+        clf = self.clf
+
+        def swap() -> None:
+            clf.model_dir = model_dir
+            clf.runtime = model
+
+        if self.learner is not None:
+            self.learner.rebase(swap)
+        else:
+            swap()
+
+
+# ───────────── CLI ─────────────
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Реестр моделей интентов")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_pub = sub.add_parser("publish", help="сохранить артефакты train() как новую версию")
+    p_pub.add_argument("--src", default=str(BASE_DIR))
+    p_pub.add_argument("--note", default="")
+    p_pub.add_argument("--activate", action="store_true",
+                       help="сразу сделать её CURRENT (для следующего старта)")
+    sub.add_parser("list", help="версии и активная")
+    p_act = sub.add_parser("activate", help="переключить CURRENT")
+    p_act.add_argument("version")
+    p_ver = sub.add_parser("verify", help="сверить checksum")
+    p_ver.add_argument("version")
+    args = ap.parse_args()
+
+    reg = ModelRegistry()
+    if args.cmd == "publish":
+        v = reg.publish(args.src, note=args.note)
+        if args.activate:
+            reg.activate(v)
+        print(f"✓ опубликована {v}")
+    elif args.cmd == "list":
+        cur = reg.current()
+        for v in reg.versions():
+            m = reg.manifest(v)
+            print(f"{'*' if v == cur else ' '} {v}  {m['created']}  "
+                  f"{m['classes']} классов  {m.get('note', '')}")
+    elif args.cmd == "activate":
+        reg.activate(args.version)
+        print(f"✓ CURRENT = {args.version}")
+    elif args.cmd == "verify":
+        reg.verify(args.version)
+        print(f"✓ {args.version}: checksum в порядке")
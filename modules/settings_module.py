@@ -2,6 +2,8 @@
 
 from telegram.ext import CommandHandler, MessageHandler, Filters
 
+from nlp_utils import normalized
+
 def cmd_settings(update, context):
     """
     /settings — запускает диалог настройки уведомлений
@@ -21,7 +23,7 @@ def handle_yesno(update, context):
     if state != "toggle_notifications":
         return  # не наша ситуация — передаём дальше
 
-    text = update.message.text.strip().lower()
+    text = normalized(update).lower
     if text in ("да", "yes", "y"):
         context.user_data["daily_notifications"] = False
         update.message.reply_text("Окей, ежедневные уведомления отключены.")
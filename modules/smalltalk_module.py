@@ -1,16 +1,19 @@
 from telegram.ext import MessageHandler, Filters, DispatcherHandlerStop
 
-TOXIC = {"дурак", "тупой", "убью", "сдохни", "ты дурак", "пошел ты", "ты идиот", "бесишь тварь", "ты долбаный дятел", "мудак", "какой ты дебил", "иди в жопу", "отвали идиот", "долбоеб", "иди на хрен", "ты тупой", "лох", "ублюдок", "выблядок", "придурок", "глупый", "уёбок", "шлюха", "сын шлюхи", "дебил", "дибил"}
-MALICIOUS = {"взрыв", "убить", "бомба", "сделать взрыв", "убийство"}    # запрещённые темы
+from nlp_utils import NormalizedText, normalized
+from content_filter import CONTENT_FILTER
 
 def smalltalk_filter(update, context):
-    text = (update.message.text or "").lower()
+    # NormalizedText.matcher ставит bot_logic вместе с движком ответов: тот же
+    # проход по тексту потом переиспользует get_response (триггеры, категории);
+    # пока движка нет (грузится / не поднялся) — собственный автомат фильтра
+    hits = normalized(update).matches(NormalizedText.matcher or CONTENT_FILTER)
 
-    if any(w in text for w in TOXIC):
+    if "toxic" in hits:
         update.message.reply_text("Пожалуйста, без оскорблений.")
         raise DispatcherHandlerStop()     # ← прерываем цепочку
 
-    if any(w in text for w in MALICIOUS):
+    if "malicious" in hits:
         update.message.reply_text("Извини, в этом я помочь не могу.")
         raise DispatcherHandlerStop()     # ← стоп!
 
@@ -1,13 +1,84 @@
 # nlp_utils.py
+import os
 import re
+import threading
+from collections import Counter, OrderedDict
+from functools import cached_property
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
 from Levenshtein import distance as lev_distance
-from natasha import Segmenter, NewsEmbedding, NewsMorphTagger, MorphVocab, Doc
 
-# инициализация Natasha
-_segmenter = Segmenter()
-_emb = NewsEmbedding()
-_morph_tagger = NewsMorphTagger(_emb)
-_morph_vocab = MorphVocab()
+from pattern_matcher import PatternMatcher
+from spell_index import SpellIndex
+
+# ─── Natasha: ленивая инициализация ───
+# Модели грузятся при первой лемматизации (или явным warmup()), поэтому
+# импорт nlp_utils ради clean_text ничего не стоит. Массивы эмбеддингов
+# navec один раз распаковываются в .natasha_cache/*.npy и открываются
+# через mmap: несколько процессов бота делят одну физическую копию.
+EMB_CACHE_DIR = Path(__file__).parent / ".natasha_cache"
+_natasha = None
+_natasha_lock = threading.Lock()
+
+def _mapped_embedding():
+    """NewsEmbedding, у которого pq.indexes / pq.codes — np.memmap (только чтение)."""
+    from natasha.data import NEWS_EMBEDDING
+    from navec import Navec
+    from navec.meta import Meta
+    from navec.pq import PQ
+    from navec.tar import Tar
+    from navec.vocab import Vocab
+
+    class MappedPQ(PQ):
+        # norm / ab нужны только для Navec.sim(); теггеру хватает indexes + codes,
+        # а precompute() аллоцировал бы vectors × qdim float32 в каждом процессе
+        def precompute(self):
+            pass
+
+    stem = EMB_CACHE_DIR / Path(NEWS_EMBEDDING).stem
+    idx_f, codes_f = Path(f"{stem}.indexes.npy"), Path(f"{stem}.codes.npy")
+    with Tar(NEWS_EMBEDDING) as tar:
+        meta = Meta.from_file(tar.load('meta.json'))
+        Meta.check_protocol(meta.protocol)
+        vocab = Vocab.from_file(tar.load('vocab.bin'))
+        if not (idx_f.exists() and codes_f.exists()):
+            pq = PQ.from_file(tar.load('pq.bin'))
+            EMB_CACHE_DIR.mkdir(exist_ok=True)
+            for path, arr in ((idx_f, pq.indexes), (codes_f, pq.codes)):
+                tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+                with open(tmp, 'wb') as f:
+                    np.save(f, arr)
+                os.replace(tmp, path)            # параллельные воркеры не мешают друг другу
+    indexes = np.load(idx_f, mmap_mode='r')
+    codes = np.load(codes_f, mmap_mode='r')
+    qdim, centroids, chunk = codes.shape
+    pq = MappedPQ(len(indexes), qdim * chunk, qdim, centroids, indexes, codes)
+    return Navec(meta, vocab, pq)
+
+def _nlp() -> SimpleNamespace:
+    """Segmenter / MorphTagger / MorphVocab — создаются один раз, при первом обращении."""
+    global _natasha
+    if _natasha is None:
+        with _natasha_lock:
+            if _natasha is None:
+                from natasha import Doc, MorphVocab, NewsMorphTagger, Segmenter
+
+                _natasha = SimpleNamespace(
+                    Doc=Doc,
+                    segmenter=Segmenter(),
+                    morph_tagger=NewsMorphTagger(_mapped_embedding()),
+                    morph_vocab=MorphVocab(),
+                )
+    return _natasha
+
+def warmup() -> None:
+    """Явно загружает модели Natasha и прогоняет короткую фразу (перед стартом бота)."""
+    nlp = _nlp()
+    doc = nlp.Doc("привет как дела")
+    doc.segment(nlp.segmenter)
+    doc.tag_morph(nlp.morph_tagger)
 
 def clean_text(text: str) -> str:
     """
@@ -18,10 +89,13 @@ def clean_text(text: str) -> str:
     text = re.sub(r'\s+', ' ', text).strip()
     return text
 
-def correct_spelling(word: str, dictionary: set, max_dist: int = 2) -> str:
+def correct_spelling(word: str, dictionary: set | SpellIndex, max_dist: int = 2) -> str:
     """
     Проверяем слово в словаре; если нет — ищем ближайшее по Левенштейну.
+    dictionary — SpellIndex (быстро, см. spell_index.py) или просто set (полный перебор).
     """
+    if isinstance(dictionary, SpellIndex):
+        return dictionary.correct(word, max_dist)
     if word in dictionary:
         return word
     # ищем кандидатов с допустимой dist
@@ -29,13 +103,226 @@ def correct_spelling(word: str, dictionary: set, max_dist: int = 2) -> str:
     best = min(candidates, key=lambda w: lev_distance(w, word), default=word)
     return best if lev_distance(best, word) <= max_dist else word
 
+def correct_text(text: str, index: SpellIndex, max_dist: int = 2) -> str:
+    """
+    clean_text + исправление всех слов фразы через SpellIndex за один вызов.
+    """
+    return ' '.join(index.correct_many(clean_text(text).split(), max_dist))
+
+# ─── кэш лемм ───
+# LRU: нормализованный текст → леммы. Одно и то же сообщение лемматизируется
+# несколько раз за get_response (классификатор, sentiment, retriever), а
+# короткие реплики («привет», «ещё») повторяются между пользователями.
+LEMMA_CACHE_SIZE = 50_000
+_lemma_cache: "OrderedDict[str, str]" = OrderedDict()
+_lemma_lock = threading.Lock()
+_lemma_stats = Counter()
+
+# токен → лемма для известного словаря (см. build_lemma_table): если все токены
+# фразы в таблице, морф-теггер не нужен
+_lemma_table: dict = {}
+
+def _lemma_key(text: str) -> str:
+    return ' '.join(text.split())
+
+def _tag_many(texts: list) -> list:
+    """Natasha-пайплайн для пачки текстов: все предложения — в один tagger.map."""
+    nlp = _nlp()
+    docs = [nlp.Doc(t) for t in texts]
+    sents = []
+    for doc in docs:
+        doc.segment(nlp.segmenter)
+        sents.extend(doc.sents)
+    markups = nlp.morph_tagger.map([[t.text for t in s.tokens] for s in sents])
+    for sent, markup in zip(sents, markups):
+        for token, src in zip(sent.tokens, markup.tokens):
+            token.pos, token.feats = src.pos, src.feats
+    for doc in docs:
+        for token in doc.tokens:
+            token.lemmatize(nlp.morph_vocab)
+    return docs
+
+def _from_table(text: str):
+    """Леммы по таблице или None, если хотя бы один токен неизвестен."""
+    if not _lemma_table:
+        return None
+    lemmas = []
+    for token in _nlp().segmenter.tokenize(text):
+        lemma = _lemma_table.get(token.text)
+        if lemma is None:
+            return None
+        lemmas.append(lemma)
+    return ' '.join(lemmas)
+
+def lemmatize_many(texts: list) -> list:
+    """
+    lemmatize_text для списка текстов: кэш → таблица лемм → один прогон
+    Natasha на все оставшиеся (обучение, replay логов).
+    """
+    keys = [_lemma_key(t) for t in texts]
+    out, todo = {}, []
+    with _lemma_lock:
+        for k in keys:
+            if k in out:
+                continue
+            if k in _lemma_cache:
+                _lemma_cache.move_to_end(k)
+                out[k] = _lemma_cache[k]
+                _lemma_stats['hits'] += 1
+            else:
+                out[k] = None
+                todo.append(k)
+                _lemma_stats['misses'] += 1
+
+    tag = []
+    for k in todo:
+        lemmas = _from_table(k)
+        if lemmas is None:
+            tag.append(k)
+        else:
+            out[k] = lemmas
+    if tag:
+        for k, doc in zip(tag, _tag_many(tag)):
+            out[k] = ' '.join(t.lemma for t in doc.tokens)
+
+    with _lemma_lock:
+        _lemma_stats['table'] += len(todo) - len(tag)
+        _lemma_stats['tagged'] += len(tag)
+        for k in todo:
+            _lemma_cache[k] = out[k]
+        while len(_lemma_cache) > LEMMA_CACHE_SIZE:
+            _lemma_cache.popitem(last=False)
+    return [out[k] for k in keys]
+
 def lemmatize_text(text: str) -> str:
     """
     Возвращает исходную фразу, преобразованную в леммы.
     """
-    doc = Doc(text)
-    doc.segment(_segmenter)
-    doc.tag_morph(_morph_tagger)
-    for token in doc.tokens:
-        token.lemmatize(_morph_vocab)
-    return ' '.join([t.lemma for t in doc.tokens])
+    return lemmatize_many([text])[0]
+
+def build_lemma_table(texts) -> int:
+    """
+    Заполняет таблицу токен → лемма по корпусу (примеры интентов, диалоги;
+    сырые фразы проходят clean_text). Берутся только токены, у которых во
+    всём корпусе одна лемма и она же — у токена без контекста.
+
+    Лемма Natasha зависит от соседних слов, так что и такая таблица
+    расходится с теггером на фразах, которых нет в корпусе (на случайных
+    сочетаниях слов корпуса — в части фраз). Поэтому таблица выключена,
+    пока её не построили явно: бот включает её только с LEMMA_TABLE=1.
+    Возвращает размер таблицы.
+    """
+    seen: dict = {}
+    cleaned = {_lemma_key(clean_text(t)) for t in texts}
+    for doc in _tag_many(sorted(cleaned - {''})):
+        for token in doc.tokens:
+            seen.setdefault(token.text, set()).add(token.lemma)
+    single = sorted(w for w, ls in seen.items() if len(ls) == 1)
+    alone = _tag_many(single)
+    _lemma_table.clear()
+    for w, doc in zip(single, alone):
+        lemma = next(iter(seen[w]))
+        if [t.lemma for t in doc.tokens] == [lemma]:
+            _lemma_table[w] = lemma
+    return len(_lemma_table)
+
+def lemma_cache_stats() -> dict:
+    """hits / misses / hit_rate кэша, сколько фраз собрано по таблице и сколько прогнано через теггер."""
+    with _lemma_lock:
+        st = dict(_lemma_stats)
+        size = len(_lemma_cache)
+    total = st.get('hits', 0) + st.get('misses', 0)
+    return dict(
+        hits=st.get('hits', 0), misses=st.get('misses', 0),
+        hit_rate=st.get('hits', 0) / total if total else 0.0,
+        table=st.get('table', 0), tagged=st.get('tagged', 0),
+        size=size, table_size=len(_lemma_table),
+    )
+
+# ─── одна нормализация на сообщение ───
+class NormalizedText:
+    """
+    Все формы одного сообщения; каждая считается лениво и один раз.
+
+        raw        – как пришло
+        lower      – raw.lower().strip()                (триггеры, «ещё», команды)
+        stripped   – lower без знаков препинания        (low_clean в get_response)
+        cleaned    – clean_text(raw)
+        corrected  – cleaned с исправленными опечатками (NormalizedText.speller)
+        lemma      – lemmatize_text(corrected)          (классификатор, sentiment, retriever)
+        matches()  – совпадения PatternMatcher по lower (триггеры, мат, категории)
+
+    IntentClassifier, get_sentiment, DialogueRetriever и модули принимают
+    его вместо строки — тогда нормализацию они не повторяют.
+    """
+
+    #: SpellIndex для corrected; None — без исправления опечаток
+    speller: SpellIndex | None = None
+    #: PatternMatcher для matches() по умолчанию (ставит движок ответов)
+    matcher: PatternMatcher | None = None
+
+    def __init__(self, raw: str, speller: SpellIndex | None = None) -> None:
+        self.raw = raw or ''
+        if speller is not None:
+            self.speller = speller
+
+    def __str__(self) -> str:
+        return self.raw
+
+    def __repr__(self) -> str:
+        return f"NormalizedText({self.raw!r})"
+
+    @cached_property
+    def lower(self) -> str:
+        return self.raw.lower().strip()
+
+    def matches(self, matcher: PatternMatcher | None = None) -> dict:
+        """{тег: шаблоны}; повторный вызов с тем же автоматом — из кэша."""
+        matcher = matcher or self.matcher
+        if matcher is None:
+            return {}
+        cached = self.__dict__.get("_matches")
+        if cached is None or cached[0] is not matcher:
+            cached = self.__dict__["_matches"] = (matcher, matcher.search(self.lower))
+        return cached[1]
+
+    @cached_property
+    def stripped(self) -> str:
+        return re.sub(r'[^а-яёa-z0-9\s]', '', self.lower)
+
+    @cached_property
+    def cleaned(self) -> str:
+        return clean_text(self.raw)
+
+    @cached_property
+    def corrected(self) -> str:
+        if self.speller is None:
+            return self.cleaned
+        return ' '.join(self.speller.correct_many(self.cleaned.split()))
+
+    @cached_property
+    def lemma(self) -> str:
+        return lemmatize_text(self.corrected)
+
+def as_lemma(text) -> str:
+    """Вход классификатора: NormalizedText.lemma или lemmatize_text(clean_text(str))."""
+    if isinstance(text, NormalizedText):
+        return text.lemma
+    return lemmatize_text(clean_text(text))
+
+# апдейт → NormalizedText: все хэндлеры одного сообщения (фильтр, настройки,
+# основная логика) делят один объект; держим последние _UPDATE_CACHE_SIZE
+_UPDATE_CACHE_SIZE = 256
+_update_texts: "OrderedDict[int, NormalizedText]" = OrderedDict()
+_update_lock = threading.Lock()
+
+def normalized(update) -> NormalizedText:
+    """NormalizedText текста сообщения из Telegram-апдейта (один на update_id)."""
+    with _update_lock:
+        nt = _update_texts.get(update.update_id)
+        if nt is None:
+            msg = update.message
+            nt = _update_texts[update.update_id] = NormalizedText(msg.text if msg else '')
+            if len(_update_texts) > _UPDATE_CACHE_SIZE:
+                _update_texts.popitem(last=False)
+        return nt
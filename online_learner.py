@@ -0,0 +1,299 @@
+"""
+online_learner.py
+─────────────────
+Фоновое дообучение классификатора интентов на примерах, выученных
+во время работы бота (stage 19 get_response → custom_intents.json).
+
+• add(intent, text) – неблокирующая постановка примера в очередь
+• рабочий поток копит батч (batch_size примеров или flush_every секунд),
+  расширяет словари n-грамм и список классов, делает partial_fit
+  на копии SGD (новые примеры + replay из датасета) и атомарно
+  подменяет clf.runtime новой CompactIntentModel
+• после каждого обновления — отчёт: время, accuracy до/после на held-out,
+  который train() отложил в intent_holdout.json (модель его не видела;
+  в replay он тоже не попадает)
+• rebase() – подмена базовой версии (model_registry) под локом обновления;
+  выученные примеры дообучаются поверх новой версии
+
+Нужны intent_*.pkl и sklearn; импортируются только при первом обновлении.
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import pickle
+import queue
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from fuzzy_index import NgramIndex
+from intent_classifier import CHAR_F, CLF_F, HOLDOUT_F, WORD_F, IntentClassifier
+from fused_features import char_ngrams, word_ngrams
+from intent_runtime import CompactIntentModel
+from nlp_utils import clean_text, lemmatize_many
+
+_STOP = object()
+_REFIT = object()      # дообучить выученное без новых примеров (после rebase)
+
+
+class OnlineIntentLearner:
+    """Батчевый partial_fit в фоне + атомарная подмена модели в IntentClassifier."""
+
+    def __init__(
+        self,
+        clf: IntentClassifier,
+        *,
+        batch_size: int = 16,
+        flush_every: float = 30.0,
+        epochs: int = 5,
+        replay: int = 64,
+        seed: int = 42,
+    ) -> None:
+        """replay – сколько примеров датасета подмешивать к каждому батчу"""
+        self.clf = clf
+        self.batch_size = batch_size
+        self.flush_every = flush_every
+        self.epochs = epochs
+        self.replay = replay
+        self._rng = random.Random(seed)
+
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._update_lock = threading.Lock()
+
+        self._sgd = None                               # float64-копия SGD
+        self._model: Optional[CompactIntentModel] = None
+        self._pool: List[Tuple[str, str]] = []         # replay (интент, норм. текст)
+        self._holdout: List[Tuple[str, str]] = []
+        self.learned: Dict[str, List[str]] = defaultdict(list)
+        self.reports: List[dict] = []
+
+    # ───────────── очередь / поток ─────────────
+    def add(self, intent: str, text: str) -> None:
+        """Ставит пример в очередь дообучения; поток стартует при первом вызове."""
+        self._queue.put((intent, text))
+        self.start()
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="intent-learner", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Дообучает то, что уже в очереди, и останавливает поток."""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def _collect(self) -> Optional[List[Tuple[str, str]]]:
+        first = self._queue.get()
+        if first is _STOP:
+            return None
+        if first is _REFIT:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.flush_every
+        while len(batch) < self.batch_size:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=left)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            if item is not _REFIT:
+                batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while (batch := self._collect()) is not None:
+            try:
+                self.update(batch)
+            except Exception as e:
+                print(f"[learner] обновление не удалось: {e}")
+
+    # ───────────── обновление модели ─────────────
+    def update(self, batch: List[Tuple[str, str]]) -> dict:
+        """
+        Синхронно дообучает модель на [(интент, текст)] и подменяет её в clf.
+        Возвращает отчёт (его же кладёт в self.reports).
+        """
+        with self._update_lock:
+            t0 = time.perf_counter()
+            if self._sgd is None:
+                self._bootstrap()
+
+            norms = lemmatize_many([clean_text(text) for _, text in batch])
+            new = [(intent, norm) for (intent, _), norm in zip(batch, norms)]
+            for intent, norm in new:
+                self.learned[intent].append(norm)
+            learned = [(i, n) for i, ns in self.learned.items() for n in ns]
+
+            # после rebase() база — свежая версия: выученное добавляется заново
+            base = self._model
+            model = self._extend_vocab(base, [n for _, n in learned])
+            sgd = copy.deepcopy(self._sgd)
+            self._remap_features(sgd, base, model)
+            new_classes = self._extend_classes(sgd, set(self.learned))
+
+            replay = self._rng.sample(self._pool, min(self.replay, len(self._pool)))
+            X, y = self._matrix(model, learned + replay)
+            for _ in range(self.epochs):
+                sgd.partial_fit(X, y)
+
+            updated = CompactIntentModel(
+                word_vocab=model.word_vocab, word_idf=model.word_idf,
+                char_vocab=model.char_vocab, char_idf=model.char_idf,
+                coef_t=sgd.coef_.T, intercept=sgd.intercept_,
+                classes=np.array([str(c) for c in sgd.classes_]),
+                word_ngram=model.word_ngram, char_ngram=model.char_ngram,
+            )
+            acc_before = self._accuracy(self.clf.runtime or base, self._holdout)
+            acc_after = self._accuracy(updated, self._holdout)
+
+            # — сначала примеры (fuzzy/exact должны знать новые классы), потом модель —
+            self._register(new)
+            self.clf.runtime = updated
+            self._sgd, self._model = sgd, model
+
+            report = dict(
+                seconds=time.perf_counter() - t0,
+                examples=len(new),
+                new_classes=sorted(new_classes),
+                new_features=len(model.word_vocab) + len(model.char_vocab)
+                             - len(base.word_vocab) - len(base.char_vocab),
+                holdout_acc_before=acc_before,
+                holdout_acc_after=acc_after,
+                batch_acc=self._accuracy(updated, new),
+            )
+            self.reports.append(report)
+            print(
+                f"[learner] +{report['examples']} примеров, "
+                f"+{len(new_classes)} классов, +{report['new_features']} признаков "
+                f"за {report['seconds']:.2f} s; held-out acc "
+                f"{acc_before:.3f} → {acc_after:.3f}"
+            )
+            return report
+
+    def rebase(self, swap: Callable[[], None]) -> None:
+        """
+        Подмена базовой модели извне (model_registry): swap() выполняется
+        под тем же локом, что и update(), затем состояние сбрасывается —
+        следующее обновление поднимет SGD из clf.model_dir. Если уже есть
+        выученные примеры, они сразу дообучаются поверх новой версии.
+        """
+        with self._update_lock:
+            swap()
+            self._sgd = self._model = None
+            self._pool, self._holdout = [], []
+        if self.learned:
+            self._queue.put(_REFIT)
+            self.start()
+
+    def _bootstrap(self) -> None:
+        """Поднимает float64-SGD и словари из *.pkl; held-out — из intent_holdout.json."""
+        model_dir = self.clf.model_dir
+        v_word = pickle.load(open(model_dir / WORD_F.name, "rb"))
+        v_char = pickle.load(open(model_dir / CHAR_F.name, "rb"))
+        self._sgd = pickle.load(open(model_dir / CLF_F.name, "rb"))
+        self._model = CompactIntentModel.from_sklearn(v_word, v_char, self._sgd)
+        holdout_f = model_dir / HOLDOUT_F.name
+        if holdout_f.exists():
+            self._holdout = [tuple(p) for p in json.loads(holdout_f.read_text("utf-8"))]
+        else:
+            print(f"[learner] нет {holdout_f.name}: модель обучена без held-out, "
+                  "accuracy до/после не считается")
+        held = set(self._holdout)
+        self._pool = [(intent, ex) for intent, exs in self.clf.norm_examples.items()
+                      for ex in exs if (intent, ex) not in held]
+
+    @staticmethod
+    def _extend_vocab(base: CompactIntentModel, norms: List[str]) -> CompactIntentModel:
+        """Добавляет новые n-граммы в словари; idf новых = max(idf) (самые редкие)."""
+        def grow(vocab, idf, grams):
+            merged = np.union1d(vocab, np.array(grams)) if grams else vocab
+            if len(merged) == len(vocab):
+                return vocab, idf
+            new_idf = np.full(len(merged), idf.max() if len(idf) else 1.0)
+            new_idf[np.searchsorted(merged, vocab)] = idf
+            return merged, new_idf
+
+        wv, wi = grow(base.word_vocab, base.word_idf,
+                      [g for n in norms for g in word_ngrams(n, *base.word_ngram)])
+        cv, ci = grow(base.char_vocab, base.char_idf,
+                      [g for n in norms for g in char_ngrams(n, *base.char_ngram)])
+        return CompactIntentModel(
+            word_vocab=wv, word_idf=wi, char_vocab=cv, char_idf=ci,
+            coef_t=base.coef_t, intercept=base.intercept, classes=base.classes,
+            word_ngram=base.word_ngram, char_ngram=base.char_ngram,
+        )
+
+    @staticmethod
+    def _remap_features(sgd, base: CompactIntentModel, model: CompactIntentModel) -> None:
+        """Раскладывает столбцы coef_ SGD по расширенному словарю (новые = 0)."""
+        n_new = len(model.word_vocab) + len(model.char_vocab)
+        if n_new == sgd.coef_.shape[1]:
+            return
+        cols = np.concatenate([
+            np.searchsorted(model.word_vocab, base.word_vocab),
+            np.searchsorted(model.char_vocab, base.char_vocab) + len(model.word_vocab),
+        ])
+        coef = np.zeros((sgd.coef_.shape[0], n_new))
+        coef[:, cols] = sgd.coef_
+        sgd.coef_ = coef
+        sgd.n_features_in_ = n_new
+
+    @staticmethod
+    def _extend_classes(sgd, intents) -> set:
+        """
+        Вставляет новые классы в classes_ (отсортированно): веса 0,
+        intercept = минимальный из существующих, чтобы новый класс
+        не перетягивал на себя всё до обучения.
+        """
+        new = {i for i in intents if i not in set(sgd.classes_)}
+        if not new:
+            return new
+        classes = np.array(sorted(set(map(str, sgd.classes_)) | new))
+        rows = np.searchsorted(classes, np.array([str(c) for c in sgd.classes_]))
+        coef = np.zeros((len(classes), sgd.coef_.shape[1]))
+        coef[rows] = sgd.coef_
+        intercept = np.full(len(classes), sgd.intercept_.min())
+        intercept[rows] = sgd.intercept_
+        sgd.classes_, sgd.coef_, sgd.intercept_ = classes, coef, intercept
+        if isinstance(sgd.class_weight, dict):
+            sgd.class_weight = {**sgd.class_weight, **{c: 1.0 for c in new}}
+        return new
+
+    @staticmethod
+    def _matrix(model: CompactIntentModel, pairs: List[Tuple[str, str]]):
+        X = model.fused.transform([n for _, n in pairs])
+        return X, np.array([i for i, _ in pairs])
+
+    @staticmethod
+    def _accuracy(model: CompactIntentModel, pairs: List[Tuple[str, str]]) -> float:
+        if not pairs:
+            return float("nan")
+        pred = model.predict([n for _, n in pairs])
+        return float(np.mean(pred == np.array([i for i, _ in pairs])))
+
+    def _register(self, new: List[Tuple[str, str]]) -> None:
+        """Добавляет примеры в exact/fuzzy-индексы clf (новые объекты + подмена)."""
+        clf = self.clf
+        for intent, norm in new:
+            clf.exact_index.setdefault(norm, intent)
+            clf.norm_examples.setdefault(intent, []).append(norm)
+        clf._example_intents = clf._example_intents + [i for i, _ in new]
+        clf.fuzzy_index = NgramIndex(clf.fuzzy_index.strings + [n for _, n in new])
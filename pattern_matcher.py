@@ -0,0 +1,115 @@
+"""
+pattern_matcher.py
+──────────────────
+Много наборов ключевых слов — один проход по сообщению (автомат Ахо–Корасик).
+
+    m = PatternMatcher()
+    m.add("toxic", ["дурак", "лох"], mode=PREFIX)
+    m.add(("category", "Кровати"), ["кровати"], mode=WORD)
+    m.compile()
+    m.search("Ты дурааак, покажи кровати!")
+        → {"toxic": ["дурак"], ("category", "Кровати"): ["кровати"]}
+
+• текст и шаблоны сводятся fold(): нижний регистр, ё → е, повторы букв
+  схлопываются («дурааак» → «дурак», «cпааал» → «спал»)
+• mode: SUB — где угодно в тексте, PREFIX — с начала слова («дурак» ловит
+  «дураки», «лох» не ловит «плохо»), WORD — слово / фраза целиком
+• compile() строит полную таблицу переходов (goto + fail, развёрнутые в DFA):
+  на символ — один dict.get, цена поиска не зависит от числа шаблонов;
+  тег (правило-владелец) может быть любым хэшируемым значением
+"""
+
+from __future__ import annotations
+
+import re
+from collections import deque
+from typing import Dict, Hashable, Iterable, List, Tuple
+
+SUB, PREFIX, WORD = "sub", "prefix", "word"
+
+_REPEATS_RE = re.compile(r"([^\W\d_])\1+")
+
+
+def fold(text: str) -> str:
+    """Нормализация для поиска: lower, ё → е, повторы букв → одна буква."""
+    return _REPEATS_RE.sub(r"\1", text.lower().replace("ё", "е"))
+
+
+class PatternMatcher:
+    """Набор (тег, шаблон, режим) → все совпадения за один линейный проход."""
+
+    def __init__(self) -> None:
+        self._patterns: List[Tuple[Hashable, str, str]] = []
+        self._delta: List[Dict[str, int]] = []
+        self._out: List[Tuple[Tuple[Hashable, str, str, int], ...]] = []
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def add(self, tag: Hashable, patterns: Iterable[str], mode: str = SUB) -> "PatternMatcher":
+        """Добавляет шаблоны с владельцем tag; после add нужен compile()."""
+        if mode not in (SUB, PREFIX, WORD):
+            raise ValueError(f"неизвестный режим {mode!r}")
+        for p in patterns:
+            if p := fold(p).strip():
+                self._patterns.append((tag, p, mode))
+        self._delta = []
+        return self
+
+    # ───────────── построение ─────────────
+    def compile(self) -> "PatternMatcher":
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[Tuple[Hashable, str, str, int]]] = [[]]
+        for tag, p, mode in self._patterns:
+            node = 0
+            for ch in p:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = goto[node][ch] = len(goto)
+                    goto.append({})
+                    out.append([])
+                node = nxt
+            out[node].append((tag, p, mode, len(p)))
+
+        # BFS: fail-ссылки → переходы DFA (недостающие берутся у fail-узла)
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])] + [{} for _ in goto[1:]]
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            out[node].extend(out[fail[node]])
+            delta[node] = {**delta[fail[node]], **goto[node]}
+            for ch, nxt in goto[node].items():
+                fail[nxt] = delta[fail[node]].get(ch, 0) if node else 0
+                queue.append(nxt)
+        self._delta = delta
+        self._out = [tuple(o) for o in out]
+        return self
+
+    # ───────────── поиск ─────────────
+    def search(self, text: str) -> Dict[Hashable, List[str]]:
+        """{тег: [совпавшие шаблоны по порядку в тексте]}; пустой словарь — ничего."""
+        if not self._delta:
+            self.compile()
+        text = fold(text)
+        delta, out = self._delta, self._out
+        hits: Dict[Hashable, List[str]] = {}
+        node = 0
+        for end, ch in enumerate(text, 1):
+            node = delta[node].get(ch, 0)
+            if not out[node]:
+                continue
+            for tag, p, mode, n in out[node]:
+                if mode != SUB:
+                    start = end - n
+                    if start and text[start - 1].isalnum():
+                        continue
+                    if mode == WORD and end < len(text) and text[end].isalnum():
+                        continue
+                found = hits.setdefault(tag, [])
+                if p not in found:
+                    found.append(p)
+        return hits
+
+    def tags(self, text: str) -> set:
+        return set(self.search(text))
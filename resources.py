@@ -0,0 +1,146 @@
+"""
+resources.py
+────────────
+Параллельная и ленивая загрузка тяжёлых компонентов бота.
+
+    RESOURCES = ResourceManager()
+
+    @RESOURCES.register("retriever", deps=("natasha",))
+    def _load_retriever(_):
+        return DialogueRetriever(...)
+
+    RESOURCES.start()                      # фоновые потоки, импорт не ждёт
+    RESOURCES.get("retriever")             # блокирует до готовности
+    RESOURCES.ready("stt")                 # не блокирует
+
+• register(name, deps, lazy) — загрузчик получает значения deps
+  позиционно; lazy=True — грузится только по первому get()/ensure()
+• start() — все не-lazy компоненты уходят в пул потоков; зависимости
+  ставятся в очередь раньше зависимых, поэтому ожидание внутри пула
+  не может заблокировать его целиком
+• состояние компонента: pending → loading → ready | failed;
+  status() / report() — состояние и время загрузки каждого,
+  время ещё и в metrics.STARTUP_SECONDS{component}
+• ошибка загрузчика не роняет процесс: get() поднимает RuntimeError,
+  остальные компоненты продолжают работать
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from metrics import STARTUP_SECONDS
+
+
+class Resource:
+    def __init__(self, name: str, loader: Callable[..., Any],
+                 deps: Sequence[str], lazy: bool) -> None:
+        self.name = name
+        self.loader = loader
+        self.deps = tuple(deps)
+        self.lazy = lazy
+        self.state = "pending"
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        self.seconds: Optional[float] = None
+        self.scheduled = False
+        self.done = threading.Event()
+
+
+class ResourceManager:
+    """Реестр загрузчиков + пул потоков + состояние готовности."""
+
+    def __init__(self, max_workers: int = 4, verbose: bool = True) -> None:
+        self._res: Dict[str, Resource] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix="startup")
+        self.verbose = verbose
+        self.started_at: Optional[float] = None
+
+    # ───────────── регистрация ─────────────
+    def register(self, name: str, *, deps: Sequence[str] = (), lazy: bool = False):
+        """Декоратор: загрузчик компонента name (возвращает его значение)."""
+        def deco(loader: Callable[..., Any]) -> Callable[..., Any]:
+            self._res[name] = Resource(name, loader, deps, lazy)
+            return loader
+        return deco
+
+    def start(self) -> None:
+        self.started_at = time.perf_counter()
+        for name, res in self._res.items():
+            if not res.lazy:
+                self._schedule(name)
+
+    # ───────────── загрузка ─────────────
+    def _schedule(self, name: str) -> Resource:
+        res = self._res[name]
+        with self._lock:
+            if res.scheduled:
+                return res
+            res.scheduled = True
+        for dep in res.deps:                      # зависимости — раньше в очереди
+            self._schedule(dep)
+        self._pool.submit(self._load, res)
+        return res
+
+    def _load(self, res: Resource) -> None:
+        try:
+            args = [self.get(dep) for dep in res.deps]
+            res.state = "loading"
+            t0 = time.perf_counter()
+            res.value = res.loader(*args)
+            res.seconds = time.perf_counter() - t0
+            res.state = "ready"
+            STARTUP_SECONDS.set(res.seconds, res.name)
+            if self.verbose:
+                print(f"[startup] {res.name}: {res.seconds:.2f} s")
+        except BaseException as e:
+            res.error, res.state = e, "failed"
+            print(f"[startup] {res.name}: ошибка загрузки — {e!r}")
+        finally:
+            res.done.set()
+
+    def ensure(self, *names: str) -> None:
+        """Запускает загрузку (в т. ч. lazy-компонентов), не дожидаясь её."""
+        for name in names:
+            self._schedule(name)
+
+    def get(self, name: str, timeout: float | None = None) -> Any:
+        """Значение компонента; при необходимости запускает загрузку и ждёт."""
+        res = self._schedule(name)
+        if not res.done.wait(timeout):
+            raise TimeoutError(f"{name}: не загрузился за {timeout} s")
+        if res.state == "failed":
+            raise RuntimeError(f"{name} не загрузился: {res.error!r}") from res.error
+        return res.value
+
+    # ───────────── готовность ─────────────
+    def ready(self, *names: str) -> bool:
+        return all(self._res[n].state == "ready" for n in names)
+
+    def wait(self, *names: str, timeout: float | None = None) -> bool:
+        """Ждёт, пока names загрузятся (или упадут); True — все готовы."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for n in names:
+            left = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not self._schedule(n).done.wait(left):
+                return False
+        return self.ready(*names)
+
+    def status(self) -> Dict[str, dict]:
+        return {
+            name: dict(state=r.state, seconds=r.seconds, lazy=r.lazy,
+                       error=repr(r.error) if r.error else None)
+            for name, r in self._res.items()
+        }
+
+    def report(self) -> str:
+        lines = []
+        for name, st in self.status().items():
+            took = f"{st['seconds']:.2f} s" if st["seconds"] is not None else "—"
+            lazy = " (lazy)" if st["lazy"] else ""
+            lines.append(f"  {name:<12} {st['state']:<8} {took}{lazy}")
+        return "\n".join(lines)
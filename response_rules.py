@@ -0,0 +1,518 @@
+"""
+response_rules.py
+─────────────────
+Стадии get_response как таблица правил, собранная один раз при старте.
+
+    Rule(name, action, when=None, cost=COST_STATE)
+
+Контракт short-circuit:
+• правила проверяются строго в порядке таблицы — это приоритет ответа;
+• when(turn) — чистый предикат без побочных эффектов; False → правило
+  пропускается. Внутри when проверки идут от дешёвых к дорогим
+  (флаги user_data → подстроки → регэкспы → модель);
+• action(turn) → str завершает обработку сообщения, None — «пропускаю»
+  (правило могло поменять состояние, например сбросить режим «ещё»);
+• последнее правило (fallback) всегда возвращает строку.
+
+cost — класс стоимости правила (COST_*). Дешёвые правила стоят раньше
+greeting (COST_MODEL), чтобы классификатор не считался на сообщениях,
+которые они забирают. Ответы при этом совпадают с golden-диалогами
+(benchmarks/bench_get_response.py), границы такие:
+• до greeting — small-talk-регэкспы («привет, как дела» классификатор и
+  так относит к howudo, не к hello), запросы по содержанию (цена,
+  категория, команда каталога) и сброс режима «ещё»;
+• ожидаемый жанр и офферы тоже стоят раньше, но уступают приветствию /
+  прощанию через t.is_greeting («До свидания» в ответ на вопрос о жанре —
+  bye, а не «не распознал жанр»); модель считается, только когда их
+  состояние уже совпало;
+• после greeting — авто-оффер и всё остальное: «пока» четвёртой репликой
+  должно прощаться, а не открывать каталог.
+
+Всё, что не зависит от сообщения, готовится в ResponseEngine.__init__:
+регэкспы категорий и «любимое X», тексты вопросов по категориям,
+словари «подкатегория/слово → подкатегория». На сообщение — один Turn
+с ленивыми полями (pred, tone): классификатор и тональность считаются
+только если до них дошла очередь.
+
+Каждый ответ пишется в metrics.py: bot_responses_total{stage, intent,
+modality} (доля стадии = её hit-rate) и bot_response_seconds{stage,
+modality}; intent — предсказание классификатора, если его считали.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import random
+import re
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from functools import cached_property
+from time import perf_counter
+from typing import Callable, Dict, List, Optional
+
+from catalog_index import CatalogIndex, parse_price_range
+from content_filter import MALICIOUS, TOXIC
+from intent_journal import IntentJournal
+from metrics import RESPONSE_ERRORS, RESPONSE_SECONDS, RESPONSES
+from modules.tictactoe import TicTacToe
+from nlp_utils import NormalizedText
+from pattern_matcher import PREFIX, WORD, PatternMatcher
+from recommendations import recommend
+from sentiment import get_sentiment
+
+# классы стоимости правил
+COST_STATE = 0      # только флаги user_data
+COST_TEXT  = 1      # подстроки / регэкспы по сообщению
+COST_MODEL = 2      # классификатор интентов, тональность
+COST_IO    = 3      # поиск по корпусу диалогов, запись на диск
+
+ENCORE        = frozenset({"еще", "ещё", "еще раз", "ещё раз"})
+NEGATIVE      = frozenset({"нет", "не", "неа", "no"})
+GENRE_INTENTS = frozenset({"music", "movie", "game", "series"})
+GREETING_INTENTS = frozenset({"hello", "bye"})
+JOKE_INTENTS  = frozenset({"joke", "anecdote", "fun_fact", "fact"})
+
+AD_COOLDOWN_MSG, AD_COOLDOWN_HOURS = 3, 1
+SEASONAL_EVENTS = {"11-11": "Чёрная пятница", "03-08": "8 марта", "23-02": "23 февраля"}
+AD_TRIGGERS = {
+    ("сон", "устал", "спал"): ("Матрасы", None, "Кстати, хороший матрас творит чудеса со сном. Хочешь взглянуть?"),
+    ("спина", "болит", "поясница"): ("Матрасы", None, "Поможет ортопедический матрас с зональной поддержкой 😉"),
+    ("переезд", "ремонт", "квартир"): ("Кровати", None, "Новоселье — отличный повод обновить кровать. Подкинуть идеи?"),
+}
+
+CATALOG_COMMANDS = ("/catalog", "каталог", "товары")
+
+FILTER_PAGE = 3     # товаров на страницу выдачи «матрас до 20000 руб»
+
+HOW_ARE_YOU_RE = re.compile(r"\bкак\s+(дел[аи]|ты)\b")
+FAVORITE_RE    = re.compile(r"любим(?:ое|ая|ый|ые)\s+([\w\-а-яё]+)")
+
+
+def custom_intent_id(low_clean: str) -> str:
+    """id выученного интента: хэш нормализованной фразы (кириллица даёт разные id,
+    повтор той же фразы — тот же)."""
+    return "c" + hashlib.blake2b(low_clean.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _parse_iso(ts):
+    try: return datetime.fromisoformat(ts) if isinstance(ts, str) else ts
+    except: return None
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    action: Callable[["Turn"], Optional[str]]
+    when: Optional[Callable[["Turn"], bool]] = None
+    cost: int = COST_STATE
+
+
+class Turn:
+    """Одно сообщение: формы текста, состояние пользователя, ленивые pred / tone."""
+
+    def __init__(self, engine: "ResponseEngine", msg: NormalizedText,
+                 user_data: dict, history, now: datetime) -> None:
+        self.engine     = engine
+        self.msg        = msg
+        self.text       = msg.raw
+        self.low        = msg.lower
+        self.low_clean  = msg.stripped
+        self.user_data  = user_data
+        self.history    = history
+        self.now        = now
+        self.prefs      = user_data.setdefault("preferences", {})
+        self.custom_ans = user_data.setdefault("custom_answers", {})
+        self.last_int   = user_data.get("last_intent")
+        self.last_bot   = user_data.get("last_bot")
+
+        # после file_memory множества приходят списками, дата — строкой
+        for key in ("asked_questions", "shown_products"):
+            if not isinstance(user_data.get(key), set):
+                user_data[key] = set(user_data.get(key, []))
+        user_data.setdefault("asked_followup", False)
+        user_data.setdefault("msgs_since_ad", 0)
+        if not isinstance(user_data.get("last_ad_ts"), datetime):
+            user_data["last_ad_ts"] = _parse_iso(user_data.get("last_ad_ts"))
+
+        user_data["msgs_since_ad"] += 1
+        last_ad = user_data["last_ad_ts"]
+        self.hours_since = (now - last_ad).total_seconds() / 3600 if last_ad else 1e9
+
+    @property
+    def is_greeting(self) -> bool:
+        """hello/bye по классификатору — первый вызов считает pred (COST_MODEL)."""
+        return self.pred.intent in GREETING_INTENTS and self.pred.intent in self.engine.intents
+
+    def can_offer(self) -> bool:
+        return self.user_data["msgs_since_ad"] >= AD_COOLDOWN_MSG and self.hours_since >= AD_COOLDOWN_HOURS
+
+    def offer(self, reply: str) -> str:
+        self.user_data.update(last_ad_ts=self.now.isoformat(), msgs_since_ad=0)
+        return reply
+
+    @cached_property
+    def pred(self):
+        """IntentPrediction — один на сообщение (сам тоже ленивый)."""
+        return self.engine.clf.classify(self.msg)
+
+    @cached_property
+    def hits(self) -> dict:
+        """{тег: шаблоны} автомата движка (триггеры, команды, категории) — один проход."""
+        return self.msg.matches(self.engine.matcher)
+
+    @cached_property
+    def tone(self) -> str:
+        sent = get_sentiment(self.msg)
+        return "Мне жаль, что тебе грустно. " if sent < -0.2 else \
+               "Рад за тебя! "                if sent > 0.5  else ""
+
+
+class ResponseEngine:
+    """Таблица правил get_response + всё, что можно посчитать заранее."""
+
+    def __init__(
+        self,
+        intents: dict,
+        catalog: dict | CatalogIndex,
+        clf,
+        retriever,
+        learner=None,
+        journal: IntentJournal | None = None,
+    ) -> None:
+        """
+        intents     – INTENTS (общий объект: fallback дописывает в него новые интенты)
+        catalog     – CatalogIndex или сырой PRODUCT_CATALOG {категория: {подкатегория: [товары]}}
+        learner     – OnlineIntentLearner; None — новые интенты только в intents
+        journal     – IntentJournal (custom_intents.json); None — не сохранять на диск
+        """
+        self.intents     = intents
+        self.catalog     = catalog if isinstance(catalog, CatalogIndex) else CatalogIndex(catalog)
+        self.clf         = clf
+        self.retriever   = retriever
+        self.learner     = learner
+        self.journal     = journal
+
+        # категории: регэксп «\bкатегория\b», точное имя, готовые тексты вопросов
+        categories = self.catalog.categories
+        self.cat_by_name: Dict[str, str] = {}
+        for cat in categories:
+            self.cat_by_name.setdefault(cat.lower(), cat)
+        self.cat_question = {
+            cat: f"Какие именно {cat.lower()} интересуют: {', '.join(subs)}?"
+            for cat, subs in categories.items()
+        }
+        # подкатегория целиком или любое её слово → подкатегория (первая по каталогу)
+        self.sub_by_word: Dict[str, Dict[str, str]] = {}
+        for cat, subs in categories.items():
+            words = self.sub_by_word[cat] = {}
+            for sub in subs:
+                for w in (sub.lower(), *sub.lower().split()):
+                    words.setdefault(w, sub)
+
+        # все наборы ключевых слов — один автомат, один проход на сообщение (Turn.hits);
+        # тот же автомат ставится в NormalizedText.matcher для modules/smalltalk_module
+        self.matcher = PatternMatcher()
+        for keys in AD_TRIGGERS:
+            self.matcher.add(("trigger", keys), keys)
+        self.matcher.add("catalog_command", CATALOG_COMMANDS)
+        for cat in categories:
+            self.matcher.add(("category", cat), [cat.lower()], mode=WORD)
+        self.matcher.add("toxic", TOXIC, mode=PREFIX)
+        self.matcher.add("malicious", MALICIOUS, mode=PREFIX)
+        self.matcher.compile()
+
+        self.rules: List[Rule] = self._build_rules()
+        self._last = threading.local()        # стадия последнего ответа в этом потоке
+
+    # ───────────── вход ─────────────
+    def respond(self, text: str | NormalizedText, user_data: dict, history,
+                now: datetime | None = None, modality: str = "text") -> str:
+        t0   = perf_counter()
+        msg  = text if isinstance(text, NormalizedText) else NormalizedText(text)
+        turn = Turn(self, msg, user_data, history, now or datetime.utcnow())
+        rule = None
+        try:
+            for rule in self.rules:
+                if rule.when is not None and not rule.when(turn):
+                    continue
+                reply = rule.action(turn)
+                if reply is not None:
+                    break
+            else:
+                raise RuntimeError("последнее правило таблицы должно всегда отвечать")
+        except Exception:
+            RESPONSE_ERRORS.inc(rule.name if rule else "init")
+            raise
+        pred = turn.__dict__.get("pred")
+        self._last.stage = rule.name
+        RESPONSES.inc(rule.name, (pred.intent or "-") if pred is not None else "-", modality)
+        RESPONSE_SECONDS.observe(perf_counter() - t0, rule.name, modality)
+        return reply
+
+    @property
+    def last_stage(self) -> Optional[str]:
+        """Стадия, ответившая на последнее сообщение этого потока (benchmarks/load_test.py)."""
+        return getattr(self._last, "stage", None)
+
+    # ───────────── таблица ─────────────
+    def _build_rules(self) -> List[Rule]:
+        ud = lambda t: t.user_data                                # noqa: E731
+        return [
+            # 1. small-talk
+            Rule("how_are_you", lambda t: random.choice(
+                ["У меня всё отлично, спасибо! А у тебя?", "Всё хорошо, работаю не покладая транзисторов 😄 А ты?"]),
+                 lambda t: HOW_ARE_YOU_RE.search(t.low_clean) is not None, COST_TEXT),
+            Rule("mood", lambda t: random.choice(
+                ["Настроение супер! Как твоё?", "Бодрое и весёлое. У тебя какое?"]),
+                 lambda t: "настроени" in t.low_clean, COST_TEXT),
+            # 2. ожидаемый жанр (приветствие / прощание важнее)
+            Rule("awaited_genre", self._awaited_genre,
+                 lambda t: ud(t).get("awaiting_genre") and not t.is_greeting),
+            # 3. сезонные офферы
+            Rule("seasonal_offer", self._seasonal_offer,
+                 lambda t: t.can_offer() and t.now.strftime("%m-%d") in SEASONAL_EVENTS
+                 and not t.is_greeting),
+            # 4. триггерные офферы (is_greeting проверяет сам _trigger_offer — после совпадения)
+            Rule("trigger_offer", self._trigger_offer, lambda t: t.can_offer(), COST_TEXT),
+            # 5. сброс режима «ещё» (ничего не отвечает)
+            Rule("reset_more", self._reset_more,
+                 lambda t: ud(t).get("expect_more") and t.low not in ENCORE),
+            # 5a. подбор по цене: «матрас до 20000 руб», «кровати от 20 до 35 тыс»
+            Rule("price_filter", self._price_filter,
+                 lambda t: any(ch.isdigit() for ch in t.low), COST_TEXT),
+            # 6. прямое упоминание категории
+            Rule("category_mention", self._category_mention, cost=COST_TEXT),
+            # 7. явная команда каталога
+            Rule("catalog_command", self._catalog_command,
+                 lambda t: t.can_offer() and "catalog_command" in t.hits,
+                 COST_TEXT),
+            # 7a. hello/bye через ML-классификатор (cascade: exact → model → fuzzy)
+            Rule("greeting", self._greeting, lambda t: t.is_greeting, COST_MODEL),
+            # 8. авто-оффер
+            Rule("auto_offer", self._catalog_command,
+                 lambda t: len(t.history) >= 3 and not ud(t).get("ad_offer_shown")
+                 and not ud(t).get("awaiting_ad_choice") and t.can_offer()),
+            # 9. выбор категории (если не узнали — сбрасываем ожидание и идём дальше)
+            Rule("category_choice", self._category_choice, lambda t: ud(t).get("awaiting_ad_choice")),
+            # 10. первая рекомендация
+            Rule("first_product", self._first_product,
+                 lambda t: "shop_cat" in ud(t) and "shop_sub" not in ud(t)),
+            # 11. «ещё»
+            Rule("more_products", self._more_products,
+                 lambda t: ud(t).get("expect_more") and t.low in ENCORE),
+            # 12. интерактивное обучение
+            Rule("teach_answer", self._teach_answer, lambda t: ud(t).get("awaiting_teach")),
+            Rule("custom_answer", lambda t: t.custom_ans[t.text], lambda t: t.text in t.custom_ans),
+            # 13. «Любимое X»
+            Rule("pref_topic", self._pref_topic, lambda t: "awaiting_pref_topic" in ud(t)),
+            Rule("favorite", self._favorite, cost=COST_TEXT),
+            # 14. encore («ещё»)
+            Rule("encore", self._encore, lambda t: t.low in ENCORE),
+            # 15. крестики-нолики
+            Rule("tictactoe", self._tictactoe, lambda t: "крестики" in t.low, COST_TEXT),
+            # 16. жанр после follow-up
+            Rule("followup_genre", self._followup_genre,
+                 lambda t: t.last_int in GENRE_INTENTS and f"{t.last_int}_genre" not in t.prefs),
+            # 17. intent-predict (+ тон по тональности)
+            Rule("intent", self._intent, cost=COST_MODEL),
+            # 18. retrieval-ответ
+            Rule("retrieval", self._retrieval, cost=COST_IO),
+            # 19. fallback → обучение
+            Rule("fallback", self._fallback, cost=COST_IO),
+        ]
+
+    # ───────────── действия ─────────────
+    def _greeting(self, t: Turn) -> str:
+        i0 = t.pred.intent
+        r = random.choice(self.intents[i0]["responses"])
+        t.user_data.update(last_intent=i0, last_bot=r)
+        return r
+
+    def _awaited_genre(self, t: Turn) -> str:
+        cat   = t.user_data.pop("awaiting_genre")
+        reply = recommend(cat, t.low_clean)
+        t.prefs[f"{cat}_genre"] = t.low_clean
+        t.user_data.update(last_intent=cat, last_bot=reply)
+        return reply
+
+    def _seasonal_offer(self, t: Turn) -> str:
+        return t.offer(f"До {SEASONAL_EVENTS[t.now.strftime('%m-%d')]} скидка –25 % на матрасы. Показать варианты?")
+
+    def _trigger_offer(self, t: Turn) -> Optional[str]:
+        for keys, (cat, sub, pitch) in AD_TRIGGERS.items():
+            if ("trigger", keys) in t.hits:
+                if t.is_greeting:
+                    return None
+                t.user_data.update(expect_more=True, last_ad_category=cat,
+                                   last_ad_subcategory=sub, ad_offer_shown=True)
+                if sub:
+                    return t.offer(pitch + self.catalog.pick(cat, sub).pitch)
+                t.user_data["awaiting_ad_choice"] = True
+                return t.offer(pitch)
+        return None
+
+    def _reset_more(self, t: Turn) -> None:
+        t.user_data["expect_more"] = False
+        t.user_data["shown_products"].clear()
+        t.user_data.pop("catalog_filter", None)
+
+    def _price_filter(self, t: Turn) -> Optional[str]:
+        span = parse_price_range(t.low)
+        if span is None:
+            return None
+        cat, sub = self.catalog.find_category(t.low)
+        if cat is None:                       # «а до 20000 ₽?» — в контексте текущей категории
+            cat = t.user_data.get("shop_cat") or t.user_data.get("last_ad_category")
+            sub = None if "shop_cat" in t.user_data else t.user_data.get("last_ad_subcategory")
+        if cat is None:
+            return None
+        lo, hi = span
+        t.user_data.pop("shop_cat", None); t.user_data.pop("awaiting_ad_choice", None)
+        t.user_data.update(ad_offer_shown=True, catalog_filter=dict(cat=cat, sub=sub, lo=lo, hi=hi, offset=0))
+        total, _ = self.catalog.filter(cat, sub, lo, hi, limit=0)
+        if not total:
+            t.user_data.pop("catalog_filter")
+            return f"{cat}{' / ' + sub if sub else ''}: в этом диапазоне цен ничего не нашлось 😔 Попробуй другую цену."
+        t.user_data["expect_more"] = True
+        return f"Нашёл {total} — сначала подешевле:\n\n" + self._filter_page(t)
+
+    def _filter_page(self, t: Turn) -> str:
+        f = t.user_data["catalog_filter"]
+        total, page = self.catalog.filter(f["cat"], f["sub"], f["lo"], f["hi"],
+                                          offset=f["offset"], limit=FILTER_PAGE)
+        f["offset"] += len(page)
+        reply = "\n\n".join(p.line for p in page)
+        if f["offset"] < total:
+            return reply + "\n\nНапиши «ещё» — покажу следующие."
+        t.user_data.update(expect_more=False); t.user_data.pop("catalog_filter")
+        return reply
+
+    def _category_mention(self, t: Turn) -> Optional[str]:
+        for cat in self.catalog.categories:
+            if ("category", cat) in t.hits:
+                t.user_data.pop("awaiting_ad_choice", None)
+                t.user_data.update(shop_cat=cat, ad_offer_shown=True)
+                return "Отлично! " + self.cat_question[cat]
+        return None
+
+    def _catalog_command(self, t: Turn) -> str:
+        t.user_data["ad_offer_shown"] = True
+        t.user_data["awaiting_ad_choice"] = True
+        return t.offer("В каталоге есть отличные **кровати** и **матрасы**. Что интереснее?")
+
+    def _category_choice(self, t: Turn) -> Optional[str]:
+        if t.low_clean in NEGATIVE:
+            t.user_data.pop("awaiting_ad_choice"); t.user_data["ad_offer_shown"] = True
+            return "Хорошо! Скажи, когда захочешь посмотреть каталог 🙂"
+        cat = self.cat_by_name.get(t.low_clean)
+        t.user_data.pop("awaiting_ad_choice")
+        if cat is None:
+            return None
+        t.user_data.update(shop_cat=cat)
+        return self.cat_question[cat]
+
+    def _first_product(self, t: Turn) -> Optional[str]:
+        cat = t.user_data["shop_cat"]
+        sub = self.sub_by_word[cat].get(t.low_clean)
+        if sub is None:
+            return None
+        t.user_data.update(last_ad_category=cat, last_ad_subcategory=sub, expect_more=True)
+        prod = self.catalog.pick(cat, sub)
+        t.user_data["shown_products"].add(prod.name)
+        t.user_data.pop("shop_cat")
+        return "Рекомендую: " + prod.card
+
+    def _more_products(self, t: Turn) -> str:
+        ud = t.user_data
+        if "catalog_filter" in ud:
+            return self._filter_page(t)
+        prod = self.catalog.pick_unshown(ud["last_ad_category"], ud["last_ad_subcategory"],
+                                         ud["shown_products"])
+        if prod is None:
+            ud["expect_more"] = False; ud["shown_products"].clear()
+            return "Пожалуй, это все лучшие варианты 😉"
+        ud["shown_products"].add(prod.name)
+        return "Ещё вариант: " + prod.card
+
+    def _teach_answer(self, t: Turn) -> str:
+        t.custom_ans[t.user_data.pop("awaiting_teach")] = t.text
+        return random.choice(["Спасибо, запомнил!", "Отлично, принял к сведению!"])
+
+    def _pref_topic(self, t: Turn) -> str:
+        t.prefs[t.user_data.pop("awaiting_pref_topic")] = t.text
+        return f"Спасибо! Запомнил, что тебе нравится {t.text}."
+
+    def _favorite(self, t: Turn) -> Optional[str]:
+        m = FAVORITE_RE.search(t.low_clean)
+        if m is None:
+            return None
+        k = f"favorite_{m.group(1)}"
+        if k in t.prefs: return f"Мне нравится {t.prefs[k]}."
+        t.user_data["awaiting_pref_topic"] = k
+        return f"А что тебе больше всего нравится в плане {m.group(1)}?"
+
+    def _encore(self, t: Turn) -> Optional[str]:
+        if t.last_int in JOKE_INTENTS:
+            responses = self.intents[t.last_int]["responses"]
+            pool = [r for r in responses if r != t.last_bot]
+            return random.choice(pool) if pool else random.choice(responses)
+        if t.last_int in GENRE_INTENTS:
+            return recommend(t.last_int, t.prefs.get(f"{t.last_int}_genre"))
+        return None
+
+    def _tictactoe(self, t: Turn) -> str:
+        game = t.user_data["tic_tac_toe"] = TicTacToe()
+        return "Начинаем «крестики-нолики»!\n" + game.render() + "\nТвой ход (A1..C3):"
+
+    def _followup_genre(self, t: Turn) -> str:
+        cat = t.last_int
+        rec = recommend(cat, t.text.strip()); t.prefs[f"{cat}_genre"] = t.text.strip()
+        t.user_data["last_bot"] = rec
+        return rec
+
+    def _intent(self, t: Turn) -> Optional[str]:
+        pred, ud = t.pred, t.user_data
+        intent = pred.intent if pred.intent in self.intents else None
+        if intent is None and pred.fuzzy_label in self.intents:
+            intent = pred.fuzzy_label
+        if intent is None:
+            return None
+
+        if intent in GENRE_INTENTS:
+            ud.update(last_intent=intent, asked_followup=True, awaiting_genre=intent)
+            return self.intents[intent]["follow_up"][0]
+
+        opts = self.intents[intent]["responses"]
+        if t.last_bot in opts and len(opts) > 1: opts = [o for o in opts if o != t.last_bot]
+        resp = random.choice(opts)
+        ud["last_bot"] = resp
+        if not ud["asked_followup"]:
+            for f in self.intents[intent].get("follow_up", []):
+                if f not in ud["asked_questions"]:
+                    resp += " " + f
+                    ud["asked_questions"].add(f)
+                    ud["asked_followup"] = True
+                    break
+        ud["last_intent"] = intent
+        return t.tone + resp
+
+    def _retrieval(self, t: Turn) -> Optional[str]:
+        cand = self.retriever.get_answer(t.msg)
+        if not cand:
+            return None
+        t.user_data.update(last_bot=cand, last_intent=None)
+        return t.tone + cand
+
+    def _fallback(self, t: Turn) -> str:
+        cid = custom_intent_id(t.low_clean)
+        new_i = {"examples": [t.text],
+                 "responses": ["Я пока не знаю, как на это ответить. Подскажите пример ответа?"]}
+        evicted = self.journal.add(cid, new_i) if self.journal is not None else []
+        for eid in evicted or ():                     # вытесненные из журнала — и из INTENTS
+            self.intents.pop(eid, None)
+        self.intents.setdefault(cid, new_i)           # повтор: в памяти то же, что в журнале
+        if self.learner is not None and evicted is not None:   # повтор фразы не дообучаем
+            self.learner.add(cid, t.text)
+        t.user_data["awaiting_teach"] = t.text
+        return "Я пока не знаю, как на это отвечать. Подскажите пример ответа?"
@@ -1,50 +1,172 @@
 # sentiment.py
+#
+# Лексикон тональности (kartaslovsent.csv или emo_dict.json) компилируется
+# в два .npy в .sentiment_cache/ и открывается через mmap:
+#   <имя>.terms.npy  – отсортированные термины, фиксированная ширина (U<n>)
+#   <имя>.scores.npy – float32 (n, 4): value, pstv, ngtv, neut
+# Поиск слов — np.searchsorted по отсортированному массиву, без словаря
+# в памяти процесса. Сборка — при первом обращении (если кэша нет или
+# источник новее) или явно: python sentiment.py --build
 import os
-import json
 import csv
+import threading
+
+import numpy as np
+
+from nlp_utils import NormalizedText
 
 # Пути к словарям
 BASE_DIR = os.path.dirname(__file__)
 DATA_DIR = os.path.join(BASE_DIR, 'data')
 JSON_PATH = os.path.join(DATA_DIR, 'emo_dict.json')
 CSV_PATH = os.path.join(DATA_DIR, 'kartaslovsent.csv')
+CACHE_DIR = os.path.join(BASE_DIR, '.sentiment_cache')
+
+COLUMNS = ('value', 'pstv', 'ngtv', 'neut')
+
+_lexicon = None
+_lexicon_lock = threading.Lock()
+
+
+def _source():
+    """JSON важнее CSV (как и раньше); None — если нет ни того, ни другого."""
+    for path in (JSON_PATH, CSV_PATH):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _read_source(path):
+    """[(термин, value, pstv, ngtv, neut)]; у JSON только value, остальное — nan."""
+    rows = []
+    if path.endswith('.json'):
+        import json
+        with open(path, encoding='utf-8') as f:
+            for term, value in json.load(f).items():
+                rows.append((term.strip().lower(), float(value), np.nan, np.nan, np.nan))
+        return rows
+    with open(path, encoding='utf-8') as f:
+        reader = csv.reader(f, delimiter=';')        # файл разделён «;», не запятыми
+        header = next(reader, [])
+        cols = [header.index(c) for c in ('term', *COLUMNS)]
+        for row in reader:
+            try:
+                term, *vals = (row[i] for i in cols)
+                rows.append((term.strip().lower(), *map(float, vals)))
+            except (IndexError, ValueError):
+                continue
+    return rows
 
-EMO_DICT = {}
-
-# Попытка загрузить JSON
-if os.path.exists(JSON_PATH):
-    try:
-        with open(JSON_PATH, encoding='utf-8') as f:
-            EMO_DICT = json.load(f)
-    except Exception as e:
-        print(f"Ошибка чтения {JSON_PATH}: {e}")
-# Иначе — попробовать CSV
-elif os.path.exists(CSV_PATH):
-    try:
-        with open(CSV_PATH, encoding='utf-8') as f:
-            reader = csv.reader(f)
-            for row in reader:
-                if len(row) >= 2:
-                    word = row[0].strip()
+
+def _cache_paths(src):
+    stem = os.path.join(CACHE_DIR, os.path.splitext(os.path.basename(src))[0])
+    return stem + '.terms.npy', stem + '.scores.npy'
+
+
+def compile_lexicon(src=None):
+    """Собирает .npy-лексикон из src (по умолчанию JSON/CSV из data/). Возвращает число терминов."""
+    src = src or _source()
+    if src is None:
+        raise FileNotFoundError(f"Не найден ни {JSON_PATH}, ни {CSV_PATH}")
+    rows = sorted({r[0]: r for r in _read_source(src) if r[0]}.values())
+    width = max((len(r[0]) for r in rows), default=1)
+    terms = np.array([r[0] for r in rows], dtype=f'U{width}')
+    scores = np.array([r[1:] for r in rows], dtype=np.float32).reshape(len(rows), len(COLUMNS))
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    for path, arr in zip(_cache_paths(src), (terms, scores)):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            np.save(f, arr)
+        os.replace(tmp, path)
+    return len(terms)
+
+
+def _load():
+    """(terms, scores) через mmap; пустой лексикон, если словаря нет."""
+    global _lexicon
+    if _lexicon is None:
+        with _lexicon_lock:
+            if _lexicon is None:
+                src = _source()
+                if src is None:
+                    print(f"Не найден ни {JSON_PATH}, ни {CSV_PATH}. get_sentiment будет возвращать 0.")
+                    _lexicon = (np.array([], dtype='U1'), np.zeros((0, len(COLUMNS)), np.float32))
+                    return _lexicon
+                terms_f, scores_f = _cache_paths(src)
+                try:
+                    stale = os.path.getmtime(terms_f) < os.path.getmtime(src)
+                except OSError:
+                    stale = True
+                if stale:
                     try:
-                        score = float(row[1].strip())
-                    except ValueError:
-                        continue
-                    EMO_DICT[word] = score
-    except Exception as e:
-        print(f"Ошибка чтения {CSV_PATH}: {e}")
-else:
-    print(f"Не найден ни {JSON_PATH}, ни {CSV_PATH}. get_sentiment будет возвращать 0.")
-
-def get_sentiment(text: str) -> float:
+                        compile_lexicon(src)
+                    except Exception as e:
+                        print(f"Ошибка чтения {src}: {e}")
+                        _lexicon = (np.array([], dtype='U1'), np.zeros((0, len(COLUMNS)), np.float32))
+                        return _lexicon
+                _lexicon = (np.load(terms_f, mmap_mode='r'), np.load(scores_f, mmap_mode='r'))
+    return _lexicon
+
+
+def lookup(words):
+    """
+    Оценки слов: float32 (len(words), 4) — value, pstv, ngtv, neut;
+    для неизвестных слов — нули.
+    """
+    terms, scores = _load()
+    words = np.asarray(words, dtype=str)
+    out = np.zeros((len(words), len(COLUMNS)), dtype=np.float32)
+    if not len(terms) or not len(words):
+        return out
+    pos = np.searchsorted(terms, words)
+    pos[pos == len(terms)] = 0
+    hit = terms[pos] == words
+    out[hit] = scores[pos[hit]]
+    return out
+
+
+def _words(text):
+    if isinstance(text, NormalizedText):
+        text = text.lemma
+    return text.split()
+
+
+def get_sentiment(text) -> float:
     """
     Простейшая тональность: среднее по коэффициентам слов.
     Возвращает значение примерно в диапазоне [-1, +1].
+    text — строка лемм или NormalizedText (берётся его .lemma).
     """
-    words = text.split()
+    words = _words(text)
     if not words:
         return 0.0
-    total = 0.0
-    for w in words:
-        total += EMO_DICT.get(w, 0.0)
-    return total / len(words)
+    return float(lookup(words)[:, 0].astype(np.float64).mean())
+
+
+def get_sentiment_many(texts) -> np.ndarray:
+    """
+    get_sentiment для списка текстов (логи переписок): один searchsorted
+    по всем словам и сумма по строкам через np.bincount.
+    """
+    tokens = [_words(t) for t in texts]
+    lengths = np.array([len(ws) for ws in tokens])
+    if not lengths.sum():
+        return np.zeros(len(tokens))
+    values = lookup([w for ws in tokens for w in ws])[:, 0].astype(np.float64)
+    rows = np.repeat(np.arange(len(tokens)), lengths)
+    sums = np.bincount(rows, weights=values, minlength=len(tokens))
+    return np.divide(sums, lengths, out=np.zeros(len(tokens)), where=lengths > 0)
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    ap = argparse.ArgumentParser(description="Сборка лексикона тональности")
+    ap.add_argument('--build', action='store_true', help="пересобрать .sentiment_cache/")
+    args = ap.parse_args()
+    if args.build:
+        t0 = time.perf_counter()
+        n = compile_lexicon()
+        print(f"✓ {n} терминов за {time.perf_counter() - t0:.2f} s → {CACHE_DIR}")
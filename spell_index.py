@@ -0,0 +1,105 @@
+"""
+spell_index.py
+──────────────
+Индекс исправления опечаток в духе SymSpell (symmetric delete).
+
+• для каждого слова словаря заранее строятся все варианты его префикса
+  (prefix_len символов) с удалёнными ≤ max_dist символами:
+      удаление ➜ [id слов]
+• запрос порождает такие же удаления своего префикса; кандидаты —
+  объединение списков, точный Левенштейн считается только для них
+  (с score_cutoff = max_dist)
+• lev(a, b) ≤ k  ⇒  у префиксов a и b есть общее удаление ≤ k символов,
+  поэтому кандидат с допустимым расстоянием не теряется
+
+Среди равных по расстоянию побеждает более частое слово, затем —
+лексикографически меньшее (результат детерминирован, в отличие от
+перебора set).
+"""
+
+from __future__ import annotations
+
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from Levenshtein import distance as lev_distance
+
+
+class SpellIndex:
+    """Symmetric-delete индекс словаря + частотный tie-break."""
+
+    def __init__(
+        self,
+        words: Mapping[str, int] | Iterable[str],
+        max_dist: int = 2,
+        prefix_len: int = 7,
+        cache_size: int = 16384,
+    ) -> None:
+        """
+        words      – словарь {слово: частота} или просто слова (частота = 1)
+        max_dist   – максимальное расстояние, которое поддерживает индекс
+        cache_size – LRU на результаты correct() (одни и те же слова повторяются)
+        """
+        counts = words if isinstance(words, Mapping) else Counter(words)
+        self.max_dist = max_dist
+        self.prefix_len = max(prefix_len, max_dist + 1)
+        self.words: List[str] = list(counts)
+        self.freq: List[int] = [int(counts[w]) for w in self.words]
+        self._ids: Dict[str, int] = {w: i for i, w in enumerate(self.words)}
+        self._deletes: Dict[str, List[int]] = defaultdict(list)
+        for i, w in enumerate(self.words):
+            for d in self._edits(w[: self.prefix_len], max_dist):
+                self._deletes[d].append(i)
+        self.correct = lru_cache(maxsize=cache_size)(self._correct)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._ids
+
+    @staticmethod
+    def _edits(word: str, k: int) -> set:
+        """word и все его варианты с удалёнными ≤ k символами."""
+        out = {word}
+        level = {word}
+        for _ in range(k):
+            level = {w[:i] + w[i + 1:] for w in level for i in range(len(w))} - out
+            out |= level
+        return out
+
+    # ───────────── поиск ─────────────
+    def lookup(self, word: str, max_dist: int | None = None) -> Optional[Tuple[str, int]]:
+        """
+        (слово словаря, расстояние) с минимальным lev ≤ max_dist;
+        при равенстве — самое частое. None, если такого нет.
+        """
+        if word in self._ids:
+            return word, 0
+        k = self.max_dist if max_dist is None else min(max_dist, self.max_dist)
+
+        cands = set()
+        for d in self._edits(word[: self.prefix_len], k):
+            cands.update(self._deletes.get(d, ()))
+
+        best: Optional[Tuple[int, int, str]] = None
+        for i in cands:
+            w = self.words[i]
+            if abs(len(w) - len(word)) > k:
+                continue
+            dist = lev_distance(word, w, score_cutoff=k)
+            if dist > k:
+                continue
+            key = (dist, -self.freq[i], w)
+            if best is None or key < best:
+                best = key
+        return None if best is None else (best[2], best[0])
+
+    def _correct(self, word: str, max_dist: int | None = None) -> str:
+        hit = self.lookup(word, max_dist)
+        return hit[0] if hit else word
+
+    def correct_many(self, words: Iterable[str], max_dist: int | None = None) -> List[str]:
+        """correct() для последовательности слов (повторы — из LRU)."""
+        return [self.correct(w, max_dist) for w in words]
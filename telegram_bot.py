@@ -5,7 +5,10 @@ from telegram import Update
 from telegram.ext import (Updater, CommandHandler, MessageHandler,
                           Filters, CallbackContext)
 
-from bot_logic      import get_response, start, help_command, handle_text, handle_voice
+from bot_logic      import (get_response, start, help_command, handle_text, handle_voice,
+                            reload_command, install_reload_signal, report_startup, PIPELINE)
+from nlp_utils      import normalized
+import metrics
 from file_memory    import load_history, save_history, load_user_data, save_user_data, MEM_DIR
 from modules.tictactoe import TicTacToe
 
@@ -30,16 +33,18 @@ def start(update: Update, context: CallbackContext) -> None:
     (MEM_DIR / f"history_{uid}.json").unlink(missing_ok=True)
     (MEM_DIR / f"user_data_{uid}.json").unlink(missing_ok=True)
 
-def handle_message(update: Update, context: CallbackContext) -> None:
+@PIPELINE.handler                               # очередь чата, см. update_pipeline.py
+async def handle_message(update: Update, context: CallbackContext) -> None:
     uid, text = update.effective_user.id, update.message.text
+    reply = update.message.reply_text
 
     # ➊ — сохраняем все «несериализуемые» объекты, чтобы не потерять
     volatile_objects = {k: v for k, v in context.user_data.items()
                         if isinstance(v, TicTacToe)}          # при желании добавить и другие типы
 
     # ➋ — поднимаем долгую память
-    history      = load_history(uid)
-    stored_state = load_user_data(uid)
+    history      = await PIPELINE.io(load_history, uid)
+    stored_state = await PIPELINE.io(load_user_data, uid)
 
     context.user_data.clear()
     context.user_data.update(stored_state)
@@ -49,7 +54,7 @@ def handle_message(update: Update, context: CallbackContext) -> None:
     if isinstance(context.user_data.get("tic_tac_toe"), TicTacToe):
         game: TicTacToe = context.user_data["tic_tac_toe"]
         result, finished = game.player_move(text)
-        update.message.reply_text(result)
+        await PIPELINE.io(reply, result)
         if finished:
             context.user_data.pop("tic_tac_toe", None)
         return
@@ -58,25 +63,27 @@ def handle_message(update: Update, context: CallbackContext) -> None:
     if "awaiting_teach" in context.user_data:
         pattern = context.user_data.pop("awaiting_teach")
         context.user_data.setdefault("custom_answers", {})[pattern] = text
-        update.message.reply_text("Спасибо! Я запомнил твой пример ответа 🙂")
+        await PIPELINE.io(reply, "Спасибо! Я запомнил твой пример ответа 🙂")
         history.append(text)
-        save_history(uid, history)
-        _safe_save(uid, context.user_data)
+        await PIPELINE.io(_save_all, uid, history, context.user_data)
         return
 
     # ➎ — основная логика
-    reply = get_response(text, context.user_data, history)
-    update.message.reply_text(reply)
+    answer = await PIPELINE.nlp(lambda: get_response(normalized(update), context.user_data, history))
+    await PIPELINE.io(reply, answer)
 
     history.append(text)
-    save_history(uid, history)
-    _safe_save(uid, context.user_data)
+    await PIPELINE.io(_save_all, uid, history, context.user_data)
 
 # ——— помощник: удаляем несериализуемые объекты перед сохранением ———
 def _safe_save(uid: int, state: dict) -> None:
     safe = deepcopy(state)
     safe.pop("tic_tac_toe", None)
     save_user_data(uid, safe)
+
+def _save_all(uid: int, history, state: dict) -> None:
+    save_history(uid, history)
+    _safe_save(uid, state)
 # ────────────────────────────────────────────────────────────
 
 def main() -> None:
@@ -89,13 +96,20 @@ def main() -> None:
 
     dp.add_handler(CommandHandler("start", start))
     dp.add_handler(CommandHandler("help",  help_command))
+    dp.add_handler(CommandHandler("reload_model", reload_command))   # ADMIN_IDS
     dp.add_handler(MessageHandler(Filters.voice, handle_voice))
     dp.add_handler(MessageHandler(Filters.text & ~Filters.command, handle_message), group=100)
 
     # выключаем webhook → можем использовать long-polling
     updater.bot.delete_webhook(drop_pending_updates=True)
-    updater.start_polling()
+    install_reload_signal()                          # SIGHUP → новая версия модели
+    metrics.configure_from_env()                     # METRICS_PORT / METRICS_FILE
+    PIPELINE.attach(dp)                              # все хэндлеры апдейта — в очереди его чата
+    PIPELINE.start()                                 # event loop + пулы io / nlp / stt / tts
+    updater.start_polling()                          # апдейты ждут "engine" в get_response
+    report_startup()
     updater.idle()
+    PIPELINE.stop()                                  # доотвечаем на то, что уже в очередях
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,39 @@
+"""_fallback: незнакомые фразы → INTENTS, журнал и дообучение на одном id."""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from intent_journal import IntentJournal  # noqa: E402
+from response_rules import ResponseEngine, custom_intent_id  # noqa: E402
+
+
+class _Learner:
+    def __init__(self):
+        self.seen = []
+
+    def add(self, intent, text):
+        self.seen.append((intent, text))
+
+
+def _turn(text):
+    return SimpleNamespace(text=text, low_clean=text.lower().strip(" ?!."), user_data={})
+
+
+def test_cyrillic_phrases_get_distinct_ids(tmp_path):
+    journal = IntentJournal(tmp_path / "custom_intents.json")
+    engine = SimpleNamespace(journal=journal, intents={}, learner=_Learner())
+    try:
+        for text in ("Как починить велосипед?", "Где купить билеты в театр?", "как починить велосипед"):
+            ResponseEngine._fallback(engine, _turn(text))
+
+        a, b = custom_intent_id("как починить велосипед"), custom_intent_id("где купить билеты в театр")
+        assert a != b
+        assert set(engine.intents) == {a, b} == set(journal.entries())
+        assert engine.intents[a] == journal.entries()[a]     # повтор не перезаписал память
+        assert engine.intents[a]["examples"] == ["Как починить велосипед?"]
+        assert engine.learner.seen == [(a, "Как починить велосипед?"), (b, "Где купить билеты в театр?")]
+    finally:
+        journal.close()
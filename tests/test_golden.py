@@ -0,0 +1,43 @@
+"""Golden-диалоги: ответы базовой версии (benchmarks/golden_conversations.json) на текущем движке."""
+
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from bench_get_response import GOLDEN_F, build_engine, replay  # noqa: E402
+
+
+class _Learner:
+    def __init__(self):
+        self.seen = []
+
+    def add(self, intent, text):
+        self.seen.append((intent, text))
+
+
+def test_replies_match_baseline(tmp_path):
+    golden = json.loads(GOLDEN_F.read_text("utf-8"))
+    engine = build_engine(tmp_path / "custom_intents.json")
+    engine.learner = _Learner()
+    try:
+        replies, _ = replay(engine, golden)
+        journal = engine.journal.entries()
+    finally:
+        engine.journal.close()
+
+    diffs = [
+        (i, j, g["messages"][j], want, got)
+        for i, (g, r) in enumerate(zip(golden, replies))
+        for j, (want, got) in enumerate(zip(g["replies"], r))
+        if want != got
+    ]
+    assert not diffs, diffs[:5]
+
+    # fallback: каждая незнакомая фраза — в журнале, в INTENTS и у learner-а
+    learned = {intent for intent, _ in engine.learner.seen}
+    assert learned and set(journal) == learned
+    assert all(journal[cid] == engine.intents[cid] for cid in learned)
@@ -0,0 +1,237 @@
+"""
+update_pipeline.py
+──────────────────
+Asyncio-конвейер апдейтов: поток Dispatcher-а (python-telegram-bot v13)
+только кладёт апдейт в очередь его чата, обработка идёт в event loop
+отдельного потока, а всё блокирующее — в ограниченных пулах.
+
+    PIPELINE = UpdatePipeline.from_env()
+
+    @PIPELINE.handler
+    async def handle_text(update, context):
+        history = await PIPELINE.io(load_history, uid)               # диск
+        reply = await PIPELINE.nlp(get_response, text, ud, history)  # CPU
+        await PIPELINE.io(update.message.reply_text, reply)          # HTTP
+
+    dp.add_handler(MessageHandler(Filters.text, handle_text))   # обычный v13-callback
+    PIPELINE.attach(dp)
+    PIPELINE.start(); ...; PIPELINE.stop()
+
+• порядок: у чата своя очередь и одна задача-обработчик — сообщения
+  одного чата идут строго по очереди, разные чаты — параллельно;
+  задача чата завершается, как только очередь опустела
+• attach(dp): в очередь чата уходит апдейт целиком — все группы
+  хэндлеров Dispatcher-а (плагины, команды) отрабатывают в пуле io,
+  затем по порядку — @handler-корутины этого апдейта; следующий апдейт
+  чата начнётся только после них, user_data чата трогает один поток
+  (без attach @handler-callback ставит корутину в очередь сам)
+• пулы (потоки, размеры — from_env):
+    io  – HTTP к Telegram (скачивание, reply_*) и file_memory
+    nlp – get_response
+    stt – ffmpeg → WAV и Vosk
+    tts – pyttsx3 и кодирование в OGG; один поток: движок pyttsx3
+          не потокобезопасен
+  голосовые занимают только stt/tts — текстовые чаты их не ждут;
+  ffmpeg — отдельный процесс, Vosk отпускает GIL, поэтому процессные
+  пулы (модель в каждом процессе, pickling user_data) не нужны
+• backpressure: в очереди чата больше max_pending апдейтов — новый
+  отбрасывается, on_overflow(update) вызывается в пуле io
+• исключение обработчика печатается, очередь чата продолжает работу
+• stop() — дожидается очередей (не дольше timeout) и закрывает пулы
+
+Метрики: bot_pipeline_wait_seconds{pool} — ожидание свободного потока
+пула (для "chat" — от апдейта до начала его обработки), bot_pipeline_chats.
+
+Из окружения:
+    PIPELINE_IO_WORKERS=8   PIPELINE_NLP_WORKERS=2
+    PIPELINE_STT_WORKERS=1  PIPELINE_MAX_PENDING=20
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from metrics import PIPELINE_CHATS, PIPELINE_WAIT_SECONDS
+
+Job = Callable[..., Awaitable[Any]]
+
+
+class UpdatePipeline:
+    def __init__(self, io_workers: int = 8, nlp_workers: int = 2, stt_workers: int = 1,
+                 max_pending: int = 20,
+                 on_overflow: Optional[Callable[[Any], Any]] = None) -> None:
+        self.max_pending = max_pending
+        self.on_overflow = on_overflow
+        self._pools = {
+            "io": ThreadPoolExecutor(io_workers, thread_name_prefix="pipe-io"),
+            "nlp": ThreadPoolExecutor(nlp_workers, thread_name_prefix="pipe-nlp"),
+            "stt": ThreadPoolExecutor(stt_workers, thread_name_prefix="pipe-stt"),
+            "tts": ThreadPoolExecutor(1, thread_name_prefix="pipe-tts"),
+        }
+        self._queues: Dict[Hashable, asyncio.Queue] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._local = threading.local()      # .jobs — @handler-корутины апдейта внутри attach
+
+    @classmethod
+    def from_env(cls, **kw: Any) -> "UpdatePipeline":
+        env = {
+            "io_workers": "PIPELINE_IO_WORKERS", "nlp_workers": "PIPELINE_NLP_WORKERS",
+            "stt_workers": "PIPELINE_STT_WORKERS", "max_pending": "PIPELINE_MAX_PENDING",
+        }
+        for arg, name in env.items():
+            if os.getenv(name):
+                kw.setdefault(arg, int(os.environ[name]))
+        return cls(**kw)
+
+    # ───────────── жизненный цикл ─────────────
+    def start(self) -> "UpdatePipeline":
+        """Поднимает event loop в фоновом потоке (повторный вызов — no-op)."""
+        with self._lock:
+            if self._loop is None:
+                ready = threading.Event()
+                self._thread = threading.Thread(target=self._run, args=(ready,),
+                                                name="pipe-loop", daemon=True)
+                self._thread.start()
+                ready.wait()
+        return self
+
+    def _run(self, ready: threading.Event) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._loop.call_soon(ready.set)
+        self._loop.run_forever()
+
+    def stop(self, timeout: float = 30.0) -> bool:
+        """Дожидается очередей чатов; True — всё обработано за timeout."""
+        if self._loop is None:
+            return True
+        done = asyncio.run_coroutine_threadsafe(self._drain(), self._loop)
+        try:
+            done.result(timeout)
+            drained = True
+        except TimeoutError:
+            drained = False
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        for pool in self._pools.values():
+            pool.shutdown(wait=drained, cancel_futures=not drained)
+        self._loop = None
+        return drained
+
+    async def _drain(self) -> None:
+        while self._queues:
+            await asyncio.gather(*(q.join() for q in list(self._queues.values())))
+
+    # ───────────── приём апдейтов (любой поток) ─────────────
+    def submit(self, key: Hashable, job: Job, *args: Any) -> None:
+        """Ставит job(*args) в очередь key; не блокирует вызывающий поток."""
+        if self._loop is None:
+            self.start()
+        # call_soon_threadsafe — FIFO: порядок вызовов submit сохраняется
+        self._loop.call_soon_threadsafe(self._enqueue, key, job, args, time.perf_counter())
+
+    def handler(self, job: Job) -> Callable[[Any, Any], None]:
+        """async def job(update, context) → callback для Dispatcher v13."""
+        @functools.wraps(job)
+        def callback(update: Any, context: Any) -> None:
+            jobs = getattr(self._local, "jobs", None)
+            if jobs is not None:             # апдейт уже в очереди чата (attach)
+                jobs.append((job, update, context))
+                return
+            chat = update.effective_chat
+            self.submit(chat.id if chat else None, job, update, context)
+        callback.job = job
+        return callback
+
+    def attach(self, dispatcher: Any) -> None:
+        """Dispatcher v13: каждый апдейт — целиком через очередь своего чата."""
+        process = dispatcher.process_update
+
+        def enqueue(update: Any) -> None:
+            chat = getattr(update, "effective_chat", None)
+            self.submit(chat.id if chat else None, self._dispatch, update, process)
+        dispatcher.process_update = enqueue
+
+    async def _dispatch(self, update: Any, process: Callable[[Any], None]) -> None:
+        for job, *args in await self.io(self._process, update, process):
+            try:
+                await job(*args)
+            except Exception:
+                print(f"[pipeline] {job.__name__}: ошибка обработчика\n{traceback.format_exc()}")
+
+    def _process(self, update: Any, process: Callable[[Any], None]) -> list:
+        # синхронные группы Dispatcher-а; @handler-корутины собираются в jobs
+        self._local.jobs = jobs = []
+        try:
+            process(update)
+        finally:
+            del self._local.jobs
+        return jobs
+
+    def _enqueue(self, key: Hashable, job: Job, args: tuple, t0: float) -> None:
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = asyncio.Queue()
+            PIPELINE_CHATS.set(len(self._queues))
+            self._loop.create_task(self._worker(key, queue))
+        if queue.qsize() >= self.max_pending:
+            print(f"[pipeline] чат {key}: в очереди {queue.qsize()} апдейтов — новый отброшен")
+            if self.on_overflow and args:
+                self._pools["io"].submit(self._safe, self.on_overflow, args[0])
+            return
+        queue.put_nowait((job, args, t0))
+
+    async def _worker(self, key: Hashable, queue: asyncio.Queue) -> None:
+        while not queue.empty():
+            job, args, t0 = queue.get_nowait()
+            PIPELINE_WAIT_SECONDS.observe(time.perf_counter() - t0, "chat")
+            try:
+                await job(*args)
+            except Exception:
+                print(f"[pipeline] чат {key}: ошибка обработчика\n{traceback.format_exc()}")
+            finally:
+                queue.task_done()
+        del self._queues[key]
+        PIPELINE_CHATS.set(len(self._queues))
+
+    @staticmethod
+    def _safe(fn: Callable[..., Any], *args: Any) -> None:
+        try:
+            fn(*args)
+        except Exception as e:
+            print(f"[pipeline] {fn!r}: {e!r}")
+
+    # ───────────── блокирующая работа (из обработчиков) ─────────────
+    async def run(self, pool: str, fn: Callable[..., Any], *args: Any, **kw: Any) -> Any:
+        """fn(*args, **kw) в пуле pool; event loop при этом свободен."""
+        t0 = time.perf_counter()
+
+        def call():
+            PIPELINE_WAIT_SECONDS.observe(time.perf_counter() - t0, pool)
+            return fn(*args, **kw)
+        return await asyncio.get_running_loop().run_in_executor(self._pools[pool], call)
+
+    def io(self, fn: Callable[..., Any], *args: Any, **kw: Any) -> Awaitable[Any]:
+        return self.run("io", fn, *args, **kw)
+
+    def nlp(self, fn: Callable[..., Any], *args: Any, **kw: Any) -> Awaitable[Any]:
+        return self.run("nlp", fn, *args, **kw)
+
+    def stt(self, fn: Callable[..., Any], *args: Any, **kw: Any) -> Awaitable[Any]:
+        return self.run("stt", fn, *args, **kw)
+
+    def tts(self, fn: Callable[..., Any], *args: Any, **kw: Any) -> Awaitable[Any]:
+        return self.run("tts", fn, *args, **kw)
+
+    def pending(self) -> Dict[Hashable, int]:
+        """{чат: апдейтов в очереди} — для отладки; снимок без лока."""
+        return {k: q.qsize() for k, q in list(self._queues.items())}